@@ -227,10 +227,12 @@ if IS_PRODUCTION and not CORS_ALLOWED_ORIGINS:
     raise ImproperlyConfigured("CORS_ALLOWED_ORIGINS must be set in production.")
 
 # Caching Configuration
+REDIS_URL = f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:{os.environ.get('REDIS_PORT', '6379')}"
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.redis.RedisCache',
-        'LOCATION': f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:{os.environ.get('REDIS_PORT', '6379')}/1",
+        'LOCATION': f"{REDIS_URL}/1",
         'TIMEOUT': 3600,  # 1 hour default timeout
         'KEY_PREFIX': 'nowplaying',
     }
@@ -243,8 +245,79 @@ CACHE_TIMEOUTS = {
     'SEARCH_RESULTS': 300,  # 5 minutes
     'ANALYTICS': 3600,  # 1 hour
     'USER_PROFILE': 1800,  # 30 minutes
+    'STEAM_APP_SCHEMA': 7 * 24 * 3600,  # Shared achievement schemas are refreshed in the background after this
+}
+
+# Outbound HTTP: one keep-alive session per upstream host (see http_client.py)
+HTTP_CLIENT_POOL = {
+    'POOL_MAXSIZE': 10,  # Keep-alive connections kept per host
+    'POOL_BLOCK': False,  # Open extra (non-pooled) connections instead of waiting
+    'IDLE_TIMEOUT': 60,  # Recycle a host session after this many idle seconds
+    'HOSTS': {
+        'api.trakt.tv': {'POOL_MAXSIZE': 20},
+        'api.themoviedb.org': {'POOL_MAXSIZE': 20},
+    },
+}
+
+# Concurrency caps for batched upstream calls, keyed by http_client logger_name
+HTTP_CLIENT_FANOUT = {
+    'default': 8,
+    'psn': 4,
+    'retroachievements': 4,
+    'steam': 8,
+    'trakt': 8,
+    'xbox': 5,
+}
+
+# Per-service request budgets shared by all workers and sync threads via Redis.
+# Each entry is a list of (requests, seconds) windows, smallest window first.
+HTTP_RATE_LIMIT_REDIS_URL = os.environ.get('HTTP_RATE_LIMIT_REDIS_URL', f"{REDIS_URL}/2")
+HTTP_RATE_LIMITS = {
+    'steam': [(10, 1)],
+    'xbox': [(5, 1)],
+    'trakt': [(10, 1), (1000, 300)],  # Trakt allows 1000 GETs per 5 minutes
+    'music': [(5, 1)],  # Last.fm asks clients to stay under 5 requests/second
+    'retroachievements': [(5, 1)],
+    'psn': [(3, 1), (300, 900)],  # PSN requests made by psnawp; PSN tolerates roughly 300 per 15 minutes
 }
 
+# Seconds a PSN sync may spend in one request, rate-limit waits included. Past it the sync
+# stops and returns what it stored as a partial result (gunicorn kills workers at 600s).
+PSN_SYNC_DEADLINE = int(os.environ.get('PSN_SYNC_DEADLINE', 480))
+
+# Retry presets keyed by http_client logger_name. Backoff is full-jitter exponential
+# (BACKOFF * 2**attempt, capped at MAX_BACKOFF) unless the upstream sends Retry-After;
+# DEADLINE bounds the total seconds one call may take, sleeps and rate-limit waits included.
+HTTP_RETRY_POLICIES = {
+    'default': {'RETRIES': 2, 'BACKOFF': 1, 'MAX_BACKOFF': 30, 'DEADLINE': 60},
+    'music': {'RETRIES': 3, 'BACKOFF': 2, 'DEADLINE': 90},  # Last.fm pages are slow but worth retrying
+    'xbox': {'DEADLINE': 45},
+    'trakt': {'DEADLINE': 45},
+}
+
+# Per-host circuit breaker; state lives in the default cache so all workers share it
+HTTP_CIRCUIT_BREAKER = {
+    'FAILURE_THRESHOLD': 5,  # Consecutive failed attempts (network errors/5xx) before opening
+    'COOLDOWN': 60,  # Seconds to fail fast before letting a single probe through
+}
+
+# Opt-in conditional-GET cache for upstream responses (http_client cache_ttl).
+# TTLS are freshness lifetimes in seconds; 0 means always revalidate with the stored ETag/Last-Modified.
+HTTP_RESPONSE_CACHE = {
+    'STALE_TTL': 7 * 24 * 3600,  # Keep validators this long after an entry goes stale
+    'TTLS': {
+        'TMDB_METADATA': 24 * 3600,
+        'TRAKT_SEASONS': 0,
+        'RETROACHIEVEMENTS_GAME': 0,
+    },
+}
+
+# Offline benchmarking: HTTP_CLIENT_CAPTURE_DIR records upstream GET responses as
+# fixtures (credentials redacted); HTTP_CLIENT_REPLAY_URL sends every upstream call to
+# a `manage.py replay_upstream` server instead.
+HTTP_CLIENT_CAPTURE_DIR = os.environ.get('HTTP_CLIENT_CAPTURE_DIR', '')
+HTTP_CLIENT_REPLAY_URL = os.environ.get('HTTP_CLIENT_REPLAY_URL', '')
+
 # SAFE: Static files optimization
 STATICFILES_STORAGE = 'django.contrib.staticfiles.storage.StaticFilesStorage'
 STATIC_URL = '/static/'
@@ -1,7 +1,14 @@
+import asyncio
+import json
+import tempfile
+import threading
+import time
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth.models import User
-from django.test import SimpleTestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
 from rest_framework import status
@@ -13,8 +20,11 @@ from trakt.models import Movie, MovieWatch
 
 
 class HttpClientTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
     @patch("http_client.time.sleep")
-    @patch("http_client.requests.request")
+    @patch("http_client.requests.Session.request")
     def test_request_retries_transient_statuses(self, mock_request, _mock_sleep):
         first = MagicMock(status_code=500)
         second = MagicMock(status_code=200)
@@ -26,7 +36,7 @@ class HttpClientTests(SimpleTestCase):
         self.assertEqual(mock_request.call_count, 2)
 
     @patch("http_client.time.sleep")
-    @patch("http_client.requests.request")
+    @patch("http_client.requests.Session.request")
     def test_request_raises_sanitized_error_after_timeout(self, mock_request, _mock_sleep):
         mock_request.side_effect = http_client.requests.Timeout("connect timed out")
 
@@ -36,6 +46,437 @@ class HttpClientTests(SimpleTestCase):
         self.assertEqual(str(exc.exception), "External service request failed.")
         self.assertEqual(mock_request.call_count, 2)
 
+    @patch("http_client.time.sleep")
+    @patch("http_client.requests.Session.request")
+    def test_request_honours_retry_after(self, mock_request, mock_sleep):
+        throttled = MagicMock(status_code=429, headers={"Retry-After": "7"})
+        mock_request.side_effect = [throttled, MagicMock(status_code=200)]
+
+        response = http_client.get("https://example.com/data")
+
+        self.assertEqual(response.status_code, 200)
+        mock_sleep.assert_called_once_with(7.0)
+
+    @patch("http_client.time.sleep")
+    @patch("http_client.requests.Session.request")
+    def test_request_stops_retrying_when_backoff_exceeds_deadline(self, mock_request, mock_sleep):
+        mock_request.return_value = MagicMock(status_code=503, headers={"Retry-After": "120"})
+        policy = http_client.RetryPolicy(retries=3, deadline=10)
+
+        response = http_client.get("https://example.com/data", retry_policy=policy)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(mock_request.call_count, 1)
+        mock_sleep.assert_not_called()
+        self.assertLessEqual(mock_request.call_args.kwargs["timeout"][1], 10)
+
+    def test_retry_policy_uses_full_jitter_and_service_presets(self):
+        policy = http_client.RetryPolicy(backoff=1, max_backoff=5)
+        with patch("http_client.random.uniform", return_value=0.5) as mock_uniform:
+            self.assertEqual(policy.delay(10), 0.5)
+        mock_uniform.assert_called_once_with(0, 5)
+
+        with override_settings(HTTP_RETRY_POLICIES={"default": {"RETRIES": 1}, "slow": {"DEADLINE": 5}}):
+            preset = http_client.get_retry_policy("slow")
+        self.assertEqual((preset.retries, preset.deadline), (1, 5))
+
+    def test_parse_retry_after_accepts_seconds_and_http_dates(self):
+        self.assertEqual(http_client.parse_retry_after("3"), 3.0)
+        self.assertIsNone(http_client.parse_retry_after("soon"))
+        self.assertEqual(http_client.parse_retry_after("Wed, 01 Jan 2020 00:00:00 GMT"), 0.0)
+        future = timezone.now() + timedelta(seconds=30)
+        delay = http_client.parse_retry_after(future.strftime("%a, %d %b %Y %H:%M:%S GMT"))
+        self.assertTrue(25 <= delay <= 30)
+
+    def test_sessions_are_shared_per_host(self):
+        self.addCleanup(http_client.close_sessions)
+
+        first = http_client.get_session("https://api.example.com/a")
+        second = http_client.get_session("https://API.example.com/b?x=1")
+        other = http_client.get_session("https://other.example.com/a")
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+
+    @patch("http_client.requests.Session.request")
+    def test_pool_stats_count_requests_per_host(self, mock_request):
+        self.addCleanup(http_client.close_sessions)
+        http_client.close_sessions()
+        mock_request.return_value = MagicMock(status_code=200)
+
+        http_client.get("https://api.example.com/a")
+        http_client.get("https://api.example.com/b")
+
+        stats = http_client.pool_stats()
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(stats[0]["host"], "https://api.example.com")
+        self.assertEqual(stats[0]["requests"], 2)
+        self.assertEqual(stats[0]["pool_maxsize"], 10)
+
+    @patch("http_client.request")
+    def test_gather_preserves_order_and_caps_concurrency(self, mock_request):
+        lock = threading.Lock()
+        state = {"active": 0, "peak": 0}
+
+        def fake_request(method, url, **kwargs):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+            return url
+
+        mock_request.side_effect = fake_request
+        calls = [{"url": f"https://example.com/{index}"} for index in range(10)]
+
+        results = http_client.gather(calls, concurrency=3)
+
+        self.assertEqual(results, [call["url"] for call in calls])
+        self.assertLessEqual(state["peak"], 3)
+
+    @patch("http_client.request")
+    def test_gather_json_can_return_exceptions(self, mock_request):
+        ok = MagicMock(status_code=200)
+        ok.json.return_value = {"ok": True}
+        mock_request.side_effect = [ok, http_client.ExternalRequestError("down")]
+
+        results = http_client.gather_json(
+            [{"url": "https://example.com/a"}, {"url": "https://example.com/b"}],
+            concurrency=1,
+            return_exceptions=True,
+        )
+
+        self.assertEqual(results[0], {"ok": True})
+        self.assertIsInstance(results[1], http_client.ExternalRequestError)
+
+    @patch("http_client.request")
+    def test_request_json_async_matches_sync_semantics(self, mock_request):
+        mock_request.return_value = MagicMock(status_code=200, **{"json.side_effect": ValueError})
+
+        with self.assertRaises(http_client.ExternalRequestError):
+            asyncio.run(http_client.request_json_async("get", "https://example.com/data"))
+
+    @override_settings(HTTP_RATE_LIMIT_REDIS_URL="", HTTP_RATE_LIMITS={"ratelimited": [(2, 0.3)]})
+    @patch("http_client.requests.Session.request")
+    def test_requests_wait_for_service_rate_limit(self, mock_request):
+        http_client._limiters.clear()
+        self.addCleanup(http_client._limiters.clear)
+        mock_request.return_value = MagicMock(status_code=200)
+
+        started = time.monotonic()
+        for _ in range(3):
+            http_client.get("https://example.com/data", logger_name="ratelimited")
+
+        self.assertGreaterEqual(time.monotonic() - started, 0.25)
+        self.assertEqual(mock_request.call_count, 3)
+
+    @patch("http_client.time.sleep")
+    @patch("http_client.requests.Session.request")
+    def test_rate_limiter_fails_open_when_redis_is_down(self, mock_request, mock_sleep):
+        limiter = MagicMock()
+        limiter.try_acquire.side_effect = http_client.redis.ConnectionError("refused")
+        mock_request.return_value = MagicMock(status_code=200)
+
+        with patch.dict(http_client._limiters, {"steam": (limiter, threading.Lock())}):
+            response = http_client.get("https://example.com/data", logger_name="steam")
+
+        self.assertEqual(response.status_code, 200)
+        mock_sleep.assert_not_called()
+
+    @override_settings(HTTP_CIRCUIT_BREAKER={"FAILURE_THRESHOLD": 2, "COOLDOWN": 60})
+    @patch("http_client.time.sleep")
+    @patch("http_client.requests.Session.request")
+    def test_circuit_opens_after_consecutive_failures_and_fails_fast(self, mock_request, mock_sleep):
+        mock_request.side_effect = http_client.requests.ConnectionError("refused")
+
+        with self.assertRaises(http_client.ExternalRequestError):
+            http_client.get("https://down.example.com/a", retries=5)
+        self.assertEqual(mock_request.call_count, 2)
+        self.assertEqual(mock_sleep.call_count, 1)
+
+        with self.assertRaises(http_client.CircuitOpenError):
+            http_client.get("https://down.example.com/b")
+        self.assertEqual(mock_request.call_count, 2)
+
+        states = http_client.breaker_states()
+        self.assertEqual(states[0]["host"], "https://down.example.com")
+        self.assertEqual(states[0]["state"], "open")
+
+    @override_settings(HTTP_CIRCUIT_BREAKER={"FAILURE_THRESHOLD": 1, "COOLDOWN": 60})
+    @patch("http_client.requests.Session.request")
+    def test_circuit_half_opens_after_cooldown_and_closes_on_success(self, mock_request):
+        mock_request.side_effect = [
+            MagicMock(status_code=503),
+            MagicMock(status_code=200),
+        ]
+        self.assertEqual(http_client.get("https://flaky.example.com/a").status_code, 503)
+
+        with patch("http_client.time.time", return_value=time.time() + 61):
+            response = http_client.get("https://flaky.example.com/a")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(http_client.breaker_states()[0]["state"], "closed")
+
+    @override_settings(HTTP_CIRCUIT_BREAKER={"FAILURE_THRESHOLD": 1, "COOLDOWN": 60})
+    def test_half_open_circuit_admits_a_single_probe(self):
+        http_client.record_failure("https://flaky.example.com/a")
+
+        with patch("http_client.time.time", return_value=time.time() + 61):
+            http_client.check_circuit("https://flaky.example.com/a")
+            with self.assertRaises(http_client.CircuitOpenError):
+                http_client.check_circuit("https://flaky.example.com/b")
+
+    def _response(self, status_code=200, content=b'{"ok": true}', headers=None):
+        response = http_client.requests.Response()
+        response.status_code = status_code
+        response._content = content
+        response.headers.update(headers or {})
+        return response
+
+    @patch("http_client.requests.Session.request")
+    def test_cached_get_serves_fresh_entry_locally(self, mock_request):
+        mock_request.return_value = self._response(headers={"Cache-Control": "max-age=300"})
+        before = http_client.response_cache_stats()
+
+        first = http_client.get_json("https://cache.example.com/a", cache_ttl=0)
+        second = http_client.get_json("https://cache.example.com/a", cache_ttl=0)
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_request.call_count, 1)
+        after = http_client.response_cache_stats()
+        self.assertEqual(after["hits"] - before["hits"], 1)
+        self.assertEqual(after["misses"] - before["misses"], 1)
+
+    @patch("http_client.requests.Session.request")
+    def test_cached_get_revalidates_with_validators(self, mock_request):
+        mock_request.side_effect = [
+            self._response(headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"}),
+            self._response(status_code=304, content=b"", headers={"ETag": '"v1"'}),
+        ]
+        before = http_client.response_cache_stats()
+
+        http_client.get("https://cache.example.com/b", cache_ttl=0, headers={"Authorization": "Bearer x"})
+        response = http_client.get("https://cache.example.com/b", cache_ttl=0, headers={"Authorization": "Bearer x"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ok": True})
+        headers = mock_request.call_args.kwargs["headers"]
+        self.assertEqual(headers["If-None-Match"], '"v1"')
+        self.assertEqual(headers["If-Modified-Since"], "Wed, 01 Jan 2025 00:00:00 GMT")
+        self.assertEqual(headers["Authorization"], "Bearer x")
+        after = http_client.response_cache_stats()
+        self.assertEqual(after["revalidated"] - before["revalidated"], 1)
+
+    @patch("http_client.requests.Session.request")
+    def test_cached_get_respects_no_store_and_request_headers(self, mock_request):
+        mock_request.return_value = self._response(headers={"Cache-Control": "no-store"})
+
+        http_client.get("https://cache.example.com/c", cache_ttl=3600)
+        http_client.get("https://cache.example.com/c", cache_ttl=3600)
+        mock_request.return_value = self._response()
+        http_client.get("https://cache.example.com/d", cache_ttl=3600, headers={"Authorization": "a"})
+        http_client.get("https://cache.example.com/d", cache_ttl=3600, headers={"Authorization": "b"})
+
+        self.assertEqual(mock_request.call_count, 4)
+
+    @patch("http_client.requests.Session.request")
+    def test_coalesced_gets_share_one_upstream_call(self, mock_request):
+        release = threading.Event()
+
+        def slow_response(*_args, **_kwargs):
+            release.wait(5)
+            return self._response()
+
+        mock_request.side_effect = slow_response
+        results = []
+
+        def fetch():
+            results.append(http_client.get_json("https://coalesce.example.com/trending", coalesce=True))
+
+        threads = [threading.Thread(target=fetch) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(results, [{"ok": True}] * 4)
+        self.assertEqual(mock_request.call_count, 1)
+
+    @patch("http_client.requests.Session.request")
+    def test_coalesce_waits_for_result_from_another_worker(self, mock_request):
+        key = http_client._coalesce_key("get", "https://coalesce.example.com/a", {})
+        cache.add(f"{key}:lock", 1)
+        cache.set(f"{key}:result", http_client._entry_from_response(self._response(content=b'{"shared": 1}')))
+
+        data = http_client.get_json("https://coalesce.example.com/a", coalesce=True)
+
+        self.assertEqual(data, {"shared": 1})
+        mock_request.assert_not_called()
+
+    def test_coalesce_key_separates_callers_but_ignores_unrelated_headers(self):
+        url = "https://coalesce.example.com/a"
+        alice = http_client._coalesce_key("get", url, {"headers": {"Authorization": "Bearer a"}})
+        bob = http_client._coalesce_key("get", url, {"headers": {"Authorization": "Bearer b"}})
+        alice_json = http_client._coalesce_key(
+            "get", url, {"headers": {"Authorization": "Bearer a", "Content-Type": "application/json"}}
+        )
+
+        self.assertNotEqual(alice, bob)
+        self.assertEqual(alice, alice_json)
+        self.assertNotEqual(
+            http_client._coalesce_key("get", url, {"headers": {"trakt-api-key": "1"}}),
+            http_client._coalesce_key("get", url, {"headers": {"trakt-api-key": "2"}}),
+        )
+
+    @patch("http_client.time.sleep")
+    @patch("http_client.requests.Session.request")
+    def test_requests_are_recorded_in_prometheus_metrics(self, mock_request, _mock_sleep):
+        mock_request.side_effect = [
+            self._response(status_code=503),
+            self._response(content=b"0123456789"),
+        ]
+
+        http_client.get("https://metrics.example.com/a", logger_name="metricsvc")
+
+        text = http_client.prometheus_metrics()
+        labels = 'service="metricsvc",host="metrics.example.com"'
+        self.assertIn(f'http_client_responses_total{{{labels},status="503"}} 1', text)
+        self.assertIn(f'http_client_responses_total{{{labels},status="200"}} 1', text)
+        self.assertIn(f"http_client_retries_total{{{labels}}} 1", text)
+        self.assertIn(f"http_client_in_flight_requests{{{labels}}} 0", text)
+        self.assertIn(f'http_client_request_duration_seconds_bucket{{{labels},le="+Inf"}} 2', text)
+
+    @patch("http_client.requests.Session.request")
+    def test_track_sync_logs_summary_including_fanned_out_requests(self, mock_request):
+        mock_request.side_effect = lambda *args, **kwargs: self._response()
+
+        @http_client.track_sync("test.sync")
+        def sync():
+            http_client.get("https://sync.example.com/shows/1/seasons/2")
+            http_client.gather([{"url": "https://sync.example.com/shows/3/seasons/4"}] * 2)
+
+        with self.assertLogs("http_client", level="INFO") as logs:
+            sync()
+
+        summary = [line for line in logs.output if "Sync test.sync finished" in line]
+        self.assertEqual(len(summary), 1)
+        self.assertIn("3 upstream requests", summary[0])
+        self.assertIn("sync.example.com/shows/{id}/seasons/{id} 3x", summary[0])
+
+    def test_redact_url_merges_params_and_hides_credentials(self):
+        url = http_client.redact_url(
+            "https://API.example.com/x?y=secret&u=me",
+            {"api_key": "k", "page": 2, "ids": [1, 2]},
+        )
+
+        self.assertEqual(
+            url,
+            "https://api.example.com/x?api_key=REDACTED&ids=1&ids=2&page=2&u=me&y=REDACTED",
+        )
+
+    @patch("http_client.requests.Session.request")
+    def test_capture_writes_redacted_fixture_that_replay_paths_resolve(self, mock_request):
+        mock_request.return_value = self._response(content=b'{"games": []}', headers={"Content-Type": "application/json"})
+
+        with tempfile.TemporaryDirectory() as capture_dir, override_settings(HTTP_CLIENT_CAPTURE_DIR=capture_dir):
+            http_client.get("https://capture.example.com/games", params={"key": "secret", "steamid": "1"})
+
+            redacted = http_client.redact_url("https://capture.example.com/games?key=other&steamid=1")
+            fixture = json.loads((Path(capture_dir) / http_client.fixture_path("get", redacted)).read_text())
+
+        self.assertEqual(fixture["status"], 200)
+        self.assertEqual(fixture["body"], '{"games": []}')
+        self.assertNotIn("secret", json.dumps(fixture))
+
+    @override_settings(HTTP_CLIENT_REPLAY_URL="http://127.0.0.1:8765/")
+    @patch("http_client.requests.Session.request")
+    def test_replay_url_rewrites_upstream_requests(self, mock_request):
+        mock_request.return_value = self._response()
+
+        http_client.get("https://replay.example.com/a/b?c=1", params={"d": 2})
+
+        self.assertEqual(mock_request.call_args.args[1], "http://127.0.0.1:8765/https/replay.example.com/a/b?c=1")
+        self.assertEqual(mock_request.call_args.kwargs["params"], {"d": 2})
+
+    def _chunked_response(self, text, chunk_size):
+        response = MagicMock(url="https://stream.example.com/a")
+        raw = text.encode()
+        response.iter_content.side_effect = lambda chunk_size=1: (
+            raw[i:i + chunk_size] for i in range(0, len(raw), chunk_size)
+        )
+        return response
+
+    def test_stream_json_items_yields_nested_array_across_chunk_boundaries(self):
+        payload = {
+            "recenttracks": {
+                "track": [{"name": f"Song {i}", "artist": "Ünïcode ✓", "plays": i * 1000} for i in range(20)],
+                "@attr": {"totalPages": "4"},
+            },
+            "extra": True,
+        }
+        for chunk_size in (1, 5, 4096):
+            response = self._chunked_response(json.dumps(payload), chunk_size)
+            stream = http_client.stream_json_items(response, "recenttracks.track", chunk_size=chunk_size)
+            self.assertEqual(list(stream), payload["recenttracks"]["track"])
+            self.assertEqual(stream.fields, {"recenttracks": {"@attr": {"totalPages": "4"}}, "extra": True})
+            response.close.assert_called()
+
+    def test_stream_json_items_reports_missing_path_and_single_objects(self):
+        response = self._chunked_response('{"error": 8, "message": "x"}', 3)
+        with self.assertLogs("http_client", level="WARNING"):
+            error = http_client.stream_json_items(response, "a.b")
+        self.assertFalse(error.found)
+        # Closed without the caller iterating
+        response.close.assert_called()
+        self.assertEqual(list(error), [])
+        self.assertEqual(error.fields, {"error": 8, "message": "x"})
+
+        single = http_client.stream_json_items(self._chunked_response('{"a": {"b": {"id": 1}}}', 3), "a.b")
+        self.assertEqual(list(single), [{"id": 1}])
+
+    def test_stream_json_items_raises_on_truncated_json(self):
+        stream = http_client.stream_json_items(self._chunked_response('{"items": [1, {"a": ', 4), "items")
+
+        with self.assertRaises(http_client.ExternalRequestError):
+            list(stream)
+
+
+class HttpClientStatusEndpointTests(APITestCase):
+    def test_status_requires_staff(self):
+        user = User.objects.create_user(username="status-user", password="testpass123")
+        self.client.force_authenticate(user=user)
+
+        response = self.client.get("/http-client/status/")
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_metrics_are_staff_only_prometheus_text(self):
+        user = User.objects.create_user(username="metrics-user", password="testpass123")
+        self.client.force_authenticate(user=user)
+        self.assertEqual(self.client.get("/http-client/metrics/").status_code, status.HTTP_403_FORBIDDEN)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get("/http-client/metrics/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        self.assertIn(b"# TYPE http_client_request_duration_seconds histogram", response.content)
+
+    def test_status_lists_pools_for_staff(self):
+        staff = User.objects.create_user(username="status-staff", password="testpass123", is_staff=True)
+        self.client.force_authenticate(user=staff)
+
+        response = self.client.get("/http-client/status/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("pools", response.data)
+        self.assertIn("circuit_breakers", response.data)
+        self.assertIn("response_cache", response.data)
+
 
 class DetailEndpointTests(APITestCase):
     def setUp(self):
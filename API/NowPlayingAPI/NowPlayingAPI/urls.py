@@ -19,14 +19,16 @@ from django.contrib import admin
 from django.urls import include, path
 from rest_framework import routers
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework import status
 from rest_framework.response import Response
 from django.db.models import Q
 from django.core.cache import cache
 from django.conf import settings
+from django.http import HttpResponse
 import logging
 
+import http_client
 from retroachievements import views as retroachievements_views
 from steam import views as steam_views
 from playstation import views as psn_views
@@ -211,6 +213,21 @@ def games_detail(request):
     result['achievements'] = detail['achievements']
     return Response({'result': result})
 
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def http_client_status(request):
+    return Response({
+        'pools': http_client.pool_stats(),
+        'circuit_breakers': http_client.breaker_states(),
+        'response_cache': http_client.response_cache_stats(),
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def http_client_metrics(request):
+    return HttpResponse(http_client.prometheus_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 admin.autodiscover()
 
 router = routers.DefaultRouter()
@@ -231,4 +248,6 @@ urlpatterns = [
     path("users/", include("users.urls")),
     path("games/search/", games_search, name="games_search"),
     path("games/detail/", games_detail, name="games_detail"),
+    path("http-client/status/", http_client_status, name="http_client_status"),
+    path("http-client/metrics/", http_client_metrics, name="http_client_metrics"),
 ]
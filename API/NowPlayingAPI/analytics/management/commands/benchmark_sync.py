@@ -0,0 +1,89 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from music.models import Song
+from steam.models import SteamAPI
+from trakt.models import fetch_latest_watched_shows
+from users.credentials import get_service_credentials
+from xbox.models import XboxAPI
+
+
+def sync_steam(user):
+    credentials = get_service_credentials(user, "steam", require_user_id=True)
+    return SteamAPI.get_games(credentials.service_user_id, credentials.api_key, user=user)
+
+
+def sync_xbox(user):
+    credentials = get_service_credentials(user, "xbox", require_user_id=True)
+    return XboxAPI.fetch_games(user=user, xbox_api_key=credentials.api_key, xuid=credentials.service_user_id)
+
+
+def sync_lastfm(user):
+    credentials = get_service_credentials(user, "lastfm", require_user_id=True)
+    return Song.fetch_lastfm_recent_tracks(user, credentials.api_key, credentials.service_user_id, limit=None)
+
+
+def sync_trakt(user):
+    return fetch_latest_watched_shows(user)
+
+
+SYNCS = {
+    "steam": sync_steam,
+    "xbox": sync_xbox,
+    "lastfm": sync_lastfm,
+    "trakt": sync_trakt,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the Steam, Xbox, Last.fm and Trakt syncs for a user and count their queries. "
+        "Run it against `replay_upstream` (HTTP_CLIENT_REPLAY_URL) for repeatable numbers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", required=True, help="Username whose stored credentials are used")
+        parser.add_argument(
+            "--services",
+            default=",".join(SYNCS),
+            help=f"Comma-separated subset of: {', '.join(SYNCS)}",
+        )
+        parser.add_argument("--repeat", type=int, default=1)
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options["user"])
+        except User.DoesNotExist as exc:
+            raise CommandError(f"User '{options['user']}' not found") from exc
+
+        services = [name.strip() for name in options["services"].split(",") if name.strip()]
+        unknown = set(services) - set(SYNCS)
+        if unknown:
+            raise CommandError(f"Unknown services: {', '.join(sorted(unknown))}")
+
+        if settings.HTTP_CLIENT_REPLAY_URL:
+            self.stdout.write(f"Replaying upstreams from {settings.HTTP_CLIENT_REPLAY_URL}")
+        else:
+            self.stdout.write(self.style.WARNING("HTTP_CLIENT_REPLAY_URL is not set; calling live upstreams."))
+
+        for service in services:
+            for run in range(1, options["repeat"] + 1):
+                started = time.perf_counter()
+                error = None
+                with CaptureQueriesContext(connection) as queries:
+                    try:
+                        SYNCS[service](user)
+                    except Exception as exc:
+                        error = exc
+                elapsed = time.perf_counter() - started
+
+                line = f"{service:<8} run {run}: {elapsed:8.2f}s  {len(queries):6d} queries"
+                if error is not None:
+                    self.stdout.write(self.style.ERROR(f"{line}  failed: {error}"))
+                else:
+                    self.stdout.write(self.style.SUCCESS(line))
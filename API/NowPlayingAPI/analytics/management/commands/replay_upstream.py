@@ -0,0 +1,108 @@
+import base64
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+import http_client
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve captured upstream fixtures (see HTTP_CLIENT_CAPTURE_DIR) so syncs can run offline. "
+        "Point HTTP_CLIENT_REPLAY_URL at this server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fixtures", default=settings.HTTP_CLIENT_CAPTURE_DIR or "upstream_fixtures")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--latency", type=float, default=0, help="Mean added latency in milliseconds")
+        parser.add_argument("--jitter", type=float, default=0, help="Random +/- latency in milliseconds")
+        parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests answered with 503")
+        parser.add_argument("--throttle-rate", type=float, default=0, help="Fraction of requests answered with 429")
+        parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with injected 429s")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        fixtures = Path(options["fixtures"])
+        if not fixtures.is_dir():
+            raise CommandError(f"Fixture directory {fixtures} does not exist.")
+
+        rng = random.Random(options["seed"])
+        stdout = self.stdout
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                self.drain_body()
+                self.replay()
+
+            def do_POST(self):
+                # Capture only records GETs, so there is never a POST fixture to replay
+                self.drain_body()
+                body = json.dumps({"error": "Only GET requests are captured and replayed"}).encode()
+                self.send_fixture(501, {"Content-Type": "application/json"}, body)
+
+            def drain_body(self):
+                # Unread request bytes would be parsed as the next request on this keep-alive connection
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > 0:
+                    self.rfile.read(length)
+
+            def replay(self):
+                delay = options["latency"] + rng.uniform(-options["jitter"], options["jitter"])
+                if delay > 0:
+                    time.sleep(delay / 1000)
+
+                roll = rng.random()
+                if roll < options["throttle_rate"]:
+                    return self.send_fixture(429, {"Retry-After": str(options["retry_after"])}, b"")
+                if roll < options["throttle_rate"] + options["error_rate"]:
+                    return self.send_fixture(503, {}, b"")
+
+                # Paths look like /<scheme>/<host>/<original path>?<original query>.
+                scheme, _, rest = self.path.lstrip("/").partition("/")
+                url = http_client.redact_url(f"{scheme}://{rest}")
+                path = fixtures / http_client.fixture_path(self.command, url)
+                if not path.is_file():
+                    stdout.write(f"No fixture for {self.command} {url}")
+                    body = json.dumps({"error": "No fixture recorded", "url": url}).encode()
+                    return self.send_fixture(404, {"Content-Type": "application/json"}, body)
+
+                fixture = json.loads(path.read_text())
+                if "body_base64" in fixture:
+                    body = base64.b64decode(fixture["body_base64"])
+                else:
+                    body = fixture.get("body", "").encode("utf-8")
+                self.send_fixture(fixture["status"], fixture.get("headers", {}), body)
+
+            def send_fixture(self, status, headers, body):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((options["host"], options["port"]), ReplayHandler)
+        server.daemon_threads = True
+        self.stdout.write(self.style.SUCCESS(
+            f"Replaying fixtures from {fixtures} on http://{options['host']}:{options['port']} "
+            f"(latency {options['latency']}±{options['jitter']}ms, "
+            f"errors {options['error_rate']:.0%}, 429s {options['throttle_rate']:.0%})"
+        ))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -1,70 +1,1168 @@
+import asyncio
+import base64
+import codecs
+import contextvars
+import hashlib
+import json
 import logging
+import os
+import random
+import re
+import threading
 import time
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit
 
+import redis
 import requests
+from django.conf import settings
+from django.core.cache import cache
+from pyrate_limiter import BucketFullException, Limiter, MemoryQueueBucket, RedisBucket, RequestRate
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_TIMEOUT = (5, 30)
 RETRY_STATUSES = {429, 500, 502, 503, 504}
 
+DEFAULT_FANOUT = 8
+STREAM_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_RETRY_POLICY = {
+    "RETRIES": 2,
+    "BACKOFF": 1,
+    "MAX_BACKOFF": 30,
+    "DEADLINE": 60,
+}
+
+DEFAULT_POOL_CONFIG = {
+    "POOL_MAXSIZE": 10,
+    "POOL_BLOCK": False,
+    "IDLE_TIMEOUT": 60,
+}
+
+DEFAULT_BREAKER_CONFIG = {
+    "FAILURE_THRESHOLD": 5,
+    "COOLDOWN": 60,
+}
+BREAKER_KEY_PREFIX = "http_breaker"
+BREAKER_HOSTS_KEY = f"{BREAKER_KEY_PREFIX}:hosts"
+
+RESPONSE_CACHE_PREFIX = "http_cache"
+DEFAULT_STALE_TTL = 7 * 24 * 3600
+# Headers a 304 may carry that replace the stored ones (RFC 9111 section 4.3.4).
+REVALIDATION_HEADERS = ("Cache-Control", "Date", "ETag", "Expires", "Last-Modified")
+
+COALESCE_PREFIX = "http_coalesce"
+DEFAULT_COALESCE_CONFIG = {
+    "LOCK_TIMEOUT": 30,
+    "RESULT_TTL": 5,
+}
+COALESCE_POLL_INTERVAL = 0.05
+# Request headers that change what the upstream returns; anything else is ignored when coalescing.
+COALESCE_HEADERS = ("accept", "accept-language", "authorization", "cookie", "x-authorization")
+
+# Query parameters that carry credentials; fixtures never store their values.
+REDACTED_PARAMS = {"access_token", "api_key", "apikey", "client_secret", "code", "key", "refresh_token", "token", "y"}
+# Response headers worth keeping in captured fixtures.
+CAPTURED_HEADERS = ("Cache-Control", "Content-Type", "ETag", "Last-Modified", "Retry-After")
+
+_sessions: dict[str, "_PooledSession"] = {}
+_sessions_lock = threading.Lock()
+_sessions_pid = os.getpid()
+
+_limiters: dict[str, tuple[Limiter, threading.Lock] | None] = {}
+_limiters_lock = threading.Lock()
+_rate_limit_pool: redis.ConnectionPool | None = None
+
+_response_cache_counts = {"hits": 0, "revalidated": 0, "misses": 0}
+_response_cache_lock = threading.Lock()
+
+_flights: dict[str, "_Flight"] = {}
+_flights_lock = threading.Lock()
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+_metrics_lock = threading.Lock()
+_latency: dict[tuple[str, str], dict] = {}
+_status_counts: dict[tuple[str, str, str], int] = {}
+_retry_counts: dict[tuple[str, str], int] = {}
+_received_bytes: dict[tuple[str, str], int] = {}
+_in_flight: dict[tuple[str, str], int] = {}
+
+_current_sync: contextvars.ContextVar["_SyncRun | None"] = contextvars.ContextVar("http_client_sync", default=None)
+
 
 class ExternalRequestError(Exception):
     pass
 
 
-def request_json(
-    method: str,
-    url: str,
-    *,
-    retries: int = 2,
-    timeout=DEFAULT_TIMEOUT,
-    logger_name: str | None = None,
-    **kwargs: Any,
-) -> Any:
-    response = request(method, url, retries=retries, timeout=timeout, logger_name=logger_name, **kwargs)
+class CircuitOpenError(ExternalRequestError):
+    """Raised without contacting the upstream while its circuit breaker is open."""
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    How ``request`` retries a call: up to ``retries`` extra attempts, sleeping a
+    full-jitter exponential backoff (or the upstream's ``Retry-After``) between
+    them, and never spending more than ``deadline`` seconds on the whole call.
+    """
+
+    retries: int = DEFAULT_RETRY_POLICY["RETRIES"]
+    backoff: float = DEFAULT_RETRY_POLICY["BACKOFF"]
+    max_backoff: float = DEFAULT_RETRY_POLICY["MAX_BACKOFF"]
+    deadline: float | None = DEFAULT_RETRY_POLICY["DEADLINE"]
+    statuses: frozenset[int] = frozenset(RETRY_STATUSES)
+
+    def delay(self, attempt: int, response: requests.Response | None = None) -> float:
+        """Seconds to wait before retrying after ``attempt`` (0-based) failed."""
+        retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a ``Retry-After`` header (delta-seconds or HTTP-date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def get_retry_policy(service: str | None = None) -> RetryPolicy:
+    """The retry preset for ``service`` from settings.HTTP_RETRY_POLICIES, over the "default" entry."""
+    presets = getattr(settings, "HTTP_RETRY_POLICIES", {})
+    config = {**DEFAULT_RETRY_POLICY, **presets.get("default", {}), **presets.get(service, {})}
+    return RetryPolicy(
+        retries=config["RETRIES"],
+        backoff=config["BACKOFF"],
+        max_backoff=config["MAX_BACKOFF"],
+        deadline=config["DEADLINE"],
+    )
+
+
+class _Flight:
+    """An in-progress coalesced GET that other threads in this process can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.entry: dict | None = None
+        self.error: BaseException | None = None
+
+
+class _PooledSession:
+    """A keep-alive ``requests.Session`` dedicated to a single upstream host."""
+
+    def __init__(self, host: str, config: dict):
+        self.host = host
+        self.pool_maxsize = config["POOL_MAXSIZE"]
+        self.idle_timeout = config["IDLE_TIMEOUT"]
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=config["POOL_BLOCK"],
+            max_retries=0,
+        )
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.requests = 0
+
+    def is_idle(self, now: float) -> bool:
+        return bool(self.idle_timeout) and now - self.last_used > self.idle_timeout
+
+    def touch(self) -> None:
+        self.last_used = time.monotonic()
+        self.requests += 1
+
+    def stats(self) -> dict:
+        pools = self.adapter.poolmanager.pools
+        connections_opened = 0
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is not None:
+                connections_opened += pool.num_connections
+        return {
+            "host": self.host,
+            "requests": self.requests,
+            "connections_opened": connections_opened,
+            "pool_maxsize": self.pool_maxsize,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+    def close(self) -> None:
+        self.session.close()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _pool_config(host: str) -> dict:
+    configured = getattr(settings, "HTTP_CLIENT_POOL", {})
+    config = {**DEFAULT_POOL_CONFIG, **{k: v for k, v in configured.items() if k != "HOSTS"}}
+    netloc = urlsplit(host).netloc
+    config.update(configured.get("HOSTS", {}).get(netloc, {}))
+    return config
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Return the shared keep-alive session for the upstream host of ``url``.
+
+    Sessions are created lazily per process (gunicorn forks after ``--preload``)
+    and recycled once they have been idle longer than the configured timeout,
+    since most providers drop idle keep-alive connections on their side.
+    """
+    global _sessions_pid
+
+    host = _host_key(url)
+    now = time.monotonic()
+    stale = None
+    with _sessions_lock:
+        if _sessions_pid != os.getpid():
+            _sessions.clear()
+            _sessions_pid = os.getpid()
+
+        pooled = _sessions.get(host)
+        if pooled is not None and pooled.is_idle(now):
+            stale = pooled
+            pooled = None
+        if pooled is None:
+            pooled = _PooledSession(host, _pool_config(host))
+            _sessions[host] = pooled
+        pooled.touch()
+
+    if stale is not None:
+        stale.close()
+    return pooled.session
+
+
+def pool_stats() -> list[dict]:
+    """Per-host connection pool statistics for this worker process."""
+    with _sessions_lock:
+        pooled_sessions = list(_sessions.values())
+    return sorted((pooled.stats() for pooled in pooled_sessions), key=lambda item: item["host"])
+
+
+def close_sessions() -> None:
+    with _sessions_lock:
+        pooled_sessions = list(_sessions.values())
+        _sessions.clear()
+    for pooled in pooled_sessions:
+        pooled.close()
+
+
+def _rate_limiter(service: str) -> tuple[Limiter, threading.Lock] | None:
+    global _rate_limit_pool
+
+    with _limiters_lock:
+        if service in _limiters:
+            return _limiters[service]
+
+        rates = getattr(settings, "HTTP_RATE_LIMITS", {}).get(service)
+        if not rates:
+            _limiters[service] = None
+            return None
+
+        redis_url = getattr(settings, "HTTP_RATE_LIMIT_REDIS_URL", "")
+        if redis_url:
+            if _rate_limit_pool is None:
+                _rate_limit_pool = redis.ConnectionPool.from_url(redis_url)
+            bucket_class = RedisBucket
+            bucket_kwargs = {
+                "redis_pool": _rate_limit_pool,
+                "bucket_name": "nowplaying:http_rate",
+                "expire_time": max(interval for _, interval in rates),
+            }
+        else:
+            bucket_class = MemoryQueueBucket
+            bucket_kwargs = {}
+
+        # Wall-clock time, not monotonic: bucket entries are compared across processes.
+        limiter = Limiter(
+            *(RequestRate(limit, interval) for limit, interval in rates),
+            bucket_class=bucket_class,
+            bucket_kwargs=bucket_kwargs,
+            time_function=time.time,
+        )
+        _limiters[service] = (limiter, threading.Lock())
+        return _limiters[service]
+
+
+def wait_for_rate_limit(service: str | None, log: logging.Logger = logger, deadline: float | None = None) -> None:
+    """
+    Block until ``service`` has budget for one more request.
+
+    Budgets come from settings.HTTP_RATE_LIMITS and live in Redis, so every
+    gunicorn worker and background sync thread draws from the same bucket. If
+    Redis is unreachable the request goes ahead unthrottled. If the wait would
+    run past ``deadline`` (a ``time.monotonic()`` value) ``ExternalRequestError``
+    is raised instead.
+    """
+    entry = _rate_limiter(service) if service else None
+    if entry is None:
+        return
+
+    limiter, lock = entry
+    while True:
+        try:
+            with lock:
+                limiter.try_acquire(service)
+            return
+        except BucketFullException as exc:
+            delay = float(exc.meta_info["remaining_time"])
+            if deadline is not None and time.monotonic() + delay > deadline:
+                raise ExternalRequestError("External service request budget exhausted.") from exc
+            log.debug("Rate limit reached for %s; waiting %.2fs", service, delay)
+            time.sleep(max(delay, 0.01))
+        except redis.RedisError as exc:
+            log.warning("Rate limiter unavailable for %s, continuing unthrottled: %s", service, exc)
+            return
+
+
+class _SyncRun:
+    """Outbound request totals for one sync run, logged as a summary when it ends."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.bytes = 0
+        self.endpoints: dict[str, list] = {}
+
+    def observe(self, url: str, elapsed: float, size: int) -> None:
+        parts = urlsplit(url)
+        # Collapse numeric path segments so /shows/1/seasons/2 and /shows/3/seasons/4 aggregate.
+        endpoint = parts.netloc + re.sub(r"/\d+(?=/|$)", "/{id}", parts.path)
+        with self.lock:
+            self.requests += 1
+            self.bytes += size
+            totals = self.endpoints.setdefault(endpoint, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+
+    def log_summary(self) -> None:
+        top = sorted(self.endpoints.items(), key=lambda item: item[1][1], reverse=True)[:5]
+        logger.info(
+            "Sync %s finished in %.1fs: %s upstream requests, %s retries, %.1f KiB received. Slowest endpoints: %s",
+            self.name,
+            time.monotonic() - self.started,
+            self.requests,
+            self.retries,
+            self.bytes / 1024,
+            "; ".join(f"{endpoint} {count}x {seconds:.1f}s" for endpoint, (count, seconds) in top) or "none",
+        )
+
+
+@contextmanager
+def track_sync(name: str):
+    """
+    Collect outbound request totals for a sync run and log a summary when it ends.
+
+    Usable as a decorator or a ``with`` block. Requests made from ``gather``
+    worker threads are included; nested runs fold into the outermost one.
+    """
+    if _current_sync.get() is not None:
+        yield
+        return
+
+    run = _SyncRun(name)
+    token = _current_sync.set(run)
+    try:
+        yield
+    finally:
+        _current_sync.reset(token)
+        run.log_summary()
+
+
+def _metric_labels(service: str | None, url: str) -> tuple[str, str]:
+    return service or "default", urlsplit(url).netloc.lower()
+
+
+@contextmanager
+def _track_in_flight(labels: tuple[str, str]):
+    with _metrics_lock:
+        _in_flight[labels] = _in_flight.get(labels, 0) + 1
+    try:
+        yield
+    finally:
+        with _metrics_lock:
+            _in_flight[labels] -= 1
+
+
+def _observe_request(labels: tuple[str, str], url: str, status: str, elapsed: float, size: int) -> None:
+    with _metrics_lock:
+        histogram = _latency.setdefault(labels, {"buckets": [0] * len(LATENCY_BUCKETS), "sum": 0.0, "count": 0})
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                histogram["buckets"][index] += 1
+        histogram["sum"] += elapsed
+        histogram["count"] += 1
+        _status_counts[(*labels, status)] = _status_counts.get((*labels, status), 0) + 1
+        _received_bytes[labels] = _received_bytes.get(labels, 0) + size
+
+    run = _current_sync.get()
+    if run is not None:
+        run.observe(url, elapsed, size)
+
+
+def _count_retry(labels: tuple[str, str]) -> None:
+    with _metrics_lock:
+        _retry_counts[labels] = _retry_counts.get(labels, 0) + 1
+    run = _current_sync.get()
+    if run is not None:
+        with run.lock:
+            run.retries += 1
+
+
+def _prometheus_labels(**labels: Any) -> str:
+    pairs = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def prometheus_metrics() -> str:
+    """This worker's outbound request metrics in the Prometheus text exposition format."""
+    with _metrics_lock:
+        latency = {labels: {**data, "buckets": list(data["buckets"])} for labels, data in _latency.items()}
+        statuses = dict(_status_counts)
+        retries = dict(_retry_counts)
+        received = dict(_received_bytes)
+        in_flight = dict(_in_flight)
+    cache_counts = response_cache_stats()
+
+    lines = [
+        "# HELP http_client_request_duration_seconds Upstream request latency per attempt.",
+        "# TYPE http_client_request_duration_seconds histogram",
+    ]
+    for (service, host), data in sorted(latency.items()):
+        for bound, count in zip(LATENCY_BUCKETS, data["buckets"]):
+            lines.append(
+                f"http_client_request_duration_seconds_bucket{_prometheus_labels(service=service, host=host, le=bound)} {count}"
+            )
+        lines.append(
+            f"http_client_request_duration_seconds_bucket{_prometheus_labels(service=service, host=host, le='+Inf')} {data['count']}"
+        )
+        lines.append(f"http_client_request_duration_seconds_sum{_prometheus_labels(service=service, host=host)} {data['sum']}")
+        lines.append(f"http_client_request_duration_seconds_count{_prometheus_labels(service=service, host=host)} {data['count']}")
+
+    lines += [
+        "# HELP http_client_responses_total Upstream attempts by status code (\"error\" for network failures).",
+        "# TYPE http_client_responses_total counter",
+    ]
+    for (service, host, status), count in sorted(statuses.items()):
+        lines.append(f"http_client_responses_total{_prometheus_labels(service=service, host=host, status=status)} {count}")
+
+    lines += [
+        "# HELP http_client_retries_total Upstream attempts that were retried.",
+        "# TYPE http_client_retries_total counter",
+    ]
+    for (service, host), count in sorted(retries.items()):
+        lines.append(f"http_client_retries_total{_prometheus_labels(service=service, host=host)} {count}")
+
+    lines += [
+        "# HELP http_client_received_bytes_total Response body bytes received from upstreams.",
+        "# TYPE http_client_received_bytes_total counter",
+    ]
+    for (service, host), count in sorted(received.items()):
+        lines.append(f"http_client_received_bytes_total{_prometheus_labels(service=service, host=host)} {count}")
+
+    lines += [
+        "# HELP http_client_in_flight_requests Upstream requests currently in progress.",
+        "# TYPE http_client_in_flight_requests gauge",
+    ]
+    for (service, host), count in sorted(in_flight.items()):
+        lines.append(f"http_client_in_flight_requests{_prometheus_labels(service=service, host=host)} {count}")
+
+    lines += [
+        "# HELP http_client_response_cache_total Cached GET lookups by outcome.",
+        "# TYPE http_client_response_cache_total counter",
+    ]
+    for outcome, count in sorted(cache_counts.items()):
+        lines.append(f"http_client_response_cache_total{_prometheus_labels(outcome=outcome)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _breaker_config() -> dict:
+    return {**DEFAULT_BREAKER_CONFIG, **getattr(settings, "HTTP_CIRCUIT_BREAKER", {})}
+
+
+def _breaker_key(host: str) -> str:
+    return f"{BREAKER_KEY_PREFIX}:{host}"
+
+
+def _register_breaker_host(host: str) -> None:
+    hosts = cache.get(BREAKER_HOSTS_KEY) or []
+    if host not in hosts:
+        cache.set(BREAKER_HOSTS_KEY, sorted([*hosts, host]), timeout=None)
+
+
+def check_circuit(url: str, log: logging.Logger = logger) -> None:
+    """
+    Raise ``CircuitOpenError`` if requests to the host of ``url`` should fail fast.
+
+    Once the cooldown has elapsed the breaker is half-open: exactly one caller
+    across all workers is let through as a probe, everyone else keeps failing
+    fast until the probe succeeds or re-opens the circuit.
+    """
+    host = _host_key(url)
+    try:
+        state = cache.get(_breaker_key(host))
+        if not state or state["state"] != "open":
+            return
+        cooldown = _breaker_config()["COOLDOWN"]
+        if time.time() - state["opened_at"] >= cooldown and cache.add(
+            f"{_breaker_key(host)}:probe", 1, timeout=cooldown
+        ):
+            log.info("Circuit half-open for %s, sending probe request", host)
+            return
+    except redis.RedisError as exc:
+        log.warning("Circuit breaker state unavailable for %s: %s", host, exc)
+        return
+    raise CircuitOpenError(f"{host} is temporarily unavailable.")
+
+
+def record_success(url: str, log: logging.Logger = logger) -> None:
+    host = _host_key(url)
+    try:
+        state = cache.get(_breaker_key(host))
+        if not state or (state["state"] == "closed" and not state["failures"]):
+            return
+        if state["state"] == "open":
+            log.info("Circuit closed for %s", host)
+        cache.set(_breaker_key(host), {"state": "closed", "failures": 0, "opened_at": None}, timeout=None)
+        cache.delete(f"{_breaker_key(host)}:probe")
+    except redis.RedisError as exc:
+        log.warning("Circuit breaker state unavailable for %s: %s", host, exc)
+
+
+def record_failure(url: str, log: logging.Logger = logger) -> bool:
+    """Count a failed attempt against the host of ``url``; return True if the circuit is now open."""
+    host = _host_key(url)
+    config = _breaker_config()
+    try:
+        state = cache.get(_breaker_key(host)) or {"state": "closed", "failures": 0, "opened_at": None}
+        failures = state["failures"] + 1
+        # A failed half-open probe re-opens the circuit for another full cooldown.
+        if state["state"] == "open" or failures >= config["FAILURE_THRESHOLD"]:
+            if state["state"] != "open":
+                log.warning("Circuit opened for %s after %s consecutive failures", host, failures)
+            state = {"state": "open", "failures": failures, "opened_at": time.time()}
+        else:
+            state = {**state, "failures": failures}
+        cache.set(_breaker_key(host), state, timeout=None)
+        cache.delete(f"{_breaker_key(host)}:probe")
+        _register_breaker_host(host)
+    except redis.RedisError as exc:
+        log.warning("Circuit breaker state unavailable for %s: %s", host, exc)
+        return False
+    return state["state"] == "open"
+
+
+def breaker_states() -> list[dict]:
+    """Circuit breaker state for every host that has recorded a failure."""
+    cooldown = _breaker_config()["COOLDOWN"]
+    now = time.time()
+    states = []
+    for host in cache.get(BREAKER_HOSTS_KEY) or []:
+        state = cache.get(_breaker_key(host))
+        if not state:
+            continue
+        retry_in = None
+        if state["state"] == "open":
+            retry_in = max(round(state["opened_at"] + cooldown - now, 1), 0)
+        states.append({"host": host, "state": state["state"], "failures": state["failures"], "retry_in": retry_in})
+    return states
+
+
+def request_json(method: str, url: str, **kwargs: Any) -> Any:
+    response = request(method, url, **kwargs)
     try:
         return response.json()
     except ValueError as exc:
         raise ExternalRequestError(f"Invalid JSON response from {url}") from exc
 
 
+def response_cache_ttl(name: str) -> int:
+    """Freshness lifetime configured in settings.HTTP_RESPONSE_CACHE["TTLS"] for ``name``."""
+    return getattr(settings, "HTTP_RESPONSE_CACHE", {}).get("TTLS", {}).get(name, 0)
+
+
+def response_cache_stats() -> dict:
+    """Hit/revalidate/miss counts for cached GETs in this worker process."""
+    with _response_cache_lock:
+        return dict(_response_cache_counts)
+
+
+def _count_cache(outcome: str) -> None:
+    with _response_cache_lock:
+        _response_cache_counts[outcome] += 1
+
+
+def _response_cache_key(url: str, kwargs: dict) -> str:
+    # Headers are part of the key so per-user (authorized) responses never mix.
+    material = json.dumps(
+        [url, kwargs.get("params"), kwargs.get("headers")],
+        sort_keys=True,
+        default=str,
+    )
+    return f"{RESPONSE_CACHE_PREFIX}:{hashlib.sha256(material.encode()).hexdigest()}"
+
+
+def _freshness_lifetime(headers, default_ttl: int) -> int | None:
+    """Seconds a response may be served without revalidation, or None if it must not be stored."""
+    directives = {}
+    for part in headers.get("Cache-Control", "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    if "max-age" in directives:
+        try:
+            return max(int(directives["max-age"]), 0)
+        except ValueError:
+            pass
+    return default_ttl
+
+
+def _store_response(key: str, response: requests.Response, default_ttl: int, log: logging.Logger) -> None:
+    lifetime = _freshness_lifetime(response.headers, default_ttl)
+    if lifetime is None:
+        return
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    # Without validators an expired entry is useless, so only keep it while fresh.
+    timeout = lifetime
+    if etag or last_modified:
+        timeout += getattr(settings, "HTTP_RESPONSE_CACHE", {}).get("STALE_TTL", DEFAULT_STALE_TTL)
+    if timeout <= 0:
+        return
+
+    entry = {
+        **_entry_from_response(response),
+        "etag": etag,
+        "last_modified": last_modified,
+        "fresh_until": time.time() + lifetime,
+    }
+    try:
+        cache.set(key, entry, timeout=timeout)
+    except redis.RedisError as exc:
+        log.warning("Response cache unavailable, not storing %s: %s", response.url, exc)
+
+
+def _entry_from_response(response: requests.Response) -> dict:
+    return {
+        "status": response.status_code,
+        "headers": dict(response.headers),
+        "content": response.content,
+    }
+
+
+def _response_from_entry(entry: dict, url: str) -> requests.Response:
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = requests.structures.CaseInsensitiveDict(entry["headers"])
+    response._content = entry["content"]
+    response.url = url
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
+
+
+def _cached_get(url: str, cache_ttl: int, log: logging.Logger, send: Callable[..., requests.Response], kwargs: dict):
+    key = _response_cache_key(url, kwargs)
+    try:
+        entry = cache.get(key)
+    except redis.RedisError as exc:
+        log.warning("Response cache unavailable, fetching %s directly: %s", url, exc)
+        return send(**kwargs)
+
+    if entry and entry["fresh_until"] > time.time():
+        _count_cache("hits")
+        return _response_from_entry(entry, url)
+
+    if entry:
+        headers = dict(kwargs.get("headers") or {})
+        if entry["etag"]:
+            headers["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        response = send(**{**kwargs, "headers": headers})
+        if response.status_code == 304:
+            _count_cache("revalidated")
+            entry["headers"].update(
+                {name: response.headers[name] for name in REVALIDATION_HEADERS if name in response.headers}
+            )
+            revalidated = _response_from_entry(entry, url)
+            _store_response(key, revalidated, cache_ttl, log)
+            return revalidated
+    else:
+        response = send(**kwargs)
+
+    _count_cache("misses")
+    if response.status_code == 200:
+        _store_response(key, response, cache_ttl, log)
+    return response
+
+
+def _coalesce_key(method: str, url: str, kwargs: dict) -> str:
+    headers = {
+        name.lower(): value
+        for name, value in (kwargs.get("headers") or {}).items()
+        if name.lower() in COALESCE_HEADERS or "key" in name.lower() or "token" in name.lower()
+    }
+    material = json.dumps([method.lower(), url, kwargs.get("params"), headers], sort_keys=True, default=str)
+    return f"{COALESCE_PREFIX}:{hashlib.sha256(material.encode()).hexdigest()}"
+
+
+def _fetch_once_across_workers(key: str, url: str, fetch: Callable[[], requests.Response], log: logging.Logger):
+    config = {**DEFAULT_COALESCE_CONFIG, **getattr(settings, "HTTP_CLIENT_COALESCE", {})}
+    lock_key = f"{key}:lock"
+    result_key = f"{key}:result"
+    try:
+        if not cache.add(lock_key, 1, timeout=config["LOCK_TIMEOUT"]):
+            deadline = time.monotonic() + config["LOCK_TIMEOUT"]
+            while time.monotonic() < deadline:
+                time.sleep(COALESCE_POLL_INTERVAL)
+                lock_held = cache.get(lock_key) is not None
+                entry = cache.get(result_key)
+                if entry:
+                    return _response_from_entry(entry, url)
+                if not lock_held:
+                    # The other worker gave up (error or timeout) without publishing a result.
+                    break
+            return fetch()
+    except redis.RedisError as exc:
+        log.warning("Request coalescing unavailable for %s: %s", url, exc)
+        return fetch()
+
+    try:
+        response = fetch()
+        cache.set(result_key, _entry_from_response(response), timeout=config["RESULT_TTL"])
+        return response
+    finally:
+        try:
+            cache.delete(lock_key)
+        except redis.RedisError:
+            pass
+
+
+def _coalesced(key: str, url: str, fetch: Callable[[], requests.Response], log: logging.Logger):
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return _response_from_entry(flight.entry, url)
+
+    try:
+        response = _fetch_once_across_workers(key, url, fetch, log)
+        flight.entry = _entry_from_response(response)
+        return response
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
 def request(
     method: str,
     url: str,
     *,
-    retries: int = 2,
+    retries: int | None = None,
+    retry_policy: RetryPolicy | None = None,
     timeout=DEFAULT_TIMEOUT,
     logger_name: str | None = None,
+    cache_ttl: int | None = None,
+    coalesce: bool = False,
     **kwargs: Any,
 ) -> requests.Response:
+    """
+    Send a request through the shared per-host session, with retries.
+
+    Retries follow ``retry_policy`` (default: the ``logger_name`` preset from
+    settings.HTTP_RETRY_POLICIES); ``retries`` overrides just its attempt count.
+    The policy deadline bounds the whole call, including backoff sleeps,
+    rate-limit waits and socket timeouts.
+
+    Pass ``cache_ttl`` (seconds, may be 0) on a GET to opt into the response
+    cache: bodies are stored with their ``ETag``/``Last-Modified`` validators,
+    served locally while fresh (``Cache-Control: max-age`` wins over
+    ``cache_ttl``), and revalidated with a conditional GET afterwards.
+
+    Pass ``coalesce=True`` on a GET to share one upstream call between
+    identical requests (method, URL, params and caller-identifying headers)
+    that are in flight at the same time, in this process and, through a
+    cache lock, in other workers.
+    """
     log = logging.getLogger(logger_name) if logger_name else logger
+    policy = retry_policy or get_retry_policy(logger_name)
+    if retries is not None:
+        policy = replace(policy, retries=retries)
+    send = partial(_send, method, url, policy, timeout, logger_name, log)
+
+    if method.lower() != "get":
+        return send(**kwargs)
+
+    if cache_ttl is None:
+        fetch = partial(send, **kwargs)
+    else:
+        fetch = partial(_cached_get, url, cache_ttl, log, send, kwargs)
+    if not coalesce:
+        return fetch()
+    return _coalesced(_coalesce_key(method, url, kwargs), url, fetch, log)
+
 
-    for attempt in range(retries + 1):
+def _body_size(response: requests.Response, kwargs: dict) -> int:
+    # Streamed bodies have not been read yet; fall back to the advertised length.
+    if kwargs.get("stream"):
         try:
-            response = requests.request(method, url, timeout=timeout, **kwargs)
+            return int(response.headers.get("Content-Length", 0))
+        except (TypeError, ValueError):
+            return 0
+    content = response.content
+    return len(content) if isinstance(content, (bytes, bytearray)) else 0
+
+
+def redact_url(url: str, params: Any = None) -> str:
+    """``url`` with ``params`` merged into a sorted query string and credential values replaced."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if isinstance(params, dict):
+        params = params.items()
+    for name, value in params or []:
+        values = value if isinstance(value, (list, tuple)) else [value]
+        query.extend((name, str(item)) for item in values if item is not None)
+    query = sorted((name, "REDACTED" if name.lower() in REDACTED_PARAMS else value) for name, value in query)
+    return parts._replace(netloc=parts.netloc.lower(), query=urlencode(query), fragment="").geturl()
+
+
+def fixture_path(method: str, url: str) -> Path:
+    """Fixture file, relative to the capture directory, for a request to ``url`` (as given by ``redact_url``)."""
+    digest = hashlib.sha256(f"{method.upper()} {url}".encode()).hexdigest()[:24]
+    return Path(urlsplit(url).netloc.replace(":", "_")) / f"{method.lower()}-{digest}.json"
+
+
+def _replay_target(url: str) -> str:
+    replay_url = getattr(settings, "HTTP_CLIENT_REPLAY_URL", "")
+    if not replay_url:
+        return url
+    parts = urlsplit(url)
+    target = f"{replay_url.rstrip('/')}/{parts.scheme}/{parts.netloc}{parts.path}"
+    return f"{target}?{parts.query}" if parts.query else target
+
+
+def _capture(method: str, url: str, kwargs: dict, response: requests.Response, log: logging.Logger) -> None:
+    capture_dir = getattr(settings, "HTTP_CLIENT_CAPTURE_DIR", "")
+    if not capture_dir or method.lower() != "get" or getattr(settings, "HTTP_CLIENT_REPLAY_URL", ""):
+        return
+
+    redacted = redact_url(url, kwargs.get("params"))
+    fixture = {
+        "method": method.upper(),
+        "url": redacted,
+        "status": response.status_code,
+        "headers": {name: response.headers[name] for name in CAPTURED_HEADERS if name in response.headers},
+    }
+    try:
+        fixture["body"] = response.content.decode("utf-8")
+    except UnicodeDecodeError:
+        fixture["body_base64"] = base64.b64encode(response.content).decode("ascii")
+    path = Path(capture_dir) / fixture_path(method, redacted)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(fixture, indent=2))
+    except OSError as exc:
+        log.warning("Could not capture fixture for %s: %s", redacted, exc)
+
+
+def _bounded_timeout(timeout, remaining: float | None):
+    if remaining is None or timeout is None:
+        return timeout
+    if isinstance(timeout, tuple):
+        return tuple(min(part, remaining) for part in timeout)
+    return min(timeout, remaining)
+
+
+def _send(
+    method: str,
+    url: str,
+    policy: RetryPolicy,
+    timeout,
+    logger_name: str | None,
+    log: logging.Logger,
+    **kwargs: Any,
+) -> requests.Response:
+    deadline = time.monotonic() + policy.deadline if policy.deadline else None
+
+    def remaining() -> float | None:
+        return None if deadline is None else deadline - time.monotonic()
+
+    labels = _metric_labels(logger_name, url)
+    target = _replay_target(url)
+    for attempt in range(policy.retries + 1):
+        if deadline and remaining() <= 0:
+            raise ExternalRequestError("External service request budget exhausted.")
+        check_circuit(url, log)
+        wait_for_rate_limit(logger_name, log, deadline)
+        started = time.monotonic()
+        try:
+            with _track_in_flight(labels):
+                response = get_session(target).request(
+                    method, target, timeout=_bounded_timeout(timeout, remaining()), **kwargs
+                )
         except requests.RequestException as exc:
-            if attempt >= retries:
+            _observe_request(labels, url, "error", time.monotonic() - started, 0)
+            circuit_open = record_failure(url, log)
+            delay = policy.delay(attempt)
+            if attempt >= policy.retries or circuit_open or (deadline and remaining() < delay):
                 log.warning("External request failed: %s %s (%s)", method.upper(), url, exc)
                 raise ExternalRequestError("External service request failed.") from exc
-            time.sleep(2**attempt)
+            _count_retry(labels)
+            time.sleep(delay)
             continue
 
-        if response.status_code not in RETRY_STATUSES or attempt >= retries:
+        _observe_request(labels, url, str(response.status_code), time.monotonic() - started, _body_size(response, kwargs))
+
+        if response.status_code >= 500:
+            circuit_open = record_failure(url, log)
+        else:
+            # 429 means the host is up but throttling us; that is the rate limiter's job.
+            circuit_open = False
+            if response.status_code != 429:
+                record_success(url, log)
+
+        if response.status_code not in policy.statuses or attempt >= policy.retries or circuit_open:
+            _capture(method, url, kwargs, response, log)
+            return response
+
+        delay = policy.delay(attempt, response)
+        if deadline and remaining() < delay:
+            log.warning(
+                "Not retrying %s %s after status %s: %.1fs backoff exceeds the deadline",
+                method.upper(),
+                url,
+                response.status_code,
+                delay,
+            )
             return response
 
         log.info(
-            "Retrying external request after status %s: %s %s",
+            "Retrying external request after status %s in %.1fs: %s %s",
             response.status_code,
+            delay,
             method.upper(),
             url,
         )
-        time.sleep(2**attempt)
+        _count_retry(labels)
+        # Release the connection of a streamed response we are not going to read.
+        response.close()
+        time.sleep(delay)
 
     raise ExternalRequestError("External service request failed.")
 
 
+class JSONItemStream:
+    """
+    Incrementally parse a JSON response, yielding the items of one nested array.
+
+    ``path`` names the array with dotted object keys (``"recenttracks.track"``).
+    Only the current item is held in memory while iterating; every other value
+    met along the path is collected into ``fields`` (mirroring the document's
+    shape), which is complete once iteration finishes. If the path is missing,
+    ``found`` is False, ``fields`` holds the whole document and the response is
+    closed straight away (with a warning logged). A lone object
+    where the array was expected is yielded as a single item.
+
+    Request the response with ``stream=True``; it is closed once iteration ends.
+    """
+
+    def __init__(self, response: requests.Response, path: str, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.response = response
+        self.path = path.split(".")
+        self.fields: dict = {}
+        self.found = False
+        self._chunks = iter(response.iter_content(chunk_size=chunk_size))
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self._levels: list[dict] = []
+        self._in_array = False
+        self._single: Any = None
+        self._consumed = False
+        try:
+            self._open()
+        except ValueError as exc:
+            response.close()
+            raise ExternalRequestError(f"Invalid JSON response from {response.url}") from exc
+        if not self.found:
+            # The whole document is already in ``fields`` (often an error payload); release the
+            # connection now rather than relying on the caller to iterate
+            logger.warning("JSON path %r not found in response from %s", path, response.url)
+            response.close()
+
+    def __iter__(self):
+        if self._consumed:
+            return
+        self._consumed = True
+        try:
+            if self._single is not None:
+                yield self._single
+            elif self._in_array:
+                while True:
+                    char = self._peek()
+                    if char == ",":
+                        self._pos += 1
+                    elif char == "]":
+                        self._pos += 1
+                        break
+                    else:
+                        yield self._value()
+            self._close_levels()
+        except ValueError as exc:
+            raise ExternalRequestError(f"Invalid JSON response from {self.response.url}") from exc
+        finally:
+            self.response.close()
+
+    def _read(self, wanted: int = 1) -> bool:
+        """Append chunks until at least ``wanted`` unparsed characters are buffered or input ends."""
+        if self._pos > len(self._buffer) // 2:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        start = len(self._buffer)
+        while not self._eof and len(self._buffer) - self._pos < wanted:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._eof = True
+                self._buffer += self._decoder.decode(b"", final=True)
+            else:
+                self._buffer += self._decoder.decode(chunk)
+        return len(self._buffer) > start
+
+    def _peek(self) -> str:
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in " \t\r\n":
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._read():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self._pos}")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # Truncated value: at least double what is buffered so retries stay linear.
+                if not self._read(2 * (len(self._buffer) - self._pos) + 1):
+                    raise
+                continue
+            # A number ending exactly at the buffer edge may continue in the next chunk.
+            if end == len(self._buffer) and not self._eof and self._read(len(self._buffer) - self._pos + 1):
+                continue
+            self._pos = end
+            return value
+
+    def _read_members(self, fields: dict, until_key: str | None = None) -> bool:
+        """Collect object members into ``fields``; stop after ``until_key``'s colon (True) or at ``}`` (False)."""
+        while True:
+            char = self._peek()
+            if char == ",":
+                self._pos += 1
+                continue
+            if char == "}":
+                self._pos += 1
+                return False
+            name = self._value()
+            if not isinstance(name, str):
+                raise ValueError(f"Expected an object key at offset {self._pos}")
+            self._expect(":")
+            if name == until_key:
+                return True
+            fields[name] = self._value()
+
+    def _open(self) -> None:
+        self._expect("{")
+        level = self.fields
+        self._levels.append(level)
+        for index, key in enumerate(self.path):
+            if not self._read_members(level, key):
+                self._levels.pop()
+                self._close_levels()
+                return
+            if index == len(self.path) - 1:
+                self.found = True
+                if self._peek() == "[":
+                    self._pos += 1
+                    self._in_array = True
+                else:
+                    self._single = self._value()
+                return
+            if self._peek() != "{":
+                level[key] = self._value()
+                self._close_levels()
+                return
+            self._pos += 1
+            level[key] = {}
+            level = level[key]
+            self._levels.append(level)
+
+    def _close_levels(self) -> None:
+        while self._levels:
+            self._read_members(self._levels.pop())
+
+
+def stream_json_items(response: requests.Response, path: str, chunk_size: int = STREAM_CHUNK_SIZE) -> JSONItemStream:
+    """Items of the array at dotted ``path`` in a ``stream=True`` response; see ``JSONItemStream``."""
+    return JSONItemStream(response, path, chunk_size)
+
+
 def get(url: str, **kwargs: Any) -> requests.Response:
     return request("get", url, **kwargs)
 
@@ -80,3 +1178,97 @@ def get_json(url: str, **kwargs: Any) -> Any:
 def post_json(url: str, **kwargs: Any) -> Any:
     return request_json("post", url, **kwargs)
 
+
+async def request_async(method: str, url: str, **kwargs: Any) -> requests.Response:
+    """
+    Async counterpart of ``request``.
+
+    The call runs the pooled sync client in a worker thread, so retries and
+    ``ExternalRequestError`` behave exactly as they do for ``request``.
+    """
+    return await asyncio.to_thread(request, method, url, **kwargs)
+
+
+async def request_json_async(method: str, url: str, **kwargs: Any) -> Any:
+    """Async counterpart of ``request_json``."""
+    return await asyncio.to_thread(request_json, method, url, **kwargs)
+
+
+def fanout_limit(service: str | None) -> int:
+    """Concurrency cap for batched calls to ``service`` (a ``logger_name``)."""
+    limits = getattr(settings, "HTTP_CLIENT_FANOUT", {})
+    return limits.get(service, limits.get("default", DEFAULT_FANOUT))
+
+
+async def _gather(
+    fetch: Callable[..., Any],
+    calls: Iterable[dict],
+    concurrency: int,
+    return_exceptions: bool,
+) -> list:
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(executor, call):
+        call = dict(call)
+        method = call.pop("method", "get")
+        url = call.pop("url")
+        async with semaphore:
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                executor, partial(context.run, fetch, method, url, **call)
+            )
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="http_client") as executor:
+        return await asyncio.gather(
+            *(run(executor, call) for call in calls),
+            return_exceptions=return_exceptions,
+        )
+
+
+async def gather_async(
+    calls: Iterable[dict],
+    *,
+    concurrency: int = DEFAULT_FANOUT,
+    return_exceptions: bool = False,
+) -> list:
+    return await _gather(request, calls, concurrency, return_exceptions)
+
+
+async def gather_json_async(
+    calls: Iterable[dict],
+    *,
+    concurrency: int = DEFAULT_FANOUT,
+    return_exceptions: bool = False,
+) -> list:
+    return await _gather(request_json, calls, concurrency, return_exceptions)
+
+
+def gather(
+    calls: Iterable[dict],
+    *,
+    concurrency: int = DEFAULT_FANOUT,
+    return_exceptions: bool = False,
+) -> list:
+    """
+    Send independent requests concurrently, at most ``concurrency`` at a time.
+
+    Each call is a dict of ``request`` keyword arguments plus ``url`` and an
+    optional ``method`` (default ``"get"``). Responses come back in the same
+    order as ``calls``; with ``return_exceptions=True`` a failed call yields its
+    ``ExternalRequestError`` instead of aborting the batch.
+
+    Requests run in worker threads, so keep database access on the calling
+    thread. Must be called from sync code (no running event loop).
+    """
+    return asyncio.run(gather_async(calls, concurrency=concurrency, return_exceptions=return_exceptions))
+
+
+def gather_json(
+    calls: Iterable[dict],
+    *,
+    concurrency: int = DEFAULT_FANOUT,
+    return_exceptions: bool = False,
+) -> list:
+    """Like ``gather`` but returns decoded JSON bodies, as ``request_json`` does."""
+    return asyncio.run(gather_json_async(calls, concurrency=concurrency, return_exceptions=return_exceptions))
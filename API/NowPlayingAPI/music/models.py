@@ -11,6 +11,8 @@ import http_client
 logger = logging.getLogger(__name__)
 
 
+LASTFM_TRANSIENT_ERRORS = {8, 11, 16, 29}
+
 MUSIC_TAG_STOPWORDS = {
     "00s",
     "10s",
@@ -207,6 +209,7 @@ class Song(models.Model):
             return []
 
     @staticmethod
+    @http_client.track_sync("spotify.recent")
     def fetch_recently_played_songs(user, spotify_token):
         """
         Fetches the latest 50 recently played songs from Spotify using the API,
@@ -276,6 +279,7 @@ class Song(models.Model):
         return result
 
     @staticmethod
+    @http_client.track_sync("lastfm.recent")
     def fetch_lastfm_recent_tracks(user, lastfm_api_key, lastfm_username, limit=None, max_tag_lookups=300):
         """
         Fetches ALL recent tracks from Last.fm using the user.getRecentTracks API method,
@@ -285,7 +289,8 @@ class Song(models.Model):
         url = "http://ws.audioscrobbler.com/2.0/"
         page = 1
         total_fetched = 0
-        all_tracks = []
+        result = []
+        artist_tag_cache = {}
         
         # If no limit specified, we'll fetch all tracks (Last.fm max is 1000 per page)
         if limit is None:
@@ -293,8 +298,9 @@ class Song(models.Model):
         else:
             tracks_per_page = min(limit, 1000)  # Don't exceed Last.fm's limit
         
-        max_retries = 3
-        retry_delay = 2  # seconds
+        # HTTP-level failures are retried inside http_client; this policy also
+        # paces retries of Last.fm's transient API error codes.
+        retry_policy = http_client.get_retry_policy("music")
         
         while True:
             params = {
@@ -307,263 +313,250 @@ class Song(models.Model):
                 "extended": 1  # Get additional info like album art and loved status
             }
 
-            # Retry logic for transient errors
-            retry_count = 0
-            data = None
-            while retry_count < max_retries:
+            tracks = None
+            for attempt in range(retry_policy.retries + 1):
                 try:
                     response = http_client.get(
                         url,
                         params=params,
                         timeout=30,
-                        retries=0,
+                        retry_policy=retry_policy,
                         logger_name="music",
+                        stream=True,
                     )
-                    
-                    # Check HTTP status code first
-                    if response.status_code != 200:
-                        # HTTP 500 is often transient - retry
-                        if response.status_code == 500 and retry_count < max_retries - 1:
-                            retry_count += 1
-                            wait_time = retry_delay * retry_count
-                            logger.warning(f"Last.fm HTTP 500 error (retry {retry_count}/{max_retries}). Waiting {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        # Other non-200 status codes
-                        else:
-                            error_text = response.text[:500] if response.text else "No response body"
-                            raise Exception(f"HTTP {response.status_code}: {error_text}")
-                    
-                    # Try to parse JSON
-                    try:
-                        data = response.json()
-                    except ValueError:
-                        # If JSON parsing fails, it might be HTML or other format
-                        error_text = response.text[:500] if response.text else "No response body"
-                        raise Exception(f"Invalid JSON response (status {response.status_code}): {error_text}")
-                    
-                    # Check for Last.fm API errors in response
-                    if "error" in data:
-                        error_code = data.get("error", "Unknown")
-                        error_message = data.get("message", "Unknown error")
-                        
-                        # Error 8 is often transient - retry with exponential backoff
-                        if error_code == 8 and retry_count < max_retries - 1:
-                            retry_count += 1
-                            wait_time = retry_delay * retry_count
-                            logger.warning(f"Last.fm API error {error_code} (retry {retry_count}/{max_retries}): {error_message}. Waiting {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        # Error 29 is rate limit exceeded - retry with longer backoff
-                        elif error_code == 29 and retry_count < max_retries - 1:
-                            retry_count += 1
-                            wait_time = retry_delay * retry_count * 2  # Longer wait for rate limits
-                            logger.warning(f"Last.fm API rate limit exceeded (retry {retry_count}/{max_retries}). Waiting {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        # Error 11 is service offline - retry
-                        elif error_code == 11 and retry_count < max_retries - 1:
-                            retry_count += 1
-                            wait_time = retry_delay * retry_count
-                            logger.warning(f"Last.fm API service offline (retry {retry_count}/{max_retries}). Waiting {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        # Error 16 is temporarily unavailable - retry
-                        elif error_code == 16 and retry_count < max_retries - 1:
-                            retry_count += 1
-                            wait_time = retry_delay * retry_count
-                            logger.warning(f"Last.fm API temporarily unavailable (retry {retry_count}/{max_retries}). Waiting {wait_time}s...")
-                            time.sleep(wait_time)
-                            continue
-                        else:
-                            raise Exception(f"Last.fm API error ({error_code}): {error_message}")
-                    
-                    # Success - break out of retry loop
-                    break
-                    
                 except http_client.ExternalRequestError as e:
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        wait_time = retry_delay * retry_count
-                        logger.warning(f"Last.fm API request error (retry {retry_count}/{max_retries}): {str(e)}. Waiting {wait_time}s...")
-                        time.sleep(wait_time)
-                        continue
-                    else:
-                        raise Exception(f"Last.fm API request failed after retries: {str(e)}")
+                    raise Exception(f"Last.fm API request failed after retries: {str(e)}")
+
+                if response.status_code != 200:
+                    error_text = response.text[:500] if response.text else "No response body"
+                    raise Exception(f"HTTP {response.status_code}: {error_text}")
+
+                # Pages are parsed incrementally, so the full JSON tree is never built
+                try:
+                    tracks = http_client.stream_json_items(response, "recenttracks.track")
+                except http_client.ExternalRequestError as e:
+                    raise Exception(f"Invalid JSON response from Last.fm: {str(e)}")
+
+                if tracks.found or "error" not in tracks.fields:
+                    break
+
+                error_code = tracks.fields.get("error", "Unknown")
+                error_message = tracks.fields.get("message", "Unknown error")
+                tracks = None
+                # 8: operation failed, 11: service offline, 16: temporarily unavailable, 29: rate limit exceeded
+                if error_code not in LASTFM_TRANSIENT_ERRORS or attempt >= retry_policy.retries:
+                    raise Exception(f"Last.fm API error ({error_code}): {error_message}")
+                wait_time = retry_policy.delay(attempt)
+                logger.warning(
+                    "Last.fm API error %s (retry %s/%s): %s. Waiting %.1fs...",
+                    error_code,
+                    attempt + 1,
+                    retry_policy.retries,
+                    error_message,
+                    wait_time,
+                )
+                time.sleep(wait_time)
             
-            if data is None:
+            if tracks is None:
                 raise Exception("Failed to fetch data from Last.fm API after retries")
 
-            recenttracks = data.get("recenttracks", {})
-            tracks = recenttracks.get("track", [])
-            
-            if not isinstance(tracks, list):
-                tracks = [tracks]  # Handle single track response
+            # Reduce each track to the fields we store while the page streams in;
+            # tag lookups and writes happen after the connection is released.
+            page_tracks = []
+            page_count = 0
+            try:
+                for track in tracks:
+                    if limit and total_fetched >= limit:
+                        break
+                    page_count += 1
+                    total_fetched += 1
+                    parsed = Song._parse_lastfm_track(track)
+                    if parsed is not None:
+                        page_tracks.append(parsed)
+            except http_client.ExternalRequestError as e:
+                raise Exception(f"Invalid JSON response from Last.fm: {str(e)}")
+
+            for parsed in page_tracks:
+                result.append(
+                    Song._store_lastfm_track(user, parsed, lastfm_api_key, artist_tag_cache, max_tag_lookups)
+                )
 
             # If no tracks returned, we've reached the end
-            if not tracks:
+            if not page_count:
                 break
-
-            all_tracks.extend(tracks)
-            total_fetched += len(tracks)
             
             # Check if we've reached the limit
             if limit and total_fetched >= limit:
-                all_tracks = all_tracks[:limit]  # Trim to exact limit
                 break
             
             # Check if we've reached the end (Last.fm returns empty page when done)
-            if len(tracks) < tracks_per_page:
+            if page_count < tracks_per_page:
                 break
                 
             page += 1
             
-            # Small delay between pages to avoid rate limiting
-            # Last.fm recommends not exceeding 5 requests per second
-            if page <= 100:  # Only delay if we're continuing
-                time.sleep(0.3)  # 300ms delay between requests (allows ~3 requests/sec, well under limit)
+            # Pacing between pages is handled by http_client's "music" rate limit
             
             # Safety check to prevent infinite loops
             if page > 100:  # Maximum 100 pages (100,000 tracks)
                 break
 
-        result = []
-        artist_tag_cache = {}
+        return result
 
-        for track in all_tracks:
-            # Skip currently playing tracks (they don't have a date)
-            if "@attr" in track and track["@attr"].get("nowplaying") == "true":
-                continue
+    @staticmethod
+    def _parse_lastfm_track(track):
+        """Flatten one Last.fm recent track; returns None for the currently playing track."""
+        # Skip currently playing tracks (they don't have a date)
+        if "@attr" in track and track["@attr"].get("nowplaying") == "true":
+            return None
 
-            # Extract track information
-            title = track.get("name", "")
-            artist_info = track.get("artist", {})
-            if isinstance(artist_info, dict):
-                artist = artist_info.get("#text", "") or artist_info.get("name", "")
-                artist_mbid = artist_info.get("mbid", "")
-                artist_lastfm_url = artist_info.get("url", "")
-            else:
-                artist = str(artist_info)
-                artist_mbid = ""
-                artist_lastfm_url = ""
-            
-            album_info = track.get("album", {})
-            if isinstance(album_info, dict):
-                album_name = album_info.get("#text", "")
-                album_mbid = album_info.get("mbid", "")
-            else:
-                album_name = str(album_info) if album_info else ""
-                album_mbid = ""
-
-            # Parse the played date
-            date_info = track.get("date", {})
-            if isinstance(date_info, dict):
-                date_text = date_info.get("#text", "")
-                # Last.fm date format: "01 Jan 2024, 12:00"
-                played_at = parse_datetime_aware(date_text, "%d %b %Y, %H:%M")
-                if played_at is None:
-                    # Fallback to current time if parsing fails
-                    played_at = timezone.now()
-            else:
+        # Extract track information
+        title = track.get("name", "")
+        artist_info = track.get("artist", {})
+        if isinstance(artist_info, dict):
+            artist = artist_info.get("#text", "") or artist_info.get("name", "")
+            artist_mbid = artist_info.get("mbid", "")
+            artist_lastfm_url = artist_info.get("url", "")
+        else:
+            artist = str(artist_info)
+            artist_mbid = ""
+            artist_lastfm_url = ""
+        
+        album_info = track.get("album", {})
+        if isinstance(album_info, dict):
+            album_name = album_info.get("#text", "")
+            album_mbid = album_info.get("mbid", "")
+        else:
+            album_name = str(album_info) if album_info else ""
+            album_mbid = ""
+
+        # Parse the played date
+        date_info = track.get("date", {})
+        if isinstance(date_info, dict):
+            date_text = date_info.get("#text", "")
+            # Last.fm date format: "01 Jan 2024, 12:00"
+            played_at = parse_datetime_aware(date_text, "%d %b %Y, %H:%M")
+            if played_at is None:
+                # Fallback to current time if parsing fails
                 played_at = timezone.now()
+        else:
+            played_at = timezone.now()
+
+        # Get album artwork in all sizes
+        images = track.get("image", [])
+        album_thumbnail_small = ""
+        album_thumbnail_medium = ""
+        album_thumbnail_large = ""
+        album_thumbnail_extralarge = ""
+        
+        for img in images:
+            if img.get("size") == "small":
+                album_thumbnail_small = img.get("#text", "")
+            elif img.get("size") == "medium":
+                album_thumbnail_medium = img.get("#text", "")
+            elif img.get("size") == "large":
+                album_thumbnail_large = img.get("#text", "")
+            elif img.get("size") == "extralarge":
+                album_thumbnail_extralarge = img.get("#text", "")
+
+        # Use the largest available image as the main thumbnail
+        album_thumbnail = (album_thumbnail_extralarge or album_thumbnail_large or 
+                         album_thumbnail_medium or album_thumbnail_small)
+
+        # Get track URL and other metadata
+        track_url = track.get("url", "")
+        track_mbid = track.get("mbid", "")
+        loved = track.get("loved", "0") == "1"
+        streamable = track.get("streamable", "0") == "1"
+
+        return {
+            "title": title,
+            "artist": artist,
+            "artist_mbid": artist_mbid,
+            "artist_lastfm_url": artist_lastfm_url,
+            "album_name": album_name,
+            "album_mbid": album_mbid,
+            "played_at": played_at,
+            "album_thumbnail": album_thumbnail,
+            "album_thumbnail_small": album_thumbnail_small,
+            "album_thumbnail_medium": album_thumbnail_medium,
+            "album_thumbnail_large": album_thumbnail_large,
+            "album_thumbnail_extralarge": album_thumbnail_extralarge,
+            "track_url": track_url,
+            "track_mbid": track_mbid,
+            "loved": loved,
+            "streamable": streamable,
+        }
 
-            # Get album artwork in all sizes
-            images = track.get("image", [])
-            album_thumbnail_small = ""
-            album_thumbnail_medium = ""
-            album_thumbnail_large = ""
-            album_thumbnail_extralarge = ""
-            
-            for img in images:
-                if img.get("size") == "small":
-                    album_thumbnail_small = img.get("#text", "")
-                elif img.get("size") == "medium":
-                    album_thumbnail_medium = img.get("#text", "")
-                elif img.get("size") == "large":
-                    album_thumbnail_large = img.get("#text", "")
-                elif img.get("size") == "extralarge":
-                    album_thumbnail_extralarge = img.get("#text", "")
-
-            # Use the largest available image as the main thumbnail
-            album_thumbnail = (album_thumbnail_extralarge or album_thumbnail_large or 
-                             album_thumbnail_medium or album_thumbnail_small)
-
-            # Get track URL and other metadata
-            track_url = track.get("url", "")
-            track_mbid = track.get("mbid", "")
-            loved = track.get("loved", "0") == "1"
-            streamable = track.get("streamable", "0") == "1"
-            artist_cache_key = (artist_mbid or artist or "").strip().lower()
-            genre_tags = []
-            if artist_cache_key:
-                if artist_cache_key not in artist_tag_cache:
-                    if len(artist_tag_cache) < max_tag_lookups:
-                        artist_tag_cache[artist_cache_key] = Song.fetch_lastfm_artist_tags(
-                            lastfm_api_key,
-                            artist,
-                            artist_mbid=artist_mbid,
-                        )
-                    else:
-                        artist_tag_cache[artist_cache_key] = []
-                genre_tags = artist_tag_cache[artist_cache_key]
+    @staticmethod
+    def _store_lastfm_track(user, track, lastfm_api_key, artist_tag_cache, max_tag_lookups):
+        """Save a parsed Last.fm track (with cached artist genre tags) and return its API representation."""
+        artist_cache_key = (track["artist_mbid"] or track["artist"] or "").strip().lower()
+        genre_tags = []
+        if artist_cache_key:
+            if artist_cache_key not in artist_tag_cache:
+                if len(artist_tag_cache) < max_tag_lookups:
+                    artist_tag_cache[artist_cache_key] = Song.fetch_lastfm_artist_tags(
+                        lastfm_api_key,
+                        track["artist"],
+                        artist_mbid=track["artist_mbid"],
+                    )
+                else:
+                    artist_tag_cache[artist_cache_key] = []
+            genre_tags = artist_tag_cache[artist_cache_key]
+
+        # Save (or update) the song record in the database for the specific user
+        defaults = {
+            "album": track["album_name"],
+            "album_thumbnail": track["album_thumbnail"],
+            "track_url": track["track_url"],
+            "artists_url": "",  # Last.fm doesn't provide artist URLs in this endpoint
+            "duration_ms": 0,  # Last.fm doesn't provide duration in recent tracks
+            "source": "lastfm",
+            # New enhanced fields
+            "artist_lastfm_url": track["artist_lastfm_url"],
+            "track_mbid": track["track_mbid"],
+            "artist_mbid": track["artist_mbid"],
+            "album_mbid": track["album_mbid"],
+            "loved": track["loved"],
+            "streamable": track["streamable"],
+            "album_thumbnail_small": track["album_thumbnail_small"],
+            "album_thumbnail_medium": track["album_thumbnail_medium"],
+            "album_thumbnail_large": track["album_thumbnail_large"],
+            "album_thumbnail_extralarge": track["album_thumbnail_extralarge"],
+        }
+        if genre_tags:
+            defaults["genre_tags"] = genre_tags
+
+        Song.objects.update_or_create(
+            user=user,
+            title=track["title"],
+            artist=track["artist"],
+            played_at=track["played_at"],
+            defaults=defaults,
+        )
 
-            # Save (or update) the song record in the database for the specific user
-            defaults = {
-                "album": album_name,
-                "album_thumbnail": album_thumbnail,
-                "track_url": track_url,
-                "artists_url": "",  # Last.fm doesn't provide artist URLs in this endpoint
-                "duration_ms": 0,  # Last.fm doesn't provide duration in recent tracks
-                "source": "lastfm",
-                # New enhanced fields
-                "artist_lastfm_url": artist_lastfm_url,
-                "track_mbid": track_mbid,
-                "artist_mbid": artist_mbid,
-                "album_mbid": album_mbid,
-                "loved": loved,
-                "streamable": streamable,
-                "album_thumbnail_small": album_thumbnail_small,
-                "album_thumbnail_medium": album_thumbnail_medium,
-                "album_thumbnail_large": album_thumbnail_large,
-                "album_thumbnail_extralarge": album_thumbnail_extralarge,
+        return {
+            "title": track["title"],
+            "artist": track["artist"],
+            "album": track["album_name"],
+            "album_thumbnail": track["album_thumbnail"],
+            "track_url": track["track_url"],
+            "artists_url": "",
+            "duration_ms": 0,
+            "played_at": track["played_at"].isoformat(),
+            "source": "lastfm",
+            "artist_lastfm_url": track["artist_lastfm_url"],
+            "track_mbid": track["track_mbid"],
+            "artist_mbid": track["artist_mbid"],
+            "album_mbid": track["album_mbid"],
+            "loved": track["loved"],
+            "streamable": track["streamable"],
+            "genre_tags": genre_tags,
+            "album_thumbnails": {
+                "small": track["album_thumbnail_small"],
+                "medium": track["album_thumbnail_medium"],
+                "large": track["album_thumbnail_large"],
+                "extralarge": track["album_thumbnail_extralarge"],
             }
-            if genre_tags:
-                defaults["genre_tags"] = genre_tags
-
-            Song.objects.update_or_create(
-                user=user,
-                title=title,
-                artist=artist,
-                played_at=played_at,
-                defaults=defaults,
-            )
-
-            # Append the song data to the result list
-            result.append(
-                {
-                    "title": title,
-                    "artist": artist,
-                    "album": album_name,
-                    "album_thumbnail": album_thumbnail,
-                    "track_url": track_url,
-                    "artists_url": "",
-                    "duration_ms": 0,
-                    "played_at": played_at.isoformat(),
-                    "source": "lastfm",
-                    "artist_lastfm_url": artist_lastfm_url,
-                    "track_mbid": track_mbid,
-                    "artist_mbid": artist_mbid,
-                    "album_mbid": album_mbid,
-                    "loved": loved,
-                    "streamable": streamable,
-                    "genre_tags": genre_tags,
-                    "album_thumbnails": {
-                        "small": album_thumbnail_small,
-                        "medium": album_thumbnail_medium,
-                        "large": album_thumbnail_large,
-                        "extralarge": album_thumbnail_extralarge,
-                    }
-                }
-            )
-
-        return result
+        }
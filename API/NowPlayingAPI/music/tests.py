@@ -4,6 +4,7 @@ from django.utils import timezone
 from rest_framework.test import APITestCase
 from rest_framework import status
 from datetime import timedelta
+import json
 from unittest.mock import patch, MagicMock
 from users.models import UserApiKey
 from .models import Song
@@ -51,7 +52,7 @@ class LastFmIntegrationTestCase(APITestCase):
         # Mock the Last.fm API response with extended data
         recent_response = MagicMock()
         recent_response.status_code = 200
-        recent_response.json.return_value = {
+        recent_payload = {
             "recenttracks": {
                 "track": [
                     {
@@ -80,6 +81,7 @@ class LastFmIntegrationTestCase(APITestCase):
                 ]
             }
         }
+        recent_response.iter_content.return_value = [json.dumps(recent_payload).encode()]
         tags_response = MagicMock()
         tags_response.status_code = 200
         tags_response.json.return_value = {
@@ -167,7 +169,7 @@ class LastFmIntegrationTestCase(APITestCase):
 
         mock_response = MagicMock()
         mock_response.status_code = 200
-        mock_response.json.return_value = {
+        recent_payload = {
             "recenttracks": {
                 "track": [
                     {
@@ -186,6 +188,7 @@ class LastFmIntegrationTestCase(APITestCase):
                 ]
             }
         }
+        mock_response.iter_content.return_value = [json.dumps(recent_payload).encode()]
         mock_get.return_value = mock_response
 
         response = self.client.get('/music/fetch-lastfm-recent/')
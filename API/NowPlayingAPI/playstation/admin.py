@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.safestring import mark_safe
-from .models import PSNGame, PSNAchievement
+from .models import PSNGame, PSNAchievement, PSNToken
 
 class PSNAchievementInline(admin.TabularInline):
     model = PSNAchievement
@@ -28,8 +28,8 @@ class PSNGameAdmin(admin.ModelAdmin):
     user_username.admin_order_field = 'user__username'
 
     def achievement_progress(self, obj):
-        total = obj.achievements.count()
-        unlocked = obj.achievements.filter(unlocked=True).count()
+        total = sum(obj.total_trophies.values())
+        unlocked = sum(obj.unlocked_trophies.values())
         if total:
             percentage = (unlocked / total) * 100
             return f"{unlocked}/{total} ({percentage:.1f}%)"
@@ -60,3 +60,17 @@ class PSNAchievementAdmin(admin.ModelAdmin):
             return mark_safe(f'<img src="{obj.image}" width="100" />')
         return ""
     image_display.short_description = "Trophy Image"
+
+
+@admin.register(PSNToken)
+class PSNTokenAdmin(admin.ModelAdmin):
+    list_display = ['user_username', 'access_expires_at', 'refresh_expires_at', 'updated_at']
+    search_fields = ['user__username']
+    # The encrypted token data is never shown
+    readonly_fields = ['user', 'access_expires_at', 'refresh_expires_at', 'updated_at']
+    fields = ['user', 'access_expires_at', 'refresh_expires_at', 'updated_at']
+
+    def user_username(self, obj):
+        return obj.user.username if obj.user else "No User"
+    user_username.short_description = "User"
+    user_username.admin_order_field = 'user__username'
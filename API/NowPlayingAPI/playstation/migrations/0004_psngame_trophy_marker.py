@@ -0,0 +1,28 @@
+# Generated by Django 5.1.10 on 2026-10-17 05:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playstation', '0003_psngame_user_alter_psngame_appid_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='psngame',
+            name='np_communication_id',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='trophies_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='trophy_progress',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.1.10 on 2026-10-17 05:02
+
+from django.conf import settings
+import re
+
+from django.db import migrations, models
+
+# str(timedelta), e.g. "2 days, 3:04:05" or "0:45:00"
+PLAYTIME_PATTERN = re.compile(r"(?:(\d+) days?, )?(\d+):(\d+):(\d+)")
+
+
+def backfill_playtime_seconds(apps, schema_editor):
+    PSNGame = apps.get_model('playstation', 'PSNGame')
+    games = []
+    for game in PSNGame.objects.exclude(total_playtime='').only('id', 'total_playtime').iterator():
+        match = PLAYTIME_PATTERN.match(game.total_playtime)
+        if not match:
+            continue
+        days, hours, minutes, seconds = (int(group or 0) for group in match.groups())
+        game.playtime_seconds = ((days * 24 + hours) * 60 + minutes) * 60 + seconds
+        games.append(game)
+    PSNGame.objects.bulk_update(games, ['playtime_seconds'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playstation', '0004_psngame_trophy_marker'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='psngame',
+            name='playtime_seconds',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='psngame',
+            index=models.Index(fields=['user', '-playtime_seconds'], name='playstation_user_id_dd81c8_idx'),
+        ),
+        migrations.RunPython(backfill_playtime_seconds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 5.1.10 on 2026-10-17 05:04
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+# Mirrors playstation.models.TROPHY_WEIGHTS at the time of this migration
+TROPHY_WEIGHTS = {"platinum": 20, "gold": 3, "silver": 2, "bronze": 1}
+
+
+def backfill_trophy_counters(apps, schema_editor):
+    PSNGame = apps.get_model('playstation', 'PSNGame')
+    annotations = {}
+    for trophy_type in TROPHY_WEIGHTS:
+        annotations[f"{trophy_type}_total"] = Count(
+            'achievements', filter=Q(achievements__trophy_type__iexact=trophy_type)
+        )
+        annotations[f"{trophy_type}_unlocked"] = Count(
+            'achievements', filter=Q(achievements__trophy_type__iexact=trophy_type, achievements__unlocked=True)
+        )
+    # Annotated names shadow the new columns, so read them under a prefix
+    games = []
+    prefixed = {f"n_{name}": aggregate for name, aggregate in annotations.items()}
+    for game in PSNGame.objects.annotate(**prefixed).iterator():
+        for name in annotations:
+            setattr(game, name, getattr(game, f"n_{name}"))
+        game.weighted_score = sum(
+            weight * getattr(game, f"{trophy_type}_unlocked") for trophy_type, weight in TROPHY_WEIGHTS.items()
+        )
+        games.append(game)
+    PSNGame.objects.bulk_update(games, [*annotations, 'weighted_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playstation', '0005_psngame_playtime_seconds'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='psngame',
+            name='bronze_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='bronze_unlocked',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='gold_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='gold_unlocked',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='platinum_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='platinum_unlocked',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='silver_total',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='silver_unlocked',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='psngame',
+            name='weighted_score',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='psngame',
+            index=models.Index(fields=['user', '-weighted_score'], name='playstation_user_id_809e3d_idx'),
+        ),
+        migrations.RunPython(backfill_trophy_counters, migrations.RunPython.noop),
+    ]
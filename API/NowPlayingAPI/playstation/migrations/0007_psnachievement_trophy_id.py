@@ -0,0 +1,32 @@
+# Generated by Django 5.1.10 on 2026-10-17 05:06
+
+from django.db import migrations, models
+
+
+def reset_trophy_markers(apps, schema_editor):
+    # Stored trophies have no trophy_id yet; clearing the marker makes the next
+    # sync refetch every title and rebuild its trophies keyed by id
+    PSNGame = apps.get_model('playstation', 'PSNGame')
+    PSNGame.objects.filter(achievements__trophy_id__isnull=True).update(
+        trophy_progress=None, trophies_updated_at=None
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('playstation', '0006_psngame_trophy_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='psnachievement',
+            name='trophy_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='psnachievement',
+            constraint=models.UniqueConstraint(fields=('game', 'trophy_id'), name='unique_psn_game_trophy_id'),
+        ),
+        migrations.RunPython(reset_trophy_markers, migrations.RunPython.noop),
+    ]
@@ -1,14 +1,25 @@
-from django.db import models
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
 from psnawp_api import PSNAWP
 from psnawp_api.models import Client
 from psnawp_api.models.trophies import PlatformType
 from psnawp_api.models.title_stats import PlatformCategory
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from django.contrib.auth.models import User
+from users.crypto import encrypt_api_key, decrypt_api_key
+import json
 import logging
+import time
+import http_client
 
 logger = logging.getLogger("playstation")
 
+TROPHY_TYPES = ("platinum", "gold", "silver", "bronze")
+# Score used to rank games by trophy progress
+TROPHY_WEIGHTS = {"platinum": 20, "gold": 3, "silver": 2, "bronze": 1}
+
 # Model for PSN games (titles)
 class PSNGame(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='psn_games')
@@ -16,19 +27,59 @@ class PSNGame(models.Model):
     name = models.CharField(max_length=255)
     platform = models.CharField(max_length=50)
     total_playtime = models.CharField(max_length=50, blank=True)  # We'll store a string format of the timedelta.
+    playtime_seconds = models.PositiveIntegerField(default=0)  # total_playtime as a number, for sorting
     first_played = models.DateTimeField(null=True, blank=True)
     last_played = models.DateTimeField(null=True, blank=True)
     img_icon_url = models.URLField(max_length=500, blank=True)
+    # Last trophy summary seen for this title; trophies are only refetched when it moves
+    np_communication_id = models.CharField(max_length=50, blank=True)
+    trophy_progress = models.PositiveSmallIntegerField(null=True, blank=True)
+    trophies_updated_at = models.DateTimeField(null=True, blank=True)
+    # Trophy breakdown maintained by the sync, so lists don't count achievements per game
+    platinum_total = models.PositiveIntegerField(default=0)
+    gold_total = models.PositiveIntegerField(default=0)
+    silver_total = models.PositiveIntegerField(default=0)
+    bronze_total = models.PositiveIntegerField(default=0)
+    platinum_unlocked = models.PositiveIntegerField(default=0)
+    gold_unlocked = models.PositiveIntegerField(default=0)
+    silver_unlocked = models.PositiveIntegerField(default=0)
+    bronze_unlocked = models.PositiveIntegerField(default=0)
+    weighted_score = models.PositiveIntegerField(default=0)  # See TROPHY_WEIGHTS
 
     class Meta:
         unique_together = ('user', 'appid')  # A game can appear multiple times, but only once per user
+        indexes = [
+            models.Index(fields=['user', '-playtime_seconds']),  # For most played games
+            models.Index(fields=['user', '-weighted_score']),  # For most achieved games
+        ]
 
     def __str__(self):
         return self.name
 
+    @staticmethod
+    def trophy_counters(total, unlocked):
+        """Counter column values from per-type trophy counts, as built by PSN.fetch_achievements."""
+        counters = {}
+        for trophy_type in TROPHY_TYPES:
+            counters[f"{trophy_type}_total"] = total.get(trophy_type, 0)
+            counters[f"{trophy_type}_unlocked"] = unlocked.get(trophy_type, 0)
+        counters["weighted_score"] = sum(
+            weight * unlocked.get(trophy_type, 0) for trophy_type, weight in TROPHY_WEIGHTS.items()
+        )
+        return counters
+
+    @property
+    def total_trophies(self):
+        return {trophy_type: getattr(self, f"{trophy_type}_total") for trophy_type in TROPHY_TYPES}
+
+    @property
+    def unlocked_trophies(self):
+        return {trophy_type: getattr(self, f"{trophy_type}_unlocked") for trophy_type in TROPHY_TYPES}
+
 # Model for PSN achievements (trophies)
 class PSNAchievement(models.Model):
     game = models.ForeignKey(PSNGame, related_name="achievements", on_delete=models.CASCADE)
+    trophy_id = models.PositiveIntegerField(null=True, blank=True)  # Stable id within the title's trophy set
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     image = models.URLField(max_length=500, blank=True)
@@ -36,30 +87,204 @@ class PSNAchievement(models.Model):
     unlock_time = models.DateTimeField(null=True, blank=True)
     trophy_type = models.CharField(max_length=50, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'trophy_id'], name='unique_psn_game_trophy_id'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({'Unlocked' if self.unlocked else 'Locked'})"
 
+# Trophy fields returned with each game by get_games and get_games_stored
+ACHIEVEMENT_RESPONSE_FIELDS = ("name", "description", "image", "unlocked", "unlock_time", "trophy_type")
+
+# Stored PSN tokens are refreshed this long before the access token expires
+PSN_TOKEN_REFRESH_MARGIN = timedelta(minutes=10)
+# How long one worker may hold the token refresh lock, and others wait for it
+PSN_TOKEN_REFRESH_LOCK_SECONDS = 30
+
+
+class PSNToken(models.Model):
+    """
+    Access and refresh tokens exchanged from the user's NPSSO, stored encrypted so requests
+    and workers reuse them instead of running PSN's auth flow each time.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='psn_token')
+    token_data = models.TextField()  # Encrypted psnawp token response (JSON)
+    access_expires_at = models.DateTimeField()
+    refresh_expires_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"PSNToken for {self.user.username} (access expiring at {self.access_expires_at})"
+
+    @property
+    def access_expiring(self):
+        return self.access_expires_at <= datetime.now(timezone.utc) + PSN_TOKEN_REFRESH_MARGIN
+
+    @property
+    def refresh_usable(self):
+        return self.refresh_expires_at > datetime.now(timezone.utc) + PSN_TOKEN_REFRESH_MARGIN
+
+    def get_token_response(self):
+        """Decrypt and return the psnawp token response, or None if it cannot be read."""
+        decrypted = decrypt_api_key(self.token_data)
+        return json.loads(decrypted) if decrypted else None
+
+    @classmethod
+    def store(cls, user, token_response):
+        """Encrypt and save a psnawp token response (with its *_expires_at timestamps) for the user."""
+        token_data = encrypt_api_key(json.dumps(token_response))
+        if not token_data:
+            logger.error(f"Could not encrypt PSN tokens for user {user.id}; they will not be reused")
+            return None
+        token, _created = cls.objects.update_or_create(
+            user=user,
+            defaults={
+                "token_data": token_data,
+                "access_expires_at": datetime.fromtimestamp(token_response["access_token_expires_at"], timezone.utc),
+                "refresh_expires_at": datetime.fromtimestamp(token_response["refresh_token_expires_at"], timezone.utc),
+            },
+        )
+        return token
+
+
+# npTitleIds accepted per trophy summary request
+TROPHY_SUMMARY_BATCH = 5
+# Items per request for psnawp's paginated endpoints (title stats, trophy lists)
+PSN_PAGE_SIZE = 200
+
+
 class PSN:
     @staticmethod
     def timedelta_to_str(td):
         return str(td) if isinstance(td, timedelta) else td
 
+    @staticmethod
+    def timedelta_to_seconds(td):
+        return int(td.total_seconds()) if isinstance(td, timedelta) else 0
+
     @staticmethod
     def datetime_to_str(dt):
         return dt.isoformat() if isinstance(dt, datetime) else dt
 
     @classmethod
-    def fetch_achievements(cls, client: Client, title_id, title_category):
+    def authenticated_client(cls, psn_npsso, user, use_stored_tokens=True):
+        """
+        psnawp client for the user's account. Stored tokens are reused (and refreshed ahead of
+        expiry); the NPSSO auth flow only runs when none are usable, and its tokens are stored.
+        """
+        psnawp = PSNAWP(psn_npsso)
+        authenticator = psnawp.authenticator
+        authenticator.token_response = cls.load_tokens(user, authenticator) if use_stored_tokens else None
+        if authenticator.token_response is None:
+            authenticator.fetch_access_token_from_authorization(authenticator.get_authorization_code())
+            PSNToken.store(user, authenticator.token_response)
+        return psnawp.me()
+
+    @staticmethod
+    def load_tokens(user, authenticator):
+        """The user's stored token response, refreshed first if the access token is about to expire."""
+        token = PSNToken.objects.filter(user=user).first()
+        if token is None or not token.refresh_usable:
+            return None
+        if not token.access_expiring:
+            return token.get_token_response()
+
+        # Only one worker refreshes; PSN rotates the refresh token, so the others wait for its result
+        lock_key = f"psn_token_refresh_{user.id}"
+        if not cache.add(lock_key, True, PSN_TOKEN_REFRESH_LOCK_SECONDS):
+            deadline = time.monotonic() + PSN_TOKEN_REFRESH_LOCK_SECONDS
+            while time.monotonic() < deadline:
+                time.sleep(0.25)
+                token = PSNToken.objects.filter(user=user).first()
+                if token is not None and not token.access_expiring:
+                    return token.get_token_response()
+            return None
+
         try:
-            TrophyTitleForTitle = list(client.trophy_titles_for_title([title_id]))[0]
-            if not TrophyTitleForTitle:
-                return {"achievements": [], "total": {}, "unlocked": {}}
-            trophies = list(
+            # Another worker may have refreshed between our read and taking the lock
+            token = PSNToken.objects.filter(user=user).first()
+            if token is None:
+                return None
+            if not token.access_expiring:
+                return token.get_token_response()
+            token_response = token.get_token_response()
+            if token_response is None:
+                return None
+            # Mark the access token as expired so psnawp refreshes it now
+            authenticator.token_response = {**token_response, "access_token_expires_at": 0}
+            authenticator.fetch_access_token_from_refresh()
+            PSNToken.store(user, authenticator.token_response)
+            return authenticator.token_response
+        except Exception as e:
+            logger.error(f"Error refreshing PSN tokens for user {user.id}: {e}")
+            return None
+        finally:
+            cache.delete(lock_key)
+
+    @staticmethod
+    def rate_limited_pages(paginator, requests_per_page=1, deadline=None):
+        """
+        Reads a psnawp paginator (built with ``page_size=PSN_PAGE_SIZE``) into a list, drawing
+        ``requests_per_page`` "psn" tokens before each page it requests. psnawp does its own HTTP,
+        so this is what keeps its paged calls inside the shared budget.
+        """
+        def charge():
+            for _ in range(requests_per_page):
+                http_client.wait_for_rate_limit("psn", logger, deadline)
+
+        charge()
+        items = []
+        for item in paginator:
+            items.append(item)
+            if len(items) % PSN_PAGE_SIZE == 0:
+                charge()
+        return items
+
+    @staticmethod
+    def fetch_trophy_summaries(client: Client, title_ids, deadline=None):
+        """
+        Trophy summaries (progress, last update, np_communication_id) keyed by title id, and whether
+        every batch was requested. Batching stops early when the "psn" budget would outlast ``deadline``.
+        """
+        summaries = {}
+        for start in range(0, len(title_ids), TROPHY_SUMMARY_BATCH):
+            batch = title_ids[start:start + TROPHY_SUMMARY_BATCH]
+            try:
+                # psnawp does its own HTTP; this keeps PSN calls inside the shared "psn" budget
+                http_client.wait_for_rate_limit("psn", logger, deadline)
+            except http_client.ExternalRequestError as e:
+                logger.warning(f"Stopping PSN trophy summaries at {len(summaries)} titles: {e}")
+                return summaries, False
+            try:
+                for summary in client.trophy_titles_for_title(batch):
+                    summaries.setdefault(summary.np_title_id, summary)
+            except Exception as e:
+                # These titles keep their stored marker and are retried on the next sync
+                logger.error(f"Error fetching trophy summaries for {', '.join(batch)}: {e}")
+        return summaries, True
+
+    @classmethod
+    def fetch_achievements(cls, client: Client, title_id, title_category, np_communication_id=None, deadline=None):
+        """
+        Trophies for one title, or None if they could not be fetched. Raises ExternalRequestError
+        when the "psn" budget would outlast ``deadline``.
+        """
+        try:
+            if np_communication_id is None:
+                http_client.wait_for_rate_limit("psn", logger, deadline)
+                np_communication_id = list(client.trophy_titles_for_title([title_id]))[0].np_communication_id
+            # include_progress reads a second endpoint, so every page costs two requests
+            trophies = cls.rate_limited_pages(
                 client.trophies(
-                    np_communication_id=TrophyTitleForTitle.np_communication_id,
+                    np_communication_id=np_communication_id,
                     platform=(PlatformType.PS5 if title_category == PlatformCategory.PS5 else PlatformType.PS4),
                     include_progress=True,
-                )
+                    page_size=PSN_PAGE_SIZE,
+                ),
+                requests_per_page=2,
+                deadline=deadline,
             )
             if not trophies:
                 return {"achievements": [], "total": {}, "unlocked": {}}
@@ -75,6 +300,7 @@ class PSN:
                     unlocked_counts[trophy_type] += 1
                 achievements.append(
                     {
+                        "trophy_id": trophy.trophy_id,
                         "name": trophy.trophy_name,
                         "description": trophy.trophy_detail,
                         "image": trophy.trophy_icon_url,
@@ -92,9 +318,63 @@ class PSN:
                 "total": trophy_counts,
                 "unlocked": unlocked_counts,
             }
+        except http_client.ExternalRequestError:
+            # Out of budget: the caller ends the sync as partial
+            raise
         except Exception as e:
             logger.error(f"Error fetching trophies for {title_id}: {e}")
-            return {"achievements": [], "total": {}, "unlocked": {}}
+            return None
+
+    @staticmethod
+    def save_achievements(game, summary, achievements_data):
+        """
+        Upserts a title's trophies in one statement keyed on (game, trophy_id), then moves the
+        game's trophy marker and counters. Returns the stored trophies, or None if nothing was written.
+        """
+        achievements = []
+        for ach in achievements_data["achievements"]:
+            if ach["trophy_id"] is None:
+                logger.error(f"Skipping PSN trophy without id: {ach.get('name') or 'Unknown'}")
+                continue
+            achievements.append(PSNAchievement(
+                game=game,
+                trophy_id=ach["trophy_id"],
+                name=ach["name"] or "",
+                description=ach["description"] or "",
+                image=ach["image"] or "",
+                unlocked=ach["unlocked"],
+                # Convert the ISO string to a datetime object if necessary.
+                unlock_time=datetime.fromisoformat(ach["unlock_time"]) if ach["unlock_time"] else None,
+                trophy_type=ach["type"],
+            ))
+
+        marker = {
+            "np_communication_id": summary.np_communication_id or "",
+            "trophy_progress": summary.progress,
+            "trophies_updated_at": summary.last_updated_date_time,
+            **PSNGame.trophy_counters(achievements_data["total"], achievements_data["unlocked"]),
+        }
+        try:
+            with transaction.atomic():
+                # Drop trophies no longer in the set, and rows stored before trophy_id
+                # existed (they cannot be matched and are rebuilt here)
+                PSNAchievement.objects.filter(game=game).exclude(
+                    trophy_id__in=[achievement.trophy_id for achievement in achievements]
+                ).delete()
+                PSNAchievement.objects.bulk_create(
+                    achievements,
+                    update_conflicts=True,
+                    unique_fields=["game", "trophy_id"],
+                    update_fields=["name", "description", "image", "unlocked", "unlock_time", "trophy_type"],
+                )
+                # Move the marker only once the trophies it describes are stored
+                PSNGame.objects.filter(pk=game.pk).update(**marker)
+        except Exception as e:
+            logger.error(f"Error storing PSN trophies for {game.appid}: {e}")
+            return None
+        for field, value in marker.items():
+            setattr(game, field, value)
+        return [{field: getattr(achievement, field) for field in ACHIEVEMENT_RESPONSE_FIELDS} for achievement in achievements]
 
     @classmethod
     def get_games(cls, psn_npsso, psn_user_id=None, user=None):
@@ -104,17 +384,67 @@ class PSN:
         if not psn_npsso:
             return {"error": "No PlayStation NPSSO provided."}
             
+        # The whole sync, rate-limit waits included, must end well inside the worker timeout
+        deadline = time.monotonic() + getattr(settings, "PSN_SYNC_DEADLINE", 480)
+        executor = None
         try:
-            psnawp = PSNAWP(psn_npsso)
-            client = psnawp.me()
-            titles = list(client.title_stats())
+            client = cls.authenticated_client(psn_npsso, user)
+            access_token = client.authenticator.token_response["access_token"]
+            titles = cls.rate_limited_pages(client.title_stats(page_size=PSN_PAGE_SIZE), deadline=deadline)
             
+            title_ids = [title.title_id for title in titles]
+            summaries, complete = cls.fetch_trophy_summaries(client, title_ids, deadline)
+            stored = {
+                appid: (trophy_progress, trophies_updated_at)
+                for appid, trophy_progress, trophies_updated_at in PSNGame.objects.filter(user=user).values_list(
+                    "appid", "trophy_progress", "trophies_updated_at"
+                )
+            }
+            # Only titles whose trophy progress or last-update time moved need their full trophy list
+            changed = {
+                title_id
+                for title_id, summary in summaries.items()
+                if stored.get(title_id) != (summary.progress, summary.last_updated_date_time)
+            }
+            logger.info(
+                "PSN sync for user %s: trophies changed for %s of %s titles", user.id, len(changed), len(titles)
+            )
+
+            def fetch(title):
+                if title.title_id not in changed:
+                    return None
+                if time.monotonic() >= deadline:
+                    raise http_client.ExternalRequestError("PSN sync deadline reached.")
+                summary = summaries[title.title_id]
+                return cls.fetch_achievements(
+                    client, title.title_id, title.category, summary.np_communication_id, deadline
+                )
+
+            # Trophies of unchanged titles are served from the database, in one query
+            stored_achievements = {}
+            for achievement in PSNAchievement.objects.filter(game__user=user).exclude(
+                game__appid__in=changed
+            ).values("game__appid", *ACHIEVEMENT_RESPONSE_FIELDS):
+                appid = achievement.pop("game__appid")
+                stored_achievements.setdefault(appid, []).append(achievement)
+
             games_info = []
+            # Trophies are fetched for several titles at once over the one authenticated client.
+            # Results come back in title order and are written here, on this thread only.
+            executor = ThreadPoolExecutor(
+                max_workers=http_client.fanout_limit("psn"), thread_name_prefix="psn"
+            )
+            futures = [executor.submit(fetch, title) for title in titles]
             # Loop through each title and update or create a PSNGame record,
-            # then update or create related PSNAchievement records.
-            for title in titles:
-                achievements_data = cls.fetch_achievements(client, title.title_id, title.category)
-                
+            # then upsert its PSNAchievement records in one statement.
+            for title, future in zip(titles, futures):
+                try:
+                    achievements_data = future.result()
+                except http_client.ExternalRequestError as e:
+                    # Out of time: the title keeps its stored marker, so the next sync fetches it
+                    logger.warning(f"Skipping PSN trophies for {title.title_id}: {e}")
+                    complete = False
+                    achievements_data = None
                 # Create or update the game record.
                 game, created = PSNGame.objects.update_or_create(
                     appid=title.title_id,
@@ -123,45 +453,25 @@ class PSN:
                         "name": title.name,
                         "platform": title.category.name,
                         "total_playtime": cls.timedelta_to_str(title.play_duration),
+                        "playtime_seconds": cls.timedelta_to_seconds(title.play_duration),
                         "first_played": title.first_played_date_time,
                         "last_played": title.last_played_date_time,
                         "img_icon_url": title.image_url,
                         "user": user,
                     },
                 )
-                
-                # Now, update or create each achievement for this game.
-                unlocked_count = 0
-                for ach in achievements_data["achievements"]:
-                    if ach["unlocked"]:
-                        unlocked_count += 1
-                        
-                    # We assume the combination of game and achievement name uniquely identifies a trophy.
-                    try:
-                        PSNAchievement.objects.update_or_create(
-                            game=game,
-                            name=ach["name"],
-                            defaults={
-                                "description": ach["description"],
-                                "image": ach["image"],
-                                "unlocked": ach["unlocked"],
-                                # Convert the ISO string to a datetime object if necessary.
-                                "unlock_time": (
-                                    datetime.fromisoformat(ach["unlock_time"]) if ach["unlock_time"] else None
-                                ),
-                                "trophy_type": ach["type"],
-                            },
-                        )
-                    except Exception as e:
-                        logger.error(f"Error updating PSN achievement {ach.get('name', 'Unknown')}: {str(e)}")
-                        continue
-                
-                # Prepare the game info with achievements for the response
-                achievements_qs = game.achievements.all()
-                achievements_list = list(
-                    achievements_qs.values("name", "description", "image", "unlocked", "unlock_time", "trophy_type")
-                )
-                
+                achievements_list = None
+                if achievements_data is not None:
+                    achievements_list = cls.save_achievements(game, summaries[title.title_id], achievements_data)
+                if achievements_list is None:
+                    if title.title_id in changed:
+                        # The refresh failed, so serve the trophies already stored
+                        achievements_list = list(game.achievements.values(*ACHIEVEMENT_RESPONSE_FIELDS))
+                    else:
+                        achievements_list = stored_achievements.get(title.title_id, [])
+
+                # Counters for the response come from the trophies already in memory
+                unlocked_total = sum(1 for achievement in achievements_list if achievement["unlocked"])
                 games_info.append({
                     "appid": game.appid,
                     "name": game.name,
@@ -170,16 +480,29 @@ class PSN:
                     "first_played": cls.datetime_to_str(game.first_played) if game.first_played else None,
                     "last_played": cls.datetime_to_str(game.last_played) if game.last_played else None,
                     "img_icon_url": game.img_icon_url,
-                    "total_achievements": achievements_qs.count(),
-                    "unlocked_achievements": achievements_qs.filter(unlocked=True).count(),
-                    "locked_achievements": achievements_qs.count() - achievements_qs.filter(unlocked=True).count(),
+                    "total_achievements": len(achievements_list),
+                    "unlocked_achievements": unlocked_total,
+                    "locked_achievements": len(achievements_list) - unlocked_total,
                     "achievements": achievements_list,
                 })
-            
+
+            # psnawp refreshes on its own if the access token lapsed mid-sync; keep what it got
+            if client.authenticator.token_response["access_token"] != access_token:
+                PSNToken.store(user, client.authenticator.token_response)
+            if not complete:
+                return {
+                    "games": games_info,
+                    "partial": True,
+                    "error": "PlayStation sync ran out of time before every title's trophies were fetched. "
+                             "Run it again to continue.",
+                }
             return {"games": games_info}
         except Exception as e:
             logger.error(f"Error fetching PlayStation games: {e}")
             return {"error": f"Failed to fetch PlayStation games: {str(e)}"}
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
 
     @classmethod
     def get_games_stored(cls, user=None):
@@ -187,9 +510,12 @@ class PSN:
             raise ValueError("User must be provided to retrieve their games.")
             
         games_info = []
-        for game in PSNGame.objects.filter(user=user):
-            achievements_qs = game.achievements.all()
-            unlocked_count = achievements_qs.filter(unlocked=True).count()
+        for game in PSNGame.objects.filter(user=user).prefetch_related("achievements"):
+            achievements = [
+                {field: getattr(achievement, field) for field in ACHIEVEMENT_RESPONSE_FIELDS}
+                for achievement in game.achievements.all()
+            ]
+            unlocked_count = sum(1 for achievement in achievements if achievement["unlocked"])
             games_info.append({
                 "appid": game.appid,
                 "name": game.name,
@@ -198,11 +524,9 @@ class PSN:
                 "first_played": cls.datetime_to_str(game.first_played) if game.first_played else None,
                 "last_played": cls.datetime_to_str(game.last_played) if game.last_played else None,
                 "img_icon_url": game.img_icon_url,
-                "total_achievements": achievements_qs.count(),
-                "unlocked_achievements": achievements_qs.filter(unlocked=True).count(),
-                "locked_achievements": achievements_qs.count() - unlocked_count,
-                "achievements": list(
-                    achievements_qs.values("name", "description", "image", "unlocked", "unlock_time", "trophy_type")
-                ),
+                "total_achievements": len(achievements),
+                "unlocked_achievements": unlocked_count,
+                "locked_achievements": len(achievements) - unlocked_count,
+                "achievements": achievements,
             })
         return {"games": games_info}
@@ -36,20 +36,8 @@ class PSNGameSerializer(serializers.ModelSerializer):
         ]
 
     def get_total_achievements(self, obj):
-        # Initialize counters for each trophy type
-        counts = {"platinum": 0, "gold": 0, "silver": 0, "bronze": 0}
-        # Iterate over all related achievements to count each type.
-        for achievement in obj.achievements.all():
-            trophy_type = (achievement.trophy_type or "").lower()
-            if trophy_type in counts:
-                counts[trophy_type] += 1
-        return counts
+        # Per-type counts are stored on the game by the sync
+        return obj.total_trophies
 
     def get_unlocked_achievements(self, obj):
-        counts = {"platinum": 0, "gold": 0, "silver": 0, "bronze": 0}
-        # Iterate over unlocked achievements only.
-        for achievement in obj.achievements.filter(unlocked=True):
-            trophy_type = (achievement.trophy_type or "").lower()
-            if trophy_type in counts:
-                counts[trophy_type] += 1
-        return counts
\ No newline at end of file
+        return obj.unlocked_trophies
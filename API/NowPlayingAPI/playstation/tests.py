@@ -0,0 +1,360 @@
+import importlib
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APITestCase
+from psnawp_api.models.title_stats import PlatformCategory
+
+import http_client
+
+from .models import PSN, PSNAchievement, PSNGame, PSNToken
+
+
+def psn_title(title_id, name):
+    return SimpleNamespace(
+        title_id=title_id,
+        name=name,
+        category=PlatformCategory.PS5,
+        play_duration=timedelta(hours=2),
+        first_played_date_time=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        last_played_date_time=datetime(2024, 2, 1, tzinfo=timezone.utc),
+        image_url=f"https://example.com/{title_id}.png",
+    )
+
+
+def psn_trophy(trophy_id, name, earned):
+    return SimpleNamespace(
+        trophy_id=trophy_id,
+        trophy_name=name,
+        trophy_detail=f"{name} detail",
+        trophy_icon_url=f"https://example.com/{name}.png",
+        trophy_type=SimpleNamespace(name="GOLD"),
+        earned=earned,
+        earned_date_time=datetime(2024, 1, 5, tzinfo=timezone.utc) if earned else None,
+    )
+
+
+def psn_token_response(access_token, access_expires_in=3600, refresh_expires_in=5184000):
+    return {
+        "access_token": access_token,
+        "refresh_token": f"refresh-{access_token}",
+        "expires_in": access_expires_in,
+        "refresh_token_expires_in": refresh_expires_in,
+        "access_token_expires_at": time.time() + access_expires_in,
+        "refresh_token_expires_at": time.time() + refresh_expires_in,
+    }
+
+
+class FakeAuthenticator:
+    """Stands in for psnawp's Authenticator, counting NPSSO logins and token refreshes."""
+
+    logins = 0
+    refreshes = 0
+
+    def __init__(self):
+        self.token_response = None
+
+    def get_authorization_code(self):
+        return "authorization-code"
+
+    def fetch_access_token_from_authorization(self, authorization_code):
+        FakeAuthenticator.logins += 1
+        self.token_response = psn_token_response(f"login-{FakeAuthenticator.logins}")
+
+    def fetch_access_token_from_refresh(self):
+        if self.token_response["access_token_expires_at"] > time.time():
+            return
+        FakeAuthenticator.refreshes += 1
+        self.token_response = psn_token_response(f"refresh-{FakeAuthenticator.refreshes}")
+
+
+def patch_psnawp(client):
+    """Patches PSNAWP so each construction authenticates through a fresh FakeAuthenticator."""
+    def build(npsso):
+        psnawp = MagicMock()
+        psnawp.authenticator = FakeAuthenticator()
+        client.authenticator = psnawp.authenticator
+        psnawp.me.return_value = client
+        return psnawp
+
+    FakeAuthenticator.logins = FakeAuthenticator.refreshes = 0
+    return patch("playstation.models.PSNAWP", side_effect=build)
+
+
+@patch("playstation.models.http_client.wait_for_rate_limit")
+class PSNSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="player", password="testpass123")
+        self.titles = [psn_title(f"PPSA{index:05d}", f"Game {index}") for index in range(6)]
+        self.progress = {title.title_id: 50 for title in self.titles}
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def psn_client(self):
+        client = MagicMock()
+        client.title_stats.return_value = self.titles
+        client.trophy_titles_for_title.side_effect = lambda title_ids: [
+            SimpleNamespace(
+                np_title_id=title_id,
+                np_communication_id=f"NPWR-{title_id}",
+                progress=self.progress[title_id],
+                last_updated_date_time=datetime(2024, 3, 1, tzinfo=timezone.utc),
+            )
+            for title_id in title_ids
+        ]
+
+        def trophies(np_communication_id, **kwargs):
+            with self.lock:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+            time.sleep(0.05)
+            with self.lock:
+                self.in_flight -= 1
+            return [
+                psn_trophy(0, f"{np_communication_id}-a", True),
+                psn_trophy(1, f"{np_communication_id}-b", False),
+            ]
+
+        client.trophies.side_effect = trophies
+        return client
+
+    def sync(self):
+        client = self.psn_client()
+        with patch_psnawp(client):
+            result = PSN.get_games("npsso-token", user=self.user)
+        return client, result
+
+    def test_trophies_are_fetched_concurrently_and_stored(self, mock_wait):
+        client, result = self.sync()
+
+        self.assertGreater(self.peak, 1)
+        self.assertEqual([game["appid"] for game in result["games"]], [title.title_id for title in self.titles])
+        self.assertEqual(PSNGame.objects.filter(user=self.user).count(), 6)
+        self.assertEqual(PSNAchievement.objects.filter(game__user=self.user, unlocked=True).count(), 6)
+        # One title-list page, summaries in batches of five, then one trophy list per title (its
+        # trophies and progress are two requests), all from the shared "psn" budget
+        self.assertEqual(client.trophy_titles_for_title.call_count, 2)
+        self.assertEqual(mock_wait.call_count, 1 + 2 + 2 * 6)
+        self.assertEqual(client.trophies.call_args.kwargs["page_size"], 200)
+        self.assertTrue(all(call.args[0] == "psn" for call in mock_wait.call_args_list))
+        game = PSNGame.objects.get(user=self.user, appid="PPSA00000")
+        self.assertEqual((game.np_communication_id, game.trophy_progress), ("NPWR-PPSA00000", 50))
+        self.assertEqual((game.total_playtime, game.playtime_seconds), ("2:00:00", 7200))
+        self.assertEqual((game.gold_total, game.gold_unlocked, game.weighted_score), (2, 1, 3))
+
+    def test_only_titles_with_moved_trophy_progress_are_refetched(self, mock_wait):
+        self.sync()
+        self.progress["PPSA00003"] = 75
+
+        client, result = self.sync()
+
+        self.assertEqual(
+            [call.kwargs["np_communication_id"] for call in client.trophies.call_args_list], ["NPWR-PPSA00003"]
+        )
+        self.assertEqual(PSNGame.objects.get(user=self.user, appid="PPSA00003").trophy_progress, 75)
+        # Unchanged titles still report their stored trophies
+        self.assertEqual(len(result["games"][0]["achievements"]), 2)
+
+    def test_failed_trophy_fetch_keeps_the_old_marker(self, mock_wait):
+        client = self.psn_client()
+        client.trophies.side_effect = Exception("PSN unavailable")
+        with patch_psnawp(client):
+            PSN.get_games("npsso-token", user=self.user)
+
+        self.assertIsNone(PSNGame.objects.get(user=self.user, appid="PPSA00000").trophy_progress)
+
+    @override_settings(HTTP_CLIENT_FANOUT={"psn": 1})
+    def test_exhausted_budget_ends_the_sync_as_partial(self, mock_wait):
+        calls = []
+
+        def wait(service, log, deadline):
+            calls.append(deadline)
+            # The title list, both summary batches and two trophy lists (two requests each) fit;
+            # the rest would outlast the deadline
+            if len(calls) > 7:
+                raise http_client.ExternalRequestError("External service request budget exhausted.")
+
+        mock_wait.side_effect = wait
+        client, result = self.sync()
+
+        self.assertTrue(result["partial"])
+        self.assertIn("Run it again", result["error"])
+        self.assertTrue(all(deadline is not None for deadline in calls))
+        self.assertEqual(len(result["games"]), 6)
+        # Titles that missed out keep no marker, so the next sync fetches exactly those
+        self.assertEqual(PSNGame.objects.filter(user=self.user, trophy_progress__isnull=False).count(), 2)
+        mock_wait.side_effect = None
+        client, result = self.sync()
+        self.assertEqual(client.trophies.call_count, 4)
+        self.assertNotIn("partial", result)
+
+    def test_trophies_are_upserted_in_one_statement_per_title(self, mock_wait):
+        with CaptureQueriesContext(connection) as queries:
+            self.sync()
+
+        inserts = [
+            query for query in queries.captured_queries
+            if query["sql"].startswith('INSERT INTO "playstation_psnachievement"')
+        ]
+        self.assertEqual(len(inserts), len(self.titles))
+
+    def test_resync_updates_trophies_in_place_by_id(self, mock_wait):
+        self.sync()
+        game = PSNGame.objects.get(user=self.user, appid="PPSA00000")
+        original_pk = game.achievements.get(trophy_id=1).pk
+        # A stale row from before trophy ids were stored is replaced
+        PSNAchievement.objects.create(game=game, name="legacy", trophy_type="gold")
+        self.progress["PPSA00000"] = 100
+
+        _, result = self.sync()
+
+        self.assertEqual(game.achievements.count(), 2)
+        self.assertEqual(game.achievements.get(trophy_id=1).pk, original_pk)
+        self.assertEqual(result["games"][0]["total_achievements"], 2)
+        self.assertEqual(result["games"][0]["unlocked_achievements"], 1)
+
+
+class PSNTokenTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="player", password="testpass123")
+        self.psn_client = MagicMock()
+
+    def authenticate(self, **kwargs):
+        with patch_psnawp(self.psn_client):
+            PSN.authenticated_client("npsso-token", self.user, **kwargs)
+        return self.psn_client.authenticator
+
+    def test_tokens_are_stored_encrypted_and_reused(self):
+        self.authenticate()
+        authenticator = self.authenticate()
+
+        self.assertEqual((FakeAuthenticator.logins, FakeAuthenticator.refreshes), (0, 0))
+        self.assertEqual(authenticator.token_response["access_token"], "login-1")
+        self.assertNotIn("login-1", PSNToken.objects.get(user=self.user).token_data)
+
+    def test_expiring_access_token_is_refreshed_ahead_of_time(self):
+        PSNToken.store(self.user, psn_token_response("old", access_expires_in=60))
+
+        authenticator = self.authenticate()
+
+        self.assertEqual((FakeAuthenticator.logins, FakeAuthenticator.refreshes), (0, 1))
+        self.assertEqual(authenticator.token_response["access_token"], "refresh-1")
+        token = PSNToken.objects.get(user=self.user)
+        self.assertEqual(token.get_token_response()["access_token"], "refresh-1")
+        self.assertFalse(token.access_expiring)
+
+    def test_expired_refresh_token_falls_back_to_npsso_login(self):
+        PSNToken.store(self.user, psn_token_response("old", access_expires_in=-60, refresh_expires_in=-60))
+
+        authenticator = self.authenticate()
+
+        self.assertEqual((FakeAuthenticator.logins, FakeAuthenticator.refreshes), (1, 0))
+        self.assertEqual(authenticator.token_response["access_token"], "login-1")
+
+    def test_exchange_npsso_replaces_stored_tokens(self):
+        PSNToken.store(self.user, psn_token_response("old"))
+        self.psn_client.online_id = "player_psn"
+        self.client.force_authenticate(user=self.user)
+
+        with patch_psnawp(self.psn_client):
+            response = self.client.post("/psn/exchange-npsso/", {"npsso": "a-valid-npsso-value"}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(FakeAuthenticator.logins, 1)
+        self.assertEqual(PSNToken.objects.get(user=self.user).get_token_response()["access_token"], "login-1")
+
+
+class PSNPlaytimeListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="player", password="testpass123")
+        for appid, seconds in [("A", 600), ("B", 90000), ("C", 3600), ("D", 3600)]:
+            PSNGame.objects.create(user=self.user, appid=appid, name=appid, platform="PS5", playtime_seconds=seconds)
+        PSNGame.objects.create(
+            user=User.objects.create_user(username="other", password="testpass123"),
+            appid="X", name="X", platform="PS5", playtime_seconds=10**6,
+        )
+        self.client.force_authenticate(user=self.user)
+
+    def test_playtime_list_is_sorted_in_sql(self):
+        response = self.client.get("/psn/get-game-list-total-playtime/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([game["appid"] for game in response.data["result"]], ["B", "D", "C", "A"])
+
+    def test_playtime_list_orders_ties_the_same_with_and_without_cursor(self):
+        unpaged = self.client.get("/psn/get-game-list-total-playtime/")
+        first = self.client.get("/psn/get-game-list-total-playtime/", {"page_size": 2})
+        second = self.client.get(
+            "/psn/get-game-list-total-playtime/", {"page_size": 2, "cursor": first.data["next_cursor"]}
+        )
+
+        paged = [game["appid"] for game in first.data["result"] + second.data["result"]]
+        self.assertEqual([game["appid"] for game in unpaged.data["result"]], paged)
+
+    def test_playtime_list_pages_by_cursor(self):
+        first = self.client.get("/psn/get-game-list-total-playtime/", {"page_size": 3})
+        second = self.client.get(
+            "/psn/get-game-list-total-playtime/", {"page_size": 3, "cursor": first.data["next_cursor"]}
+        )
+
+        self.assertEqual([game["appid"] for game in first.data["result"]], ["B", "D", "C"])
+        self.assertEqual([game["appid"] for game in second.data["result"]], ["A"])
+        self.assertIsNone(second.data["next_cursor"])
+
+    def test_backfill_parses_stored_timedelta_strings(self):
+        migration = importlib.import_module("playstation.migrations.0005_psngame_playtime_seconds")
+        PSNGame.objects.filter(appid="A").update(total_playtime="2 days, 3:04:05", playtime_seconds=0)
+        PSNGame.objects.filter(appid="C").update(total_playtime="0:45:00", playtime_seconds=0)
+
+        migration.backfill_playtime_seconds(apps, None)
+
+        self.assertEqual(PSNGame.objects.get(appid="A").playtime_seconds, 2 * 86400 + 3 * 3600 + 4 * 60 + 5)
+        self.assertEqual(PSNGame.objects.get(appid="C").playtime_seconds, 2700)
+
+
+class PSNMostAchievedListTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="player", password="testpass123")
+        self.games = {}
+        for appid, unlocked in [("A", ["bronze"] * 5), ("B", ["platinum"]), ("C", ["gold", "silver"]), ("D", [])]:
+            game = PSNGame.objects.create(user=self.user, appid=appid, name=appid, platform="PS5")
+            for index, trophy_type in enumerate(unlocked):
+                PSNAchievement.objects.create(
+                    game=game, name=f"{appid}-{index}", unlocked=True, trophy_type=trophy_type
+                )
+            PSNAchievement.objects.create(game=game, name=f"{appid}-locked", unlocked=False, trophy_type="gold")
+            self.games[appid] = game
+        self.client.force_authenticate(user=self.user)
+
+    def backfill(self):
+        migration = importlib.import_module("playstation.migrations.0006_psngame_trophy_counters")
+        migration.backfill_trophy_counters(apps, None)
+
+    def test_backfill_counts_trophies_per_type(self):
+        self.backfill()
+
+        game = PSNGame.objects.get(appid="C")
+        self.assertEqual(game.total_trophies, {"platinum": 0, "gold": 2, "silver": 1, "bronze": 0})
+        self.assertEqual(game.unlocked_trophies, {"platinum": 0, "gold": 1, "silver": 1, "bronze": 0})
+        self.assertEqual(game.weighted_score, 5)
+
+    def test_most_achieved_list_is_sorted_in_sql(self):
+        self.backfill()
+
+        # Games plus one prefetch of their achievements, regardless of game count
+        with self.assertNumQueries(2):
+            response = self.client.get("/psn/get-game-list-most-achieved/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([game["appid"] for game in response.data["result"]], ["B", "A", "C", "D"])
+        self.assertEqual(response.data["result"][0]["unlocked_achievements"]["platinum"], 1)
@@ -1,5 +1,4 @@
-from datetime import timedelta
-import re
+from django.conf import settings
 from rest_framework.decorators import action
 from rest_framework import viewsets, status
 from rest_framework.response import Response
@@ -8,8 +7,8 @@ from .serializers import PSNGameSerializer
 from .models import PSN  # Import the utility class that contains get_games() and get_games_stored()
 from users.models import UserApiKey  # Import UserApiKey from users app
 from users.credentials import get_service_credentials
+from query_params import keyset_ordering, keyset_page
 from rest_framework.permissions import IsAuthenticated
-from psnawp_api import PSNAWP
 
 class PSNViewSet(viewsets.ModelViewSet):
     serializer_class = PSNGameSerializer
@@ -29,9 +28,9 @@ class PSNViewSet(viewsets.ModelViewSet):
     def exchange_npsso(self, request):
         """
         Accepts an NPSSO value and optional PSN user id, validates it by
-        initializing PSNAWP, and stores it encrypted in UserApiKey for the
-        authenticated user. This enables automatic token handling by PSNAWP
-        without requiring repeated logins.
+        exchanging it for PSN tokens, and stores it encrypted in UserApiKey for the
+        authenticated user. The exchanged tokens are kept in PSNToken and reused
+        by later syncs without repeated logins.
         Body: { "npsso": "...", "psn_user_id": "optional" }
         """
         npsso = request.data.get("npsso")
@@ -41,8 +40,8 @@ class PSNViewSet(viewsets.ModelViewSet):
             return Response({"error": "Invalid or missing NPSSO."}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            # Validate NPSSO by attempting to create a client
-            client = PSNAWP(npsso).me()
+            # Validate NPSSO by exchanging it for fresh tokens, which replace any stored ones
+            client = PSN.authenticated_client(npsso, request.user, use_stored_tokens=False)
             validated_online_id = getattr(client, "online_id", None)
 
             api_key_obj, _created = UserApiKey.objects.get_or_create(
@@ -78,46 +77,28 @@ class PSNViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="get-game-list-total-playtime")
     def getGameListPlaytime(self, request):
-        # Retrieve stored games sorted by playtime
-        def parse_playtime(playtime):
-            match = re.match(r"(?:(\d+) days?, )?(\d+):(\d+):(\d+)", playtime)
-            if match:
-                days = int(match.group(1)) if match.group(1) else 0
-                hours = int(match.group(2))
-                minutes = int(match.group(3))
-                seconds = int(match.group(4))
-                return timedelta(
-                    days=days, hours=hours, minutes=minutes, seconds=seconds
-                ).total_seconds()
-            return 0
+        """
+        Stored games sorted by playtime (most played first), in SQL on playtime_seconds.
+        ?page_size=/?cursor= return one keyset page plus ``next_cursor``.
+        """
+        games = self.get_queryset().prefetch_related("achievements")
+        if "cursor" in request.query_params or "page_size" in request.query_params:
+            games, next_cursor = keyset_page(
+                games,
+                request.query_params,
+                "playtime_seconds",
+                default_page_size=settings.REST_FRAMEWORK.get("PAGE_SIZE", 25),
+            )
+            serializer = self.serializer_class(games, many=True)
+            return Response({"result": serializer.data, "next_cursor": next_cursor})
 
-        games = list(self.get_queryset())
-        # Sort using the helper function:
-        sorted_games = sorted(games, key=lambda g: parse_playtime(g.total_playtime), reverse=True)
-        serializer = self.serializer_class(sorted_games, many=True)
+        # Same order as the keyset pages, ties included
+        serializer = self.serializer_class(games.order_by(*keyset_ordering("playtime_seconds")), many=True)
         return Response({"result": serializer.data})
 
     @action(detail=False, methods=["get"], url_path="get-game-list-most-achieved")
     def getGameListMostAchieved(self, request):
-        # Retrieve stored games filtered by the current user
-        games = list(self.get_queryset().prefetch_related("achievements"))
-
-        # Helper function to calculate the weighted score for unlocked achievements.
-        def calculate_weighted_score(game):
-            # Assuming achievements is a related name on PSNAchievement
-            unlocked = game.achievements.filter(unlocked=True)
-            score = 0
-            for trophy in unlocked:
-                if trophy.trophy_type.lower() == "platinum":
-                    score += 20
-                elif trophy.trophy_type.lower() == "gold":
-                    score += 3
-                elif trophy.trophy_type.lower() == "silver":
-                    score += 2
-                elif trophy.trophy_type.lower() == "bronze":
-                    score += 1
-            return score
-
-        sorted_games = sorted(games, key=calculate_weighted_score, reverse=True)
-        serializer = self.serializer_class(sorted_games, many=True)
+        # weighted_score is maintained by the sync (see TROPHY_WEIGHTS), so SQL can sort on it
+        games = self.get_queryset().prefetch_related("achievements").order_by("-weighted_score", "id")
+        serializer = self.serializer_class(games, many=True)
         return Response({"result": serializer.data})
@@ -1,3 +1,10 @@
+import base64
+import binascii
+import json
+
+from django.core import exceptions
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
 from rest_framework.exceptions import ValidationError
 
 
@@ -28,3 +35,62 @@ def pagination_params(query_params, *, default_page_size=25, max_page_size=100):
     )
     return page, page_size
 
+
+def encode_cursor(value, pk):
+    payload = json.dumps([value, pk], cls=DjangoJSONEncoder)
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor, field):
+    """Decode a cursor from ``encode_cursor`` into a (value, pk) pair typed for model ``field``."""
+    try:
+        value, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (None if value is None else field.to_python(value)), int(pk)
+    except (binascii.Error, exceptions.ValidationError, TypeError, ValueError) as exc:
+        raise ValidationError({"cursor": "Invalid cursor."}) from exc
+
+
+def keyset_ordering(field_name):
+    """
+    The order ``keyset_page`` pages through: ``field_name`` descending (nulls last), then pk
+    descending. Unpaged views sorting on the same field use it so both agree on ties.
+    """
+    return (F(field_name).desc(nulls_last=True), "-pk")
+
+
+def keyset_page(queryset, query_params, field_name, *, default_page_size=25, max_page_size=100):
+    """
+    One page of ``queryset`` ordered by ``field_name`` descending (nulls last), then pk descending.
+
+    The page starts after ``?cursor=`` and holds ``?page_size=`` rows. Unlike offset
+    pagination, rows added or removed between requests do not shift later pages. The
+    cursor filter and the nulls-last order are not backed by a matching index, so each
+    page still sorts the filtered rows. Returns ``(items, next_cursor)``; ``next_cursor``
+    is None on the last page.
+    """
+    page_size = bounded_int(
+        query_params,
+        "page_size",
+        default=default_page_size,
+        minimum=1,
+        maximum=max_page_size,
+    )
+    queryset = queryset.order_by(*keyset_ordering(field_name))
+
+    cursor = query_params.get("cursor")
+    if cursor:
+        value, pk = decode_cursor(cursor, queryset.model._meta.get_field(field_name))
+        if value is None:
+            queryset = queryset.filter(Q(**{f"{field_name}__isnull": True}), pk__lt=pk)
+        else:
+            queryset = queryset.filter(
+                Q(**{f"{field_name}__lt": value})
+                | Q(**{field_name: value}, pk__lt=pk)
+                | Q(**{f"{field_name}__isnull": True})
+            )
+
+    items = list(queryset[:page_size + 1])
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    return items, encode_cursor(getattr(items[-1], field_name), items[-1].pk)
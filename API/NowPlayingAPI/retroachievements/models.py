@@ -13,22 +13,47 @@ logger = logging.getLogger("retroachievements")
 # api_key = settings.RETROACHIEVEMENTS_API_KEY
 # username = settings.RETROACHIEVEMENTS_USER
 
-def get_json_response(url):
+def get_json_response(url, cache_ttl=None):
     """Helper function to GET a URL and return JSON data, handling errors."""
     try:
-        response = http_client.get(url, logger_name="retroachievements")
-        logger.debug(f"Requesting: {url}")
-        logger.debug("Status Code: %s", response.status_code)
+        response = http_client.get(url, logger_name="retroachievements", cache_ttl=cache_ttl)
+    except http_client.ExternalRequestError as req_err:
+        logger.error("Request failed: %s", req_err)
+        return None
+    return decode_json_response(url, response)
+
+
+def get_json_responses(urls, cache_ttl=None):
+    """GET several URLs concurrently; returns decoded JSON (or None) per URL, in order."""
+    responses = http_client.gather(
+        [{"url": url, "logger_name": "retroachievements", "cache_ttl": cache_ttl} for url in urls],
+        concurrency=http_client.fanout_limit("retroachievements"),
+        return_exceptions=True,
+    )
+    results = []
+    for url, response in zip(urls, responses):
+        if isinstance(response, Exception):
+            logger.error("Request failed: %s", response)
+            results.append(None)
+        else:
+            results.append(decode_json_response(url, response))
+    return results
+
+
+def decode_json_response(url, response):
+    logger.debug(f"Requesting: {url}")
+    logger.debug("Status Code: %s", response.status_code)
+    try:
         response.raise_for_status()  # Raises HTTPError for bad responses (4xx or 5xx)
-        try:
-            return response.json()
-        except ValueError as json_err:
-            logger.error("Failed to decode JSON: %s", json_err)
-            logger.error("Raw response: %s", response.text)
-            return None
-    except (http_client.ExternalRequestError, http_client.requests.RequestException) as req_err:
+    except http_client.requests.RequestException as req_err:
         logger.error("Request failed: %s", req_err)
         return None
+    try:
+        return response.json()
+    except ValueError as json_err:
+        logger.error("Failed to decode JSON: %s", json_err)
+        logger.error("Raw response: %s", response.text)
+        return None
 
 def parse_datetime(datetime_str):
     """Convert a naive datetime string to a timezone-aware datetime object."""
@@ -94,6 +119,7 @@ class GameAchievement(models.Model):
 
 class RetroAchievementsAPI:
     @staticmethod
+    @http_client.track_sync("retroachievements.recent")
     def populate_recently_played_games(user, ra_username, ra_api_key):
         """Fetch and populate the latest 50 played games for a specific user."""
         if not ra_username or not ra_api_key:
@@ -109,8 +135,16 @@ class RetroAchievementsAPI:
                 return {"error": "Failed to fetch recently played games."}
                 
             games_info = []
+            progress_urls = [
+                RetroAchievementsAPI.game_progress_url(game_data['GameID'], ra_username, ra_api_key)
+                for game_data in recent_games
+            ]
+            game_progresses = get_json_responses(
+                progress_urls,
+                cache_ttl=http_client.response_cache_ttl("RETROACHIEVEMENTS_GAME"),
+            )
             
-            for game_data in recent_games:
+            for game_data, game_progress in zip(recent_games, game_progresses):
                 last_played = parse_datetime(game_data['LastPlayed'])  # Convert to timezone-aware
                 
                 game, created = RetroAchievementsGame.objects.update_or_create(
@@ -136,7 +170,9 @@ class RetroAchievementsAPI:
                 )
                 
                 # Populate achievements for the game
-                RetroAchievementsAPI.populate_achievements_for_game(game, ra_username, ra_api_key)
+                RetroAchievementsAPI.populate_achievements_for_game(
+                    game, ra_username, ra_api_key, game_progress=game_progress
+                )
                 
                 # Collect information about the game and its achievements
                 achievements = game.achievements.all().order_by('display_order')
@@ -179,11 +215,22 @@ class RetroAchievementsAPI:
             return {"error": f"Error fetching RetroAchievements data: {str(e)}"}
 
     @staticmethod
-    def populate_achievements_for_game(game, ra_username, ra_api_key):
-        """Fetch and populate achievements for a specific game."""
+    def game_progress_url(game_id, ra_username, ra_api_key):
+        return f'https://retroachievements.org/API/API_GetGameInfoAndUserProgress.php?g={game_id}&u={ra_username}&y={ra_api_key}&a=1'
+
+    @staticmethod
+    def populate_achievements_for_game(game, ra_username, ra_api_key, game_progress=None):
+        """
+        Fetch and populate achievements for a specific game. Pass an already
+        fetched ``game_progress`` payload to skip the request.
+        """
         try:
-            progress_url = f'https://retroachievements.org/API/API_GetGameInfoAndUserProgress.php?g={game.game_id}&u={ra_username}&y={ra_api_key}&a=1'
-            game_progress = get_json_response(progress_url)
+            if game_progress is None:
+                progress_url = RetroAchievementsAPI.game_progress_url(game.game_id, ra_username, ra_api_key)
+                game_progress = get_json_response(
+                    progress_url,
+                    cache_ttl=http_client.response_cache_ttl("RETROACHIEVEMENTS_GAME"),
+                )
 
             if game_progress and 'Achievements' in game_progress:
                 for achievement_id, achievement_data in game_progress['Achievements'].items():
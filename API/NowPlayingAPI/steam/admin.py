@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.safestring import mark_safe
-from .models import Game, Achievement
+from .models import Game, Achievement, SteamAppSchema
 
 class AchievementInline(admin.TabularInline):
     model = Achievement
@@ -37,11 +37,8 @@ class GameAdmin(admin.ModelAdmin):
     user_username.admin_order_field = 'user__username'
 
     def achievement_progress(self, obj):
-        total = obj.achievements.count()
-        unlocked = obj.achievements.filter(unlocked=True).count()
-        if total:
-            percentage = (unlocked / total) * 100
-            return f"{unlocked}/{total} ({percentage:.1f}%)"
+        if obj.total_achievements:
+            return f"{obj.unlocked_achievements}/{obj.total_achievements} ({obj.completion_pct:.1f}%)"
         return "0/0 (0%)"
     achievement_progress.short_description = "Achievement Progress"
 
@@ -55,7 +52,7 @@ class GameAdmin(admin.ModelAdmin):
 class AchievementAdmin(admin.ModelAdmin):
     list_display = ['name', 'game_name', 'game_user', 'unlocked', 'unlock_time']
     list_filter = ['unlocked', 'game', 'game__user']
-    search_fields = ['name', 'description', 'game__name', 'game__user__username']
+    search_fields = ['name', 'apiname', 'game__name', 'game__user__username']
     readonly_fields = ['game', 'game_user', 'name', 'description', 'image', 'unlocked', 'unlock_time', 'image_display']
     fields = ['game', 'game_user', 'name', 'description', 'image_display', 'unlocked', 'unlock_time']
 
@@ -73,4 +70,14 @@ class AchievementAdmin(admin.ModelAdmin):
         if obj.image:
             return mark_safe(f'<img src="{obj.image}" width="64" height="64" />')
         return ""
-    image_display.short_description = "Achievement Image"
\ No newline at end of file
+    image_display.short_description = "Achievement Image"
+
+@admin.register(SteamAppSchema)
+class SteamAppSchemaAdmin(admin.ModelAdmin):
+    list_display = ['appid', 'achievement_count', 'fetched_at']
+    search_fields = ['appid']
+    readonly_fields = ['appid', 'achievements', 'fetched_at']
+
+    def achievement_count(self, obj):
+        return len(obj.achievements)
+    achievement_count.short_description = "Achievements"
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steam', '0008_game_steam_game_user_id_62bba4_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='achievement',
+            name='apiname',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='achievement',
+            constraint=models.UniqueConstraint(fields=('game', 'apiname'), name='unique_steam_game_apiname'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steam', '0009_achievement_apiname'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SteamAppSchema',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('appid', models.PositiveIntegerField(unique=True)),
+                ('achievements', models.JSONField(blank=True, default=list)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+        # Pre-schema rows keep their copied description and icon until the next
+        # sync rebuilds them from SteamAppSchema, so nothing is lost on upgrade.
+        migrations.RenameField(
+            model_name='achievement',
+            old_name='description',
+            new_name='legacy_description',
+        ),
+        migrations.RenameField(
+            model_name='achievement',
+            old_name='image',
+            new_name='legacy_image',
+        ),
+    ]
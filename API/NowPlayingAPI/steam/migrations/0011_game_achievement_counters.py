@@ -0,0 +1,49 @@
+# Generated by Django 5.1.10 on 2026-10-17 04:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Game = apps.get_model('steam', 'Game')
+    games = Game.objects.annotate(
+        total=Count('achievements'),
+        unlocked=Count('achievements', filter=Q(achievements__unlocked=True)),
+    ).filter(total__gt=0)
+    for game in games.iterator():
+        game.total_achievements = game.total
+        game.unlocked_achievements = game.unlocked
+        game.completion_pct = game.unlocked / game.total * 100
+        game.save(update_fields=['total_achievements', 'unlocked_achievements', 'completion_pct'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steam', '0010_steamappschema'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='completion_pct',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='total_achievements',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='game',
+            name='unlocked_achievements',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='game',
+            index=models.Index(fields=['user', '-completion_pct'], name='steam_game_user_id_b5ad5c_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
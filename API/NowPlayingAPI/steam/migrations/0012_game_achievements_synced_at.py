@@ -0,0 +1,20 @@
+# Generated by Django 5.1.10 on 2026-10-17 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steam', '0011_game_achievement_counters'),
+    ]
+
+    # No backfill: existing games start unsynced, so the next sync refreshes each one once
+    # and rebuilds achievements stored before apiname and SteamAppSchema existed
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='achievements_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
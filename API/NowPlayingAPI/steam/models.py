@@ -1,5 +1,8 @@
-from django.db import models
-from datetime import datetime, timezone
+from django.conf import settings
+from django.db import models, transaction
+from django.utils import timezone as django_timezone
+from django.utils.functional import cached_property
+from datetime import datetime, timedelta, timezone
 import logging
 from django.contrib.auth.models import User
 import http_client
@@ -7,6 +10,12 @@ import http_client
 logger = logging.getLogger("steam")
 
 
+def format_playtime(playtime_minutes):
+    # Convert minutes into a formatted time string: "Xh Ym"
+    hours, minutes = divmod(playtime_minutes, 60)
+    return f"{hours}h {minutes}m"
+
+
 class Game(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='steam_games')  # Allow null initially for migration
     appid = models.PositiveIntegerField()
@@ -17,12 +26,19 @@ class Game(models.Model):
     has_community_visible_stats = models.BooleanField(default=False)
     last_played = models.DateTimeField(null=True, blank=True)
     content_descriptorids = models.JSONField(default=list, blank=True)
+    # Maintained by the sync so lists don't have to count achievements per game
+    total_achievements = models.PositiveIntegerField(default=0)
+    unlocked_achievements = models.PositiveIntegerField(default=0)
+    completion_pct = models.FloatField(default=0)
+    # Set when the game's achievements were last stored; cleared when the game changes
+    achievements_synced_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         unique_together = ('user', 'appid')  # A game can appear multiple times, but only once per user
         indexes = [
             models.Index(fields=['user', '-last_played']),  # For latest played games
             models.Index(fields=['user', '-playtime_forever']),  # For most played games
+            models.Index(fields=['user', '-completion_pct']),  # For most achieved games
             models.Index(fields=['user', 'appid']),  # For game lookups
             models.Index(fields=['last_played']),  # For date filtering
             models.Index(fields=['playtime_forever']),  # For playtime sorting
@@ -32,65 +48,157 @@ class Game(models.Model):
         return self.name
 
     def convert_playtime(self):
-        # Convert minutes into a formatted time string: "Xh Ym Zs"
-        playtime_minutes = self.playtime_forever
-        hours, minutes = divmod(playtime_minutes, 60)
-        # Converting minutes (remaining) to seconds is optional;
-        # here we keep the minutes part intact.
-        return f"{hours}h {minutes}m"
+        return format_playtime(self.playtime_forever)
     
     def save(self, *args, **kwargs):
         # Automatically update the formatted playtime
         self.playtime_formatted = self.convert_playtime()
         super().save(*args, **kwargs)
 
+    @cached_property
+    def achievement_definitions(self):
+        """Shared schema entries for this app, keyed by apiname."""
+        schema = SteamAppSchema.objects.filter(appid=self.appid).values_list("achievements", flat=True).first()
+        return {definition["name"]: definition for definition in schema or []}
+
+    @staticmethod
+    def prefetch_achievement_definitions(games):
+        """Loads achievement_definitions for many games with one SteamAppSchema query."""
+        schemas = dict(
+            SteamAppSchema.objects.filter(appid__in={game.appid for game in games}).values_list("appid", "achievements")
+        )
+        for game in games:
+            game.__dict__["achievement_definitions"] = {
+                definition["name"]: definition for definition in schemas.get(game.appid, [])
+            }
+        return games
+
+
+class SteamAppSchema(models.Model):
+    """GetSchemaForGame achievement definitions, shared by every user who owns the app."""
+    appid = models.PositiveIntegerField(unique=True)
+    achievements = models.JSONField(default=list, blank=True)  # name (apiname), displayName, description, icon, icongray
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Schema for app {self.appid}"
+
+    @property
+    def is_stale(self):
+        ttl = getattr(settings, 'CACHE_TIMEOUTS', {}).get('STEAM_APP_SCHEMA', 7 * 24 * 3600)
+        return self.fetched_at < django_timezone.now() - timedelta(seconds=ttl)
+
+
 class Achievement(models.Model):
     game = models.ForeignKey(Game, related_name="achievements", on_delete=models.CASCADE)
+    apiname = models.CharField(max_length=255, null=True, blank=True)  # Steam's stable achievement id
     name = models.CharField(max_length=255)  # The display name from Steam
-    description = models.TextField(blank=True)
-    image = models.URLField(max_length=500, blank=True)
     unlocked = models.BooleanField(default=False)
     unlock_time = models.DateTimeField(null=True, blank=True)
+    # Copied per row before SteamAppSchema existed; only set on rows without an apiname
+    legacy_description = models.TextField(blank=True)
+    legacy_image = models.URLField(blank=True, max_length=500)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['game', 'apiname'], name='unique_steam_game_apiname')
+        ]
 
     def __str__(self):
         return f"{self.name} ({'Unlocked' if self.unlocked else 'Locked'})"
-    
+
+    # Descriptions and icons live in the shared SteamAppSchema row, not per user
+    @property
+    def definition(self):
+        return self.game.achievement_definitions.get(self.apiname, {})
+
+    @property
+    def description(self):
+        return self.definition.get("description", self.legacy_description)
+
+    @property
+    def image(self):
+        return self.definition.get("icon" if self.unlocked else "icongray", self.legacy_image)
+
+
+STEAM_SCHEMA_FIELDS = ("name", "displayName", "description", "icon", "icongray")
+
+# Game columns written by a sync (besides user and appid)
+GAME_SYNC_FIELDS = [
+    "name",
+    "playtime_forever",
+    "playtime_formatted",
+    "img_icon_url",
+    "has_community_visible_stats",
+    "last_played",
+    "content_descriptorids",
+]
+
+STEAM_GAME_FIELDS = (
+    "appid",
+    "name",
+    "playtime_forever",
+    "has_community_visible_stats",
+    "rtime_last_played",
+    "content_descriptorids",
+)
+
+
+SCHEMA_URL = "http://api.steampowered.com/ISteamUserStats/GetSchemaForGame/v2/"
+PLAYER_ACHIEVEMENTS_URL = "http://api.steampowered.com/ISteamUserStats/GetPlayerAchievements/v1/"
+
+
 class SteamAPI:
 
     @staticmethod
-    def fetch_global_achievements(appid, steam_api_key):
-        url = "http://api.steampowered.com/ISteamUserStats/GetSchemaForGame/v2/"
+    def schema_request(appid, steam_api_key):
+        return {
+            "url": SCHEMA_URL,
+            "params": {"key": steam_api_key, "appid": appid},
+            "logger_name": "steam",
+        }
+
+    @staticmethod
+    def player_achievements_request(appid, steam_id, steam_api_key):
+        return {
+            "url": PLAYER_ACHIEVEMENTS_URL,
+            "params": {
+                "key": steam_api_key,
+                "steamid": steam_id,
+                "appid": appid,
+            },
+            "logger_name": "steam",
+        }
+
+    @staticmethod
+    def parse_global_achievements(appid, response):
+        """Returns (achievements, error) for a GetSchemaForGame response or the exception raised fetching it."""
         try:
-            response = http_client.get(
-                url,
-                params={"key": steam_api_key, "appid": appid},
-                logger_name="steam",
-            )
+            if isinstance(response, Exception):
+                raise response
             data = response.json()
         except (http_client.ExternalRequestError, ValueError) as exc:
             logger.warning("Unable to fetch Steam global achievements for %s: %s", appid, exc)
             return None, "Unable to fetch achievements from Steam."
+        # An error body (429, 403, 5xx) says nothing about the app; storing it as "no achievements"
+        # would hide them from every owner until the schema goes stale
+        if response.status_code != 200:
+            logger.warning("Steam global achievements for %s returned %s", appid, response.status_code)
+            return None, "Unable to fetch achievements from Steam."
         if (
             not data.get("game")
             or not data["game"].get("availableGameStats")
             or not data["game"]["availableGameStats"].get("achievements")
         ):
-            return None, "No achievements available for this game."
+            return [], "No achievements available for this game."
         return data["game"]["availableGameStats"]["achievements"], None
 
     @staticmethod
-    def fetch_player_achievements(appid, steam_id, steam_api_key):
-        url = "http://api.steampowered.com/ISteamUserStats/GetPlayerAchievements/v1/"
+    def parse_player_achievements(response):
+        """Returns ({apiname: achievement}, error) for a GetPlayerAchievements response."""
         try:
-            response = http_client.get(
-                url,
-                params={
-                    "key": steam_api_key,
-                    "steamid": steam_id,
-                    "appid": appid,
-                },
-                logger_name="steam",
-            )
+            if isinstance(response, Exception):
+                raise response
             data = response.json()
         except (http_client.ExternalRequestError, ValueError) as e:
             logger.error(f"Failed to decode JSON: {e}")
@@ -101,79 +209,182 @@ class SteamAPI:
             return None, "Error retrieving player achievements data."
         return {ach["apiname"]: ach for ach in data["playerstats"]["achievements"]}, None
 
+    @staticmethod
+    def is_permanent_failure(response):
+        """True for a 4xx answer other than 429 (no stats for the app, private profile): a retry gets the same."""
+        return not isinstance(response, Exception) and 400 <= response.status_code < 500 and response.status_code != 429
+
     @classmethod
-    def update_game_and_achievements(cls, game_data, steam_id, steam_api_key, user=None):
-        if user is None:
-            raise ValueError("User must be provided to associate games.")
+    def fetch_global_achievements(cls, appid, steam_api_key):
+        try:
+            response = http_client.get(**cls.schema_request(appid, steam_api_key))
+        except http_client.ExternalRequestError as exc:
+            response = exc
+        return cls.parse_global_achievements(appid, response)
+
+    @staticmethod
+    def store_app_schema(appid, achievements):
+        """Saves schema achievements (as returned by Steam) to SteamAppSchema and returns the stored definitions."""
+        definitions = [
+            {field: achievement[field] for field in STEAM_SCHEMA_FIELDS if field in achievement}
+            for achievement in achievements
+        ]
+        SteamAppSchema.objects.update_or_create(
+            appid=appid,
+            defaults={"achievements": definitions, "fetched_at": django_timezone.now()},
+        )
+        return definitions
+
+    @classmethod
+    def refresh_app_schema(cls, appid, steam_api_key):
         """
-        Accepts a dictionary with game info and updates or creates Game and its related Achievements.
-        
-        Args:
-            game_data (dict): The game data from Steam API
-            steam_id (str): The Steam ID of the player
-            user (User, optional): The Django User model instance to associate with this game
+        Fetches the achievement schema for an app and stores it in SteamAppSchema.
+        Apps without achievements are stored with an empty list so they are not refetched.
+        Returns the stored definitions, or None if Steam could not be reached.
+        """
+        achievements, error = cls.fetch_global_achievements(appid, steam_api_key)
+        if achievements is None:
+            return None
+        return cls.store_app_schema(appid, achievements)
+
+    @classmethod
+    def get_app_schema(cls, appid, steam_api_key):
         """
-        # Create or update the Game instance
-        logger = logging.getLogger(__name__)
-        game_instance,_ = Game.objects.update_or_create(
+        Returns the achievement definitions for an app, reading SteamAppSchema first.
+        A missing or stale row is fetched now; if Steam cannot be reached a stale row is still served.
+        """
+        schema = SteamAppSchema.objects.filter(appid=appid).first()
+        if schema is not None and not schema.is_stale:
+            return schema.achievements
+        definitions = cls.refresh_app_schema(appid, steam_api_key)
+        if definitions is None and schema is not None:
+            return schema.achievements
+        return definitions
+
+    @classmethod
+    def fetch_player_achievements(cls, appid, steam_id, steam_api_key):
+        try:
+            response = http_client.get(**cls.player_achievements_request(appid, steam_id, steam_api_key))
+        except http_client.ExternalRequestError as exc:
+            response = exc
+        return cls.parse_player_achievements(response)
+
+    @staticmethod
+    def game_from_steam(game_data, user):
+        """Unsaved Game built from a GetOwnedGames entry, with playtime_formatted filled in."""
+        playtime_forever = game_data.get("playtime_forever", 0)
+        return Game(
+            user=user,
             appid=game_data["appid"],
-            user=user,  # Add user to query criteria
-            defaults={
-                "name": game_data.get("name", ""),
-                "playtime_forever": game_data.get("playtime_forever", 0),
-                "img_icon_url": f"https://steamcdn-a.akamaihd.net/steam/apps/{game_data.get('appid')}/library_600x900_2x.jpg",
-                "has_community_visible_stats": game_data.get("has_community_visible_stats", False),
-                "last_played": datetime.fromtimestamp(
-                    game_data.get("rtime_last_played", 0), timezone.utc
-                ) if game_data.get("rtime_last_played") else None,
-                "content_descriptorids": game_data.get("content_descriptorids", []),
-                "user": user,  # Add user to defaults as well
-            }
+            name=game_data.get("name", ""),
+            playtime_forever=playtime_forever,
+            playtime_formatted=format_playtime(playtime_forever),
+            img_icon_url=f"https://steamcdn-a.akamaihd.net/steam/apps/{game_data.get('appid')}/library_600x900_2x.jpg",
+            has_community_visible_stats=game_data.get("has_community_visible_stats", False),
+            last_played=datetime.fromtimestamp(
+                game_data.get("rtime_last_played", 0), timezone.utc
+            ) if game_data.get("rtime_last_played") else None,
+            content_descriptorids=game_data.get("content_descriptorids", []),
         )
-        
-        # Fetch achievements
-        global_achievements, error = cls.fetch_global_achievements(game_data["appid"], steam_api_key)
-        if error:
-            # You might want to log the error or handle it appropriately here.
-            return {"message": error}
 
-        player_achievements, error = cls.fetch_player_achievements(game_data["appid"], steam_id, steam_api_key)
-        if error:
-            return {"message": error}
+    @classmethod
+    def save_game(cls, game_data, user):
+        game = cls.game_from_steam(game_data, user)
+        game_instance, _ = Game.objects.update_or_create(
+            appid=game.appid,
+            user=user,
+            defaults={field: getattr(game, field) for field in GAME_SYNC_FIELDS},
+        )
+        return game_instance
 
+    @classmethod
+    def save_games(cls, games, user):
+        """
+        Upserts a GetOwnedGames list with one INSERT ... ON CONFLICT (user, appid) DO UPDATE.
+
+        Stored rows are read in one query and only new or changed games are written.
+        Writing a game clears its achievements_synced_at until its achievements are stored again.
+        Returns the game dicts whose achievements need a refresh: the written games plus
+        unchanged games whose last achievement refresh never completed.
+        """
+        stored = {
+            row[0]: (row[1], row[2:])
+            for row in Game.objects.filter(user=user).values_list(
+                "appid", "achievements_synced_at", *GAME_SYNC_FIELDS
+            )
+        }
+        changed = []
+        instances = []
+        for game_data in games:
+            game = cls.game_from_steam(game_data, user)
+            synced_at, values = stored.get(game.appid, (None, None))
+            if values != tuple(getattr(game, field) for field in GAME_SYNC_FIELDS):
+                changed.append(game_data)
+                instances.append(game)
+            elif synced_at is None:
+                changed.append(game_data)
+        if instances:
+            Game.objects.bulk_create(
+                instances,
+                update_conflicts=True,
+                unique_fields=["user", "appid"],
+                update_fields=GAME_SYNC_FIELDS + ["achievements_synced_at"],
+                batch_size=500,
+            )
+        return changed
+
+    @staticmethod
+    def save_achievements(game_instance, global_achievements, player_achievements):
+        """Upserts a game's achievements from its schema definitions and the player's unlock state."""
         unlocked_count = 0
+        achievements = []
+        for achievement in global_achievements:
+            apiname = achievement.get("name")
+            if not apiname:
+                logger.error(f"Skipping achievement without apiname: {achievement.get('displayName', 'Unknown')}")
+                continue
+            player_ach = player_achievements.get(apiname)
+            unlocked = bool(player_ach and player_ach.get("achieved", 0))
+            if unlocked:
+                unlocked_count += 1
+            unlock_time = (datetime.fromtimestamp(
+                                player_ach["unlocktime"], timezone.utc)
+                           if unlocked and player_ach.get("unlocktime")
+                           else None)
+            achievements.append(Achievement(
+                game=game_instance,
+                apiname=apiname,
+                name=achievement.get("displayName") or apiname,
+                unlocked=unlocked,
+                unlock_time=unlock_time,
+            ))
 
-        # Loop through each global achievement and update/create related achievement records
-        from django.db import transaction
-        
+        # Upsert every achievement of the game in a single statement keyed on (game, apiname)
         try:
             with transaction.atomic():
-                for achievement in global_achievements:
-                    try:
-                        apiname = achievement["name"]
-                        player_ach = player_achievements.get(apiname)
-                        unlocked = bool(player_ach and player_ach.get("achieved", 0))
-                        if unlocked:
-                            unlocked_count += 1
-                        unlock_time = (datetime.fromtimestamp(
-                                            player_ach["unlocktime"], timezone.utc)
-                                       if unlocked and player_ach.get("unlocktime")
-                                       else None)
-                        
-                        Achievement.objects.update_or_create(
-                            game=game_instance,
-                            name=achievement.get("displayName"),
-                            defaults={
-                                "description": achievement.get("description", ""),
-                                "image": achievement["icon"] if unlocked else achievement.get("icongray", ""),
-                                "unlocked": unlocked,
-                                "unlock_time": unlock_time,
-                            }
-                        )
-                    except Exception as e:
-                        logger.error(f"Error updating achievement {achievement.get('displayName', 'Unknown')}: {str(e)}")
-                        # Continue with next achievement instead of failing completely
-                        continue
+                # Drop achievements no longer in the schema, and rows stored before apiname
+                # existed (they cannot be matched and are rebuilt here), so the counters hold
+                Achievement.objects.filter(game=game_instance).exclude(
+                    apiname__in=[achievement.apiname for achievement in achievements]
+                ).delete()
+                Achievement.objects.bulk_create(
+                    achievements,
+                    update_conflicts=True,
+                    unique_fields=["game", "apiname"],
+                    update_fields=["name", "unlocked", "unlock_time"],
+                )
+                game_instance.total_achievements = len(achievements)
+                game_instance.unlocked_achievements = unlocked_count
+                game_instance.completion_pct = (
+                    unlocked_count / len(achievements) * 100 if achievements else 0
+                )
+                game_instance.achievements_synced_at = django_timezone.now()
+                Game.objects.filter(pk=game_instance.pk).update(
+                    total_achievements=game_instance.total_achievements,
+                    unlocked_achievements=game_instance.unlocked_achievements,
+                    completion_pct=game_instance.completion_pct,
+                    achievements_synced_at=game_instance.achievements_synced_at,
+                )
         except Exception as e:
             logger.error(f"Critical database error during achievement update: {str(e)}")
             return {"message": f"Database error: {str(e)}"}
@@ -185,16 +396,115 @@ class SteamAPI:
         }
 
     @classmethod
-    def get_games(cls, steam_id, steam_api_key, user=None):
+    def update_game_and_achievements(cls, game_data, steam_id, steam_api_key, user=None):
+        if user is None:
+            raise ValueError("User must be provided to associate games.")
+        """
+        Accepts a dictionary with game info and updates or creates Game and its related Achievements.
+        
+        Args:
+            game_data (dict): The game data from Steam API
+            steam_id (str): The Steam ID of the player
+            user (User, optional): The Django User model instance to associate with this game
+        """
+        game_instance = cls.save_game(game_data, user)
+
+        # Achievement definitions are shared across users
+        global_achievements = cls.get_app_schema(game_data["appid"], steam_api_key)
+        if global_achievements is None:
+            return {"message": "Unable to fetch achievements from Steam."}
+        if not global_achievements:
+            Game.objects.filter(pk=game_instance.pk).update(achievements_synced_at=django_timezone.now())
+            return {"message": "No achievements available for this game."}
+
+        player_achievements, error = cls.fetch_player_achievements(game_data["appid"], steam_id, steam_api_key)
+        if error:
+            return {"message": error}
+
+        return cls.save_achievements(game_instance, global_achievements, player_achievements)
+
+    @classmethod
+    def update_games_and_achievements(cls, games, steam_id, steam_api_key, user):
+        """
+        Batch version of update_game_and_achievements for a sync. The games must already be
+        stored (see save_games).
+
+        Missing and stale schemas and then player achievements are fetched concurrently (bounded
+        by HTTP_CLIENT_FANOUT["steam"]; the shared Steam rate limit still applies per request).
+        A stale schema that cannot be refreshed is used as stored.
+        All database writes happen on this thread, one short transaction per game.
+        Returns {appid: result} with the same result dicts as the single-game version.
+        """
+        appids = [game["appid"] for game in games]
+        concurrency = http_client.fanout_limit("steam")
+
+        schemas = {}
+        stale = set()
+        for schema in SteamAppSchema.objects.filter(appid__in=appids):
+            schemas[schema.appid] = schema.achievements
+            if schema.is_stale:
+                stale.add(schema.appid)
+
+        outdated = [appid for appid in appids if appid not in schemas or appid in stale]
+        responses = http_client.gather(
+            [cls.schema_request(appid, steam_api_key) for appid in outdated],
+            concurrency=concurrency,
+            return_exceptions=True,
+        )
+        for appid, response in zip(outdated, responses):
+            achievements, error = cls.parse_global_achievements(appid, response)
+            if achievements is not None:
+                schemas[appid] = cls.store_app_schema(appid, achievements)
+
+        with_achievements = [appid for appid in appids if schemas.get(appid)]
+        responses = http_client.gather(
+            [cls.player_achievements_request(appid, steam_id, steam_api_key) for appid in with_achievements],
+            concurrency=concurrency,
+            return_exceptions=True,
+        )
+        player_responses = dict(zip(with_achievements, responses))
+
+        game_instances = {game.appid: game for game in Game.objects.filter(user=user, appid__in=appids)}
+        results = {}
+        settled = []
+        for appid in appids:
+            game_instance = game_instances[appid]
+            if schemas.get(appid) is None:
+                results[appid] = {"message": "Unable to fetch achievements from Steam."}
+            elif not schemas[appid]:
+                results[appid] = {"message": "No achievements available for this game."}
+                settled.append(game_instance.pk)
+            else:
+                unlocks, error = cls.parse_player_achievements(player_responses[appid])
+                if error:
+                    results[appid] = {"message": error}
+                    if cls.is_permanent_failure(player_responses[appid]):
+                        settled.append(game_instance.pk)
+                else:
+                    results[appid] = cls.save_achievements(game_instance, schemas[appid], unlocks)
+        # Transient failures keep achievements_synced_at empty, so the next sync retries them;
+        # permanent ones wait until the game itself changes
+        if settled:
+            Game.objects.filter(pk__in=settled).update(achievements_synced_at=django_timezone.now())
+        return results
+
+    @classmethod
+    @http_client.track_sync("steam.games")
+    def get_games(cls, steam_id, steam_api_key, user=None, full=False):
         if user is None:
             raise ValueError("User must be provided to associate games.")
         """
         Fetches games data from the Steam API, updates the database models,
         and returns the formatted list of games.
+
+        Achievements are only refreshed for new games, games whose stored values
+        (playtime, last played, ...) changed since the previous sync and games whose
+        last achievement refresh did not complete, unless full is True.
         
         Args:
             steam_id (str): The Steam ID of the player
             user (User, optional): The Django User model instance to associate with the games
+            full (bool): Refresh achievements for every owned game
         """
         
         url = "https://api.steampowered.com/IPlayerService/GetOwnedGames/v1/"
@@ -204,24 +514,53 @@ class SteamAPI:
             "include_appinfo": True,
             "include_played_free_games": True,
         }
-        response = http_client.get(url, params=params, logger_name="steam")
+        response = http_client.get(url, params=params, logger_name="steam", stream=True)
         if response.status_code != 200:
+            response.close()
             return {"error": f"Failed to fetch games data: {response.status_code}"}
 
+        # Parse the (possibly very large) library incrementally, keeping only the
+        # fields we store instead of every app-info key Steam sends per game.
         try:
-            data = response.json()
-        except ValueError:
+            games = [
+                {field: game[field] for field in STEAM_GAME_FIELDS if field in game}
+                for game in http_client.stream_json_items(response, "response.games")
+            ]
+        except http_client.ExternalRequestError:
             return {"error": "Invalid response from Steam API."}
-        games = data.get("response", {}).get("games", [])
 
+        changed = cls.save_games(games, user)
+        refreshed = games if full else changed
+        if refreshed:
+            cls.update_games_and_achievements(refreshed, steam_id, steam_api_key, user)
+        logger.info(
+            "Steam sync for user %s refreshed %s of %s games%s",
+            user.id, len(refreshed), len(games), " (full)" if full else "",
+        )
+
+        # Retrieve fresh game data along with achievements from the database
+        game_instances = {
+            game_instance.appid: game_instance
+            for game_instance in Game.objects.filter(
+                user=user, appid__in=[game["appid"] for game in games]
+            ).prefetch_related("achievements")
+        }
+        Game.prefetch_achievement_definitions(list(game_instances.values()))
         formatted_games = []
         for game in games:
-            update_result = cls.update_game_and_achievements(game, steam_id, steam_api_key, user)
-            # Retrieve fresh game data along with achievements from the database
-            game_instance = Game.objects.get(appid=game["appid"], user=user)
-            achievements = list(game_instance.achievements.all().values(
-                "name", "description", "image", "unlocked", "unlock_time"
-            ))
+            game_instance = game_instances.get(game["appid"])
+            if game_instance is None:
+                continue
+            achievements = [
+                {
+                    "name": achievement.name,
+                    "description": achievement.description,
+                    "image": achievement.image,
+                    "unlocked": achievement.unlocked,
+                    "unlock_time": achievement.unlock_time,
+                }
+                for achievement in game_instance.achievements.all()
+            ]
             formatted_games.append({
                 "appid": game_instance.appid,
                 "name": game_instance.name,
@@ -8,8 +8,7 @@ class AchievementSerializer(serializers.ModelSerializer):
         fields = ['name', 'description', 'image', 'unlocked', 'unlock_time']
 
 class SteamSerializer(serializers.ModelSerializer):
-    total_achievements = serializers.SerializerMethodField()
-    unlocked_achievements_count = serializers.SerializerMethodField()
+    unlocked_achievements_count = serializers.IntegerField(source="unlocked_achievements", read_only=True)
     locked_achievements_count = serializers.SerializerMethodField()
     achievements = AchievementSerializer(many=True, read_only=True) 
 
@@ -17,20 +16,20 @@ class SteamSerializer(serializers.ModelSerializer):
         model = Game
         # Include all the game fields; adjust this list as needed.
         fields = [
-            "appid", "name", "playtime_forever", "playtime_formatted",
+            "id", "appid", "name", "playtime_forever", "playtime_formatted",
             "img_icon_url", "has_community_visible_stats", "last_played",
             "content_descriptorids", "total_achievements", 
             "unlocked_achievements_count", "locked_achievements_count",
             "achievements"
         ]
 
-    def get_total_achievements(self, obj):
-        return obj.achievements.count()
+    def get_locked_achievements_count(self, obj):
+        # Counters are kept on Game by the sync
+        return obj.total_achievements - obj.unlocked_achievements
 
-    def get_unlocked_achievements_count(self, obj):
-        return obj.achievements.filter(unlocked=True).count()
+class SteamGameSummarySerializer(SteamSerializer):
+    """SteamSerializer without the nested achievements, for list views."""
+    achievements = None
 
-    def get_locked_achievements_count(self, obj):
-        total = self.get_total_achievements(obj)
-        unlocked = self.get_unlocked_achievements_count(obj)
-        return total - unlocked
\ No newline at end of file
+    class Meta(SteamSerializer.Meta):
+        fields = [field for field in SteamSerializer.Meta.fields if field != "achievements"]
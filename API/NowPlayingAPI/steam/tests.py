@@ -1,8 +1,19 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+import requests
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from .models import Game
+import http_client
+
+from .models import Achievement, Game, SteamAPI, SteamAppSchema
 
 
 class SteamViewSetIsolationTests(APITestCase):
@@ -50,9 +61,397 @@ class SteamViewSetIsolationTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["appid"], self.owned_game.appid)
 
+    def test_most_achieved_list_is_ordered_by_stored_completion(self):
+        Game.objects.filter(pk=self.owned_game.pk).update(total_achievements=4, unlocked_achievements=1,
+                                                          completion_pct=25)
+        Game.objects.create(user=self.user, appid=30, name="Completed", total_achievements=2,
+                            unlocked_achievements=2, completion_pct=100)
+
+        with self.assertNumQueries(3):  # games, achievements and shared schemas; nothing per game
+            response = self.client.get("/steam/get-game-list-most-achieved/")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([game["appid"] for game in response.data["result"]], [30, 10])
+        self.assertEqual(response.data["result"][1]["total_achievements"], 4)
+        self.assertEqual(response.data["result"][1]["locked_achievements_count"], 3)
+
+    def test_stored_lists_page_by_cursor_in_summary_mode(self):
+        for appid, minutes in [(31, 500), (32, 300), (33, 300), (34, 100)]:
+            Game.objects.create(user=self.user, appid=appid, name=f"Game {appid}", playtime_forever=minutes)
+
+        seen = []
+        params = {"page_size": 2, "summary": 1}
+        while True:
+            response = self.client.get("/steam/get-game-list-total-playtime/", params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn("achievements", response.data["result"][0])
+            seen.extend(game["appid"] for game in response.data["result"])
+            if not response.data["next_cursor"]:
+                break
+            params["cursor"] = response.data["next_cursor"]
+
+        self.assertEqual(seen, [31, 33, 32, 34, 10])
+
+    def test_last_played_cursor_continues_past_unplayed_games(self):
+        Game.objects.filter(pk=self.owned_game.pk).update(last_played=timezone.now())
+        for appid in (41, 42):
+            Game.objects.create(user=self.user, appid=appid, name=f"Game {appid}")
+
+        first = self.client.get("/steam/get-game-list-stored/", {"page_size": 2})
+        second = self.client.get("/steam/get-game-list-stored/", {"page_size": 2, "cursor": first.data["next_cursor"]})
+
+        self.assertEqual([game["appid"] for game in first.data["result"]], [10, 42])
+        self.assertEqual([game["appid"] for game in second.data["result"]], [41])
+        self.assertIsNone(second.data["next_cursor"])
+
+    def test_unpaged_lists_match_the_cursor_order(self):
+        Game.objects.filter(pk=self.owned_game.pk).update(last_played=timezone.now(), playtime_forever=300)
+        for appid, minutes in [(51, 300), (52, 500), (53, 300)]:
+            Game.objects.create(user=self.user, appid=appid, name=f"Game {appid}", playtime_forever=minutes)
+
+        for url in ("/steam/get-game-list-stored/", "/steam/get-game-list-total-playtime/",
+                    "/steam/get-game-list-most-achieved/"):
+            unpaged = self.client.get(url, {"summary": 1})
+            paged = self.client.get(url, {"summary": 1, "page_size": 10})
+
+            self.assertEqual([game["appid"] for game in unpaged.data["result"]],
+                             [game["appid"] for game in paged.data["result"]])
+        self.assertEqual([game["appid"] for game in unpaged.data["result"]], [53, 52, 51, 10])
+
+    def test_invalid_cursor_is_rejected(self):
+        response = self.client.get("/steam/get-game-list-stored/", {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_game_achievements_action_is_scoped_to_the_owner(self):
+        Achievement.objects.create(game=self.owned_game, apiname="WIN", name="Win", unlocked=True)
+        Achievement.objects.create(game=self.other_game, apiname="LOSE", name="Lose")
+
+        listed = self.client.get("/steam/get-game-list-stored/", {"summary": 1})
+        response = self.client.get(f"/steam/{listed.data['result'][0]['id']}/achievements/")
+        denied = self.client.get(f"/steam/{self.other_game.id}/achievements/")
+
+        self.assertEqual([achievement["name"] for achievement in response.data["result"]], ["Win"])
+        self.assertEqual(denied.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_stored_custom_action_only_returns_authenticated_users_games(self):
         response = self.client.get("/steam/get-game-list-stored/")
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data["result"]), 1)
         self.assertEqual(response.data["result"][0]["appid"], self.owned_game.appid)
+
+
+class SteamAchievementUpsertTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="player", password="testpass123")
+        self.game_data = {"appid": 440, "name": "Team Fortress 2", "playtime_forever": 90}
+        self.schema = [
+            {"name": "ACH_A", "displayName": "Shared Name", "icon": "a.jpg", "icongray": "a_gray.jpg"},
+            {"name": "ACH_B", "displayName": "Shared Name", "icon": "b.jpg", "icongray": "b_gray.jpg"},
+        ]
+
+    def update(self, player_achievements):
+        with patch.object(SteamAPI, "fetch_global_achievements", return_value=(self.schema, None)), \
+                patch.object(SteamAPI, "fetch_player_achievements", return_value=(player_achievements, None)):
+            return SteamAPI.update_game_and_achievements(self.game_data, "steamid", "key", user=self.user)
+
+    def test_achievements_are_keyed_by_apiname_and_updated_in_place(self):
+        game = Game.objects.create(user=self.user, appid=440, name="Team Fortress 2")
+        Achievement.objects.create(game=game, name="Shared Name")
+
+        result = self.update({})
+        self.assertEqual(result["total_achievements"], 2)
+        ids = dict(Achievement.objects.filter(game=game).values_list("apiname", "id"))
+        self.assertEqual(set(ids), {"ACH_A", "ACH_B"})
+
+        result = self.update({"ACH_B": {"apiname": "ACH_B", "achieved": 1, "unlocktime": 1700000000}})
+
+        self.assertEqual(result["unlocked_achievements"], 1)
+        self.assertEqual(dict(Achievement.objects.filter(game=game).values_list("apiname", "id")), ids)
+        unlocked = Achievement.objects.get(game=game, apiname="ACH_B")
+        self.assertTrue(unlocked.unlocked)
+        self.assertEqual(unlocked.image, "b.jpg")
+        self.assertIsNotNone(unlocked.unlock_time)
+        self.assertFalse(Achievement.objects.get(game=game, apiname="ACH_A").unlocked)
+        game.refresh_from_db()
+        self.assertEqual((game.total_achievements, game.unlocked_achievements, game.completion_pct), (2, 1, 50))
+
+    def test_achievements_dropped_from_the_schema_are_removed(self):
+        self.update({})
+        SteamAppSchema.objects.filter(appid=440).update(achievements=self.schema[:1])
+
+        self.update({"ACH_A": {"apiname": "ACH_A", "achieved": 1}})
+
+        game = Game.objects.get(user=self.user, appid=440)
+        self.assertEqual(list(game.achievements.values_list("apiname", flat=True)), ["ACH_A"])
+        self.assertEqual((game.total_achievements, game.completion_pct), (1, 100))
+
+    def test_upsert_uses_one_write_per_game(self):
+        self.update({})
+
+        with CaptureQueriesContext(connection) as queries:
+            self.update({})
+
+        writes = [q["sql"] for q in queries if q["sql"].startswith("INSERT INTO \"steam_achievement\"")]
+        self.assertEqual(len(writes), 1)
+        self.assertFalse(any(q["sql"].startswith("UPDATE \"steam_achievement\"") for q in queries))
+
+
+class SteamAppSchemaTests(TestCase):
+    def setUp(self):
+        self.schema = [{"name": "ACH_A", "displayName": "First", "description": "Do it", "icon": "a.jpg",
+                        "icongray": "a_gray.jpg", "hidden": 0}]
+
+    @patch.object(SteamAPI, "fetch_global_achievements")
+    def test_schema_is_fetched_once_and_shared_between_users(self, mock_fetch):
+        mock_fetch.return_value = (self.schema, None)
+        for username in ("first", "second"):
+            user = User.objects.create_user(username=username, password="testpass123")
+            with patch.object(SteamAPI, "fetch_player_achievements", return_value=({}, None)):
+                SteamAPI.update_game_and_achievements({"appid": 570, "name": "Dota 2"}, "steamid", "key", user=user)
+
+        mock_fetch.assert_called_once_with(570, "key")
+        self.assertEqual(SteamAppSchema.objects.get(appid=570).achievements[0],
+                         {"name": "ACH_A", "displayName": "First", "description": "Do it",
+                          "icon": "a.jpg", "icongray": "a_gray.jpg"})
+        achievement = Achievement.objects.filter(game__user__username="second").get()
+        self.assertEqual((achievement.description, achievement.image), ("Do it", "a_gray.jpg"))
+
+    def test_pre_schema_rows_keep_their_description_and_icon(self):
+        user = User.objects.create_user(username="legacy", password="testpass123")
+        game = Game.objects.create(user=user, appid=570, name="Dota 2")
+        achievement = Achievement.objects.create(
+            game=game, name="First", legacy_description="Old text", legacy_image="https://example.com/a.jpg"
+        )
+
+        self.assertEqual((achievement.description, achievement.image), ("Old text", "https://example.com/a.jpg"))
+
+    @patch.object(SteamAPI, "fetch_global_achievements", return_value=([], "No achievements available for this game."))
+    def test_apps_without_achievements_are_remembered(self, mock_fetch):
+        self.assertEqual(SteamAPI.get_app_schema(10, "key"), [])
+        self.assertEqual(SteamAPI.get_app_schema(10, "key"), [])
+
+        mock_fetch.assert_called_once()
+
+    @patch.object(SteamAPI, "fetch_global_achievements", return_value=(None, "Unable to fetch achievements from Steam."))
+    def test_upstream_failures_are_not_stored(self, mock_fetch):
+        self.assertIsNone(SteamAPI.get_app_schema(10, "key"))
+        self.assertFalse(SteamAppSchema.objects.exists())
+
+    def test_error_responses_do_not_replace_a_stored_schema(self):
+        SteamAppSchema.objects.create(appid=10, achievements=self.schema,
+                                      fetched_at=timezone.now() - timedelta(days=30))
+        throttled = requests.Response()
+        throttled.status_code = 429
+        throttled._content = b"{}"
+
+        with patch("steam.models.http_client.get", return_value=throttled):
+            self.assertIsNone(SteamAPI.refresh_app_schema(10, "key"))
+
+        self.assertEqual(SteamAppSchema.objects.get(appid=10).achievements, self.schema)
+
+    def test_stale_schema_is_refreshed_before_it_is_served(self):
+        SteamAppSchema.objects.create(appid=10, achievements=self.schema,
+                                      fetched_at=timezone.now() - timedelta(days=30))
+        renamed = [dict(self.schema[0], displayName="Renamed")]
+
+        with patch.object(SteamAPI, "fetch_global_achievements", return_value=(renamed, None)):
+            self.assertEqual(SteamAPI.get_app_schema(10, "key")[0]["displayName"], "Renamed")
+
+        self.assertFalse(SteamAppSchema.objects.get(appid=10).is_stale)
+
+    @patch.object(SteamAPI, "fetch_global_achievements", return_value=(None, "Unable to fetch achievements from Steam."))
+    def test_stale_schema_is_served_when_steam_is_down(self, mock_fetch):
+        SteamAppSchema.objects.create(appid=10, achievements=self.schema,
+                                      fetched_at=timezone.now() - timedelta(days=30))
+
+        self.assertEqual(SteamAPI.get_app_schema(10, "key"), self.schema)
+
+
+def owned_games_response(games):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps({"response": {"game_count": len(games), "games": games}}).encode()
+    response._content_consumed = True
+    return response
+
+
+class SteamIncrementalSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="player", password="testpass123")
+        SteamAPI.save_games([
+            {"appid": 1, "name": "Unchanged", "playtime_forever": 60, "rtime_last_played": 1700000000},
+            {"appid": 2, "name": "Played", "playtime_forever": 10, "rtime_last_played": 1600000000},
+        ], self.user)
+        Game.objects.filter(user=self.user).update(achievements_synced_at=timezone.now())
+        self.games = [
+            {"appid": 1, "name": "Unchanged", "playtime_forever": 60, "rtime_last_played": 1700000000},
+            {"appid": 2, "name": "Played", "playtime_forever": 25, "rtime_last_played": 1710000000},
+            {"appid": 3, "name": "New", "playtime_forever": 0, "rtime_last_played": 0},
+        ]
+
+    def sync(self, **kwargs):
+        with patch("steam.models.http_client.get", return_value=owned_games_response(self.games)), \
+                patch.object(SteamAPI, "update_games_and_achievements") as mock_update:
+            result = SteamAPI.get_games("steamid", "key", user=self.user, **kwargs)
+        refreshed = [game["appid"] for game in mock_update.call_args.args[0]] if mock_update.called else []
+        return result, refreshed
+
+    def test_only_new_and_changed_games_are_refreshed(self):
+        result, refreshed = self.sync()
+
+        self.assertEqual(refreshed, [2, 3])
+        self.assertEqual([game["appid"] for game in result["games"]], [1, 2, 3])
+
+    def test_owned_games_are_upserted_in_one_statement(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.sync()
+
+        writes = [q["sql"] for q in queries if q["sql"].startswith(("INSERT", "UPDATE"))]
+        self.assertEqual(len(writes), 1)
+        self.assertIn("ON CONFLICT", writes[0])
+        played = Game.objects.get(user=self.user, appid=2)
+        self.assertEqual((played.playtime_forever, played.playtime_formatted), (25, "0h 25m"))
+        self.assertTrue(Game.objects.filter(user=self.user, appid=3, name="New").exists())
+
+    def test_unchanged_library_writes_nothing(self):
+        self.games = self.games[:1]
+
+        with CaptureQueriesContext(connection) as queries:
+            _, refreshed = self.sync()
+
+        self.assertEqual(refreshed, [])
+        self.assertFalse([q for q in queries if q["sql"].startswith(("INSERT", "UPDATE"))])
+
+    def test_games_whose_achievements_never_synced_are_refreshed(self):
+        # e.g. rows from before apiname existed, or a previous sync whose fetch failed
+        Game.objects.filter(user=self.user, appid=1).update(achievements_synced_at=None)
+
+        _, refreshed = self.sync()
+
+        self.assertEqual(refreshed, [1, 2, 3])
+
+    def test_changed_games_stay_unsynced_until_achievements_are_stored(self):
+        self.sync()
+
+        self.assertIsNone(Game.objects.get(user=self.user, appid=2).achievements_synced_at)
+        self.assertIsNotNone(Game.objects.get(user=self.user, appid=1).achievements_synced_at)
+
+    def test_full_sync_refreshes_every_game(self):
+        _, refreshed = self.sync(full=True)
+
+        self.assertEqual(refreshed, [1, 2, 3])
+
+    def test_response_loads_schemas_in_one_query(self):
+        for game in Game.objects.filter(user=self.user):
+            SteamAppSchema.objects.create(
+                appid=game.appid, achievements=[{"name": "ACH", "description": "Done"}], fetched_at=timezone.now()
+            )
+            Achievement.objects.create(game=game, apiname="ACH", name="Achievement")
+
+        with CaptureQueriesContext(connection) as queries:
+            result, _ = self.sync(full=True)
+
+        schema_queries = [q["sql"] for q in queries if "steam_steamappschema" in q["sql"]]
+        self.assertEqual(len(schema_queries), 1)
+        self.assertEqual(result["games"][0]["achievements"][0]["description"], "Done")
+
+
+def json_response(payload, status_code=200):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps(payload).encode()
+    return response
+
+
+class SteamBatchAchievementTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="player", password="testpass123")
+        SteamAppSchema.objects.create(appid=2, achievements=[], fetched_at=timezone.now())
+        SteamAppSchema.objects.create(appid=4, achievements=[{"name": "OLD"}],
+                                      fetched_at=timezone.now() - timedelta(days=30))
+
+    def fake_gather(self, calls, **kwargs):
+        responses = []
+        for call in calls:
+            appid = call["params"]["appid"]
+            if call["url"].endswith("GetSchemaForGame/v2/"):
+                if appid in (3, 4):
+                    responses.append(http_client.ExternalRequestError("down"))
+                else:
+                    responses.append(json_response({"game": {"availableGameStats": {"achievements": [
+                        {"name": "WIN", "displayName": "Win", "icon": "win.jpg", "icongray": "win_gray.jpg"},
+                    ]}}}))
+            elif appid in (5, 6):
+                # 5 has no stats for this player for good; 6 hit a Steam outage
+                responses.append(json_response({"playerstats": {"success": False}}, 403 if appid == 5 else 503))
+            else:
+                responses.append(json_response({"playerstats": {"achievements": [
+                    {"apiname": "WIN", "achieved": 1, "unlocktime": 1700000000},
+                ]}}))
+        self.batches.append([(call["url"].rsplit("/", 3)[-3], call["params"]["appid"]) for call in calls])
+        self.assertEqual(kwargs["concurrency"], http_client.fanout_limit("steam"))
+        return responses
+
+    def test_fetches_run_in_batches_and_writes_stay_on_the_caller(self):
+        self.batches = []
+        games = [{"appid": appid, "name": f"Game {appid}"} for appid in (1, 2, 3)]
+        SteamAPI.save_games(games, self.user)
+
+        with patch("steam.models.http_client.gather", side_effect=self.fake_gather):
+            results = SteamAPI.update_games_and_achievements(games, "steamid", "key", self.user)
+
+        # Schemas for unknown apps first, then unlocks only for apps that have achievements
+        self.assertEqual(self.batches, [
+            [("GetSchemaForGame", 1), ("GetSchemaForGame", 3)],
+            [("GetPlayerAchievements", 1)],
+        ])
+        self.assertEqual(results[1]["unlocked_achievements"], 1)
+        self.assertEqual(results[2], {"message": "No achievements available for this game."})
+        self.assertEqual(results[3], {"message": "Unable to fetch achievements from Steam."})
+        self.assertEqual(Game.objects.filter(user=self.user).count(), 3)
+        self.assertTrue(Achievement.objects.get(game__appid=1, apiname="WIN").unlocked)
+        self.assertFalse(SteamAppSchema.objects.filter(appid=3).exists())
+
+    def test_stale_schemas_are_refreshed_in_the_same_batch(self):
+        self.batches = []
+        games = [{"appid": appid, "name": f"Game {appid}"} for appid in (1, 4)]
+        SteamAPI.save_games(games, self.user)
+
+        with patch("steam.models.http_client.gather", side_effect=self.fake_gather):
+            SteamAPI.update_games_and_achievements(games, "steamid", "key", self.user)
+
+        # The refresh of app 4 failed, so its stored schema is still used
+        self.assertEqual(self.batches, [
+            [("GetSchemaForGame", 1), ("GetSchemaForGame", 4)],
+            [("GetPlayerAchievements", 1), ("GetPlayerAchievements", 4)],
+        ])
+        self.assertEqual(Achievement.objects.get(game__appid=4).apiname, "OLD")
+
+    def test_failed_games_are_retried_on_the_next_sync(self):
+        self.batches = []
+        games = [{"appid": appid, "name": f"Game {appid}"} for appid in (1, 2, 3)]
+        SteamAPI.save_games(games, self.user)
+
+        with patch("steam.models.http_client.gather", side_effect=self.fake_gather):
+            SteamAPI.update_games_and_achievements(games, "steamid", "key", self.user)
+
+        self.assertEqual(
+            [game["appid"] for game in SteamAPI.save_games(games, self.user)], [3]
+        )
+
+    def test_only_transient_player_failures_are_retried(self):
+        self.batches = []
+        for appid in (5, 6):
+            SteamAppSchema.objects.create(appid=appid, achievements=[{"name": "WIN"}], fetched_at=timezone.now())
+        games = [{"appid": appid, "name": f"Game {appid}"} for appid in (5, 6)]
+        SteamAPI.save_games(games, self.user)
+
+        with patch("steam.models.http_client.gather", side_effect=self.fake_gather):
+            results = SteamAPI.update_games_and_achievements(games, "steamid", "key", self.user)
+
+        self.assertEqual(results[5], {"message": "Error retrieving player achievements data."})
+        self.assertEqual(
+            [game["appid"] for game in SteamAPI.save_games(games, self.user)], [6]
+        )
@@ -1,10 +1,12 @@
 from django.conf import settings
 from django.core.cache import cache
+from django.db.models import prefetch_related_objects
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Game, SteamAPI  # Using the new Game model instead of a JSON-field-based model.
-from .serializers import SteamSerializer
+from .serializers import AchievementSerializer, SteamGameSummarySerializer, SteamSerializer
+from query_params import keyset_ordering, keyset_page
 from users.credentials import get_service_credentials
 # This is our helper that wraps fetching/updating logic.
 
@@ -21,13 +23,16 @@ class SteamViewSet(viewsets.ModelViewSet):
         steam_id = api_key.service_user_id
         steam_api_key = api_key.api_key
 
+        # ?full=1 refreshes achievements for every owned game, not just changed ones
+        full = request.query_params.get("full", "").lower() in ("1", "true")
+
         cache_key = f"steam_games_{request.user.id}_{steam_id}"
         cached_result = cache.get(cache_key)
 
-        if cached_result:
+        if cached_result and not full:
             return Response({"result": cached_result})
 
-        result = SteamAPI.get_games(steam_id, steam_api_key, user=request.user)
+        result = SteamAPI.get_games(steam_id, steam_api_key, user=request.user, full=full)
 
         if isinstance(result, dict) and result.get("error"):
             return Response({"error": result["error"]}, status=502)
@@ -45,64 +50,68 @@ class SteamViewSet(viewsets.ModelViewSet):
 
         return Response({"result": result})
             
+    def _stored_game_list(self, request, cache_key, field_name):
+        """
+        Stored games sorted by ``field_name``, highest first, in the same order with or without paging.
+
+        ?summary=1 leaves out the nested achievements (see the per-game achievements action), and
+        ?page_size=/?cursor= return one keyset page plus ``next_cursor``. Summary and paged responses
+        are not cached; the full list keeps its 15 minute cache.
+        """
+        summary = request.query_params.get("summary", "").lower() in ("1", "true")
+        serializer_class = SteamGameSummarySerializer if summary else SteamSerializer
+        paged = "cursor" in request.query_params or "page_size" in request.query_params
+
+        if paged:
+            games, next_cursor = keyset_page(
+                self.get_queryset(),
+                request.query_params,
+                field_name,
+                default_page_size=settings.REST_FRAMEWORK.get("PAGE_SIZE", 25),
+            )
+        else:
+            # Check cache first - SAFE OPTIMIZATION
+            cached_result = None if summary else cache.get(cache_key)
+            if cached_result:
+                return Response({"result": cached_result})
+            games = list(self.get_queryset().order_by(*keyset_ordering(field_name)))
+
+        if not summary:
+            prefetch_related_objects(games, "achievements")
+            Game.prefetch_achievement_definitions(games)
+        data = serializer_class(games, many=True).data
+
+        if paged:
+            return Response({"result": data, "next_cursor": next_cursor})
+        if not summary:
+            # Cache for 15 minutes - SAFE OPTIMIZATION
+            cache.set(cache_key, data, 900)
+        return Response({"result": data})
+
     @action(detail=False, methods=["get"], url_path="get-game-list-stored")
     def getGameListStored(self, request):
-        # Check cache first - SAFE OPTIMIZATION
-        cache_key = f"steam_stored_{request.user.id}"
-        cached_result = cache.get(cache_key)
-        if cached_result:
-            return Response({"result": cached_result})
-        
-        # Retrieve stored games and sort by last played (most recent first).
-        games = self.get_queryset().select_related('user').order_by("-last_played")
-        serializer = SteamSerializer(games, many=True)
-        
-        # Cache for 15 minutes - SAFE OPTIMIZATION
-        cache.set(cache_key, serializer.data, 900)
-        
-        return Response({"result": serializer.data})
+        # Sorted by last played (most recent first).
+        return self._stored_game_list(
+            request, f"steam_stored_{request.user.id}", "last_played"
+        )
 
     @action(detail=False, methods=["get"], url_path="get-game-list-total-playtime")
     def getGameListPlaytimeForever(self, request):
-        # Check cache first - SAFE OPTIMIZATION
-        cache_key = f"steam_playtime_{request.user.id}"
-        cached_result = cache.get(cache_key)
-        if cached_result:
-            return Response({"result": cached_result})
-        
-        # Sorting stored games based on playtime_forever.
-        games = self.get_queryset().select_related('user').order_by("-playtime_forever")
-        serializer = SteamSerializer(games, many=True)
-        
-        # Cache for 15 minutes - SAFE OPTIMIZATION
-        cache.set(cache_key, serializer.data, 900)
-        
-        return Response({"result": serializer.data})
+        # Sorted by playtime_forever (most played first).
+        return self._stored_game_list(
+            request, f"steam_playtime_{request.user.id}", "playtime_forever"
+        )
 
     @action(detail=False, methods=["get"], url_path="get-game-list-most-achieved")
     def getGameListMostAchieved(self, request):
-        # Check cache first - SAFE OPTIMIZATION
-        cache_key = f"steam_achievements_{request.user.id}"
-        cached_result = cache.get(cache_key)
-        if cached_result:
-            return Response({"result": cached_result})
-        
-        # Retrieve all games with their related achievements for processing.
-        games = list(self.get_queryset().prefetch_related("achievements").select_related('user'))
-
-        # Helper function: Calculate unlocked achievement percentage.
-        def achievement_percentage(game):
-            total = game.achievements.count()
-            if total == 0:
-                return 0
-            unlocked = game.achievements.filter(unlocked=True).count()
-            return (unlocked / total) * 100
-
-        # Sort games by the percentage of unlocked achievements (highest first).
-        sorted_games = sorted(games, key=achievement_percentage, reverse=True)
-        serializer = SteamSerializer(sorted_games, many=True)
-        
-        # Cache for 15 minutes - SAFE OPTIMIZATION
-        cache.set(cache_key, serializer.data, 900)
-        
-        return Response({"result": serializer.data})
+        # Sorted by the percentage of unlocked achievements (highest first).
+        return self._stored_game_list(
+            request, f"steam_achievements_{request.user.id}", "completion_pct"
+        )
+
+    @action(detail=True, methods=["get"], url_path="achievements")
+    def achievements(self, request, pk=None):
+        """Achievements of one stored game, for clients using the summary lists."""
+        game = self.get_object()
+        achievements = list(game.achievements.order_by("id"))
+        return Response({"result": AchievementSerializer(achievements, many=True).data})
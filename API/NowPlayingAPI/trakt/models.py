@@ -251,6 +251,8 @@ def fetch_tmdb_poster_for_movie(tmdb_id):
                 'language': 'en-US'
             },
             logger_name="trakt",
+            cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
+            coalesce=True,
         )
         if tmdb_response.status_code == 200:
             tmdb_data = tmdb_response.json()
@@ -307,6 +309,8 @@ def fetch_tmdb_movie_metadata(tmdb_id):
                 "append_to_response": "credits",
             },
             logger_name="trakt",
+            cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
+            coalesce=True,
         )
         if response.status_code != 200:
             return {}
@@ -352,6 +356,8 @@ def fetch_tmdb_poster_for_show(tmdb_id):
                 'language': 'en-US'
             },
             logger_name="trakt",
+            cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
+            coalesce=True,
         )
         if tmdb_response.status_code == 200:
             tmdb_data = tmdb_response.json()
@@ -377,6 +383,8 @@ def fetch_tmdb_show_metadata(tmdb_id):
                 "language": "en-US",
             },
             logger_name="trakt",
+            cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
+            coalesce=True,
         )
         if response.status_code != 200:
             return {}
@@ -504,6 +512,7 @@ def _process_single_movie(user, item):
     return {"success": True, "title": title, "trakt_id": trakt_id}
 
 
+@http_client.track_sync("trakt.movies")
 def fetch_latest_watched_movies(user):
     """
     Fetches the latest watched movies from Trakt and updates/creates records in the database for a specific user.
@@ -521,6 +530,7 @@ def fetch_latest_watched_movies(user):
     return sorted_data
 
 
+@http_client.track_sync("trakt.movie")
 def fetch_single_movie(user, trakt_id):
     """
     Fetches and updates a specific movie by trakt_id from Trakt API.
@@ -579,6 +589,41 @@ def fetch_single_movie(user, trakt_id):
     return {"message": f"Movie {result.get('title', trakt_id)} updated successfully", "trakt_id": trakt_id}
 
 
+def _fetch_episode_details(trakt_id, tmdb_id, episode_keys, headers):
+    """
+    Fetches Trakt episode details and TMDB episode stills for every
+    (season_number, episode_number) in ``episode_keys`` concurrently.
+    Returns {(season, episode): (trakt_response, tmdb_response)}; a response is
+    None when the request failed or, for TMDB, when the show has no TMDB id.
+    """
+    calls = []
+    for season_number, episode_number in episode_keys:
+        calls.append({
+            "url": f"https://api.trakt.tv/shows/{trakt_id}/seasons/{season_number}/episodes/{episode_number}?extended=full",
+            "headers": headers,
+            "logger_name": "trakt",
+        })
+        if tmdb_id:
+            calls.append({
+                "url": f"https://api.themoviedb.org/3/tv/{tmdb_id}/season/{season_number}/episode/{episode_number}?api_key={settings.TMDB_API_KEY}&language=en-US",
+                "logger_name": "trakt",
+                "cache_ttl": http_client.response_cache_ttl("TMDB_METADATA"),
+            })
+
+    responses = iter([
+        None if isinstance(response, Exception) else response
+        for response in http_client.gather(
+            calls,
+            concurrency=http_client.fanout_limit("trakt"),
+            return_exceptions=True,
+        )
+    ])
+    return {
+        key: (next(responses), next(responses) if tmdb_id else None)
+        for key in episode_keys
+    }
+
+
 def _process_single_show(user, item, headers):
     """
     Helper function to process a single show item from Trakt API.
@@ -675,6 +720,16 @@ def _process_single_show(user, item, headers):
 
     # Loop through each season in the result
     seasons = item.get("seasons", [])
+    episode_responses = _fetch_episode_details(
+        trakt_id,
+        tmdb_id,
+        [
+            (season.get("number"), episode.get("number"))
+            for season in seasons
+            for episode in season.get("episodes", [])
+        ],
+        headers,
+    )
     for season in seasons:
         season_number = season.get("number")
         season_obj, _ = Season.objects.get_or_create(
@@ -689,10 +744,9 @@ def _process_single_show(user, item, headers):
             plays = episode.get("plays", 0)
             logger.info("Processing show %s S:%s E:%s", title, season_number, episode_number)
 
-            # Make an extra API call to fetch detailed info for the episode
-            ep_url = f"https://api.trakt.tv/shows/{trakt_id}/seasons/{season_number}/episodes/{episode_number}?extended=full"
-            ep_response = http_client.get(ep_url, headers=headers, logger_name="trakt")
-            if ep_response.status_code == 200:
+            # Detailed episode info (and its TMDB still) was fetched up front
+            ep_response, tmdb_response = episode_responses[(season_number, episode_number)]
+            if ep_response is not None and ep_response.status_code == 200:
                 ep_details = ep_response.json()
                 episode_title = ep_details.get("title")
                 overview = ep_details.get("overview")
@@ -713,19 +767,13 @@ def _process_single_show(user, item, headers):
 
                 episode_image_url = None
 
-                if tmdb_id:
-                    tmdb_api_key = (
-                        settings.TMDB_API_KEY
-                    )  # Ensure you have this in your settings
-                    tmdb_url = f"https://api.themoviedb.org/3/tv/{tmdb_id}/season/{season_number}/episode/{episode_number}?api_key={tmdb_api_key}&language=en-US"
-                    tmdb_response = http_client.get(tmdb_url, logger_name="trakt")
-                    if tmdb_response.status_code == 200:
-                        tmdb_data = tmdb_response.json()
-                        still_path = tmdb_data.get("still_path")
-                        if still_path:
-                            episode_image_url = (
-                                f"https://image.tmdb.org/t/p/w780{still_path}"
-                            )
+                if tmdb_response is not None and tmdb_response.status_code == 200:
+                    tmdb_data = tmdb_response.json()
+                    still_path = tmdb_data.get("still_path")
+                    if still_path:
+                        episode_image_url = (
+                            f"https://image.tmdb.org/t/p/w780{still_path}"
+                        )
 
                 # Update or create the episode record
                 episode_obj, _ = Episode.objects.update_or_create(
@@ -777,6 +825,7 @@ def _process_single_show(user, item, headers):
     return {"success": True, "title": title, "trakt_id": trakt_id}
 
 
+@http_client.track_sync("trakt.shows")
 def fetch_latest_watched_shows(user):
     """
     Fetches the latest watched TV shows from Trakt and updates/creates records for shows,
@@ -811,6 +860,7 @@ def fetch_latest_watched_shows(user):
     return {"message": "Shows fetched and stored successfully", "count": len(sorted_data)}
 
 
+@http_client.track_sync("trakt.show")
 def fetch_single_show(user, trakt_id):
     """
     Fetches and updates a specific show by trakt_id from Trakt API.
@@ -3,9 +3,9 @@ from django.test import TestCase
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APITestCase
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
-from .models import Movie, Show, _process_single_movie, _process_single_show
+from .models import Episode, Movie, Show, _process_single_movie, _process_single_show
 
 
 class TraktShowSyncTests(TestCase):
@@ -104,6 +104,40 @@ class TraktShowSyncTests(TestCase):
         self.assertEqual(show.runtime, 50)
         self.assertEqual(show.rating, 8.2)
 
+    @patch("trakt.models.fetch_tmdb_show_metadata", return_value={})
+    @patch("trakt.models.http_client.gather")
+    def test_process_single_show_fetches_episode_details_in_one_batch(self, mock_gather, _mock_metadata):
+        user = User.objects.create_user(username="episode-batch-user")
+        episode_details = []
+        for number in (1, 2):
+            trakt_response = MagicMock(status_code=200)
+            trakt_response.json.return_value = {"title": f"Episode {number}", "ids": {"trakt": number}}
+            tmdb_response = MagicMock(status_code=200)
+            tmdb_response.json.return_value = {"still_path": f"/still{number}.jpg"}
+            episode_details.extend([trakt_response, tmdb_response])
+        mock_gather.return_value = episode_details
+        item = {
+            "last_watched_at": "2026-05-20T00:00:00.000Z",
+            "show": {"title": "Batch Show", "ids": {"trakt": 777, "tmdb": 888, "slug": "batch-show"}},
+            "seasons": [
+                {
+                    "number": 1,
+                    "episodes": [
+                        {"number": 1, "plays": 1, "last_watched_at": "2026-05-19T00:00:00.000Z"},
+                        {"number": 2, "plays": 1, "last_watched_at": "2026-05-20T00:00:00.000Z"},
+                    ],
+                }
+            ],
+        }
+
+        _process_single_show(user, item, headers={})
+
+        mock_gather.assert_called_once()
+        self.assertEqual(len(mock_gather.call_args.args[0]), 4)
+        episodes = Episode.objects.filter(show__user=user).order_by("episode_number")
+        self.assertEqual([episode.title for episode in episodes], ["Episode 1", "Episode 2"])
+        self.assertEqual(episodes[1].image_url, "https://image.tmdb.org/t/p/w780/still2.jpg")
+
 
 class TraktCompletedMediaTests(APITestCase):
     def test_completed_media_without_trakt_token_returns_db_movies(self):
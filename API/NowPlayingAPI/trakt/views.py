@@ -306,7 +306,12 @@ class TraktViewSet(viewsets.ViewSet):
             
             # Fetch all seasons for the show (this includes all episodes)
             seasons_url = f"https://api.trakt.tv/shows/{trakt_id}/seasons?extended=episodes"
-            seasons_response = http_client.get(seasons_url, headers=headers, logger_name="trakt")
+            seasons_response = http_client.get(
+                seasons_url,
+                headers=headers,
+                logger_name="trakt",
+                cache_ttl=http_client.response_cache_ttl("TRAKT_SEASONS"),
+            )
             
             if seasons_response.status_code != 200:
                 logger.warning(f"Failed to fetch seasons from Trakt: {seasons_response.status_code}")
@@ -391,7 +396,11 @@ class TraktViewSet(viewsets.ViewSet):
                         try:
                             tmdb_api_key = settings.TMDB_API_KEY
                             tmdb_ep_url = f"https://api.themoviedb.org/3/tv/{show_obj.tmdb_id}/season/{season_number}/episode/{episode_number}?api_key={tmdb_api_key}&language=en-US"
-                            tmdb_ep_response = http_client.get(tmdb_ep_url, logger_name="trakt")
+                            tmdb_ep_response = http_client.get(
+                                tmdb_ep_url,
+                                logger_name="trakt",
+                                cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
+                            )
                             if tmdb_ep_response.status_code == 200:
                                 tmdb_ep_data = tmdb_ep_response.json()
                                 still_path = tmdb_ep_data.get("still_path")
@@ -1331,6 +1340,7 @@ curl -X POST \\<br>
                                 'append_to_response': 'images'
                             },
                             logger_name="trakt",
+                            cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
                         )
                         if tmdb_response.ok:
                             tmdb_data = tmdb_response.json()
@@ -1371,6 +1381,7 @@ curl -X POST \\<br>
                                 'append_to_response': 'images'
                             },
                             logger_name="trakt",
+                            cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
                         )
                         if tmdb_response.ok:
                             tmdb_data = tmdb_response.json()
@@ -1410,6 +1421,7 @@ curl -X POST \\<br>
                                 'api_key': settings.TMDB_API_KEY
                             },
                             logger_name="trakt",
+                            cache_ttl=http_client.response_cache_ttl("TMDB_METADATA"),
                         )
                         if tmdb_response.ok:
                             tmdb_data = tmdb_response.json()
@@ -1568,7 +1580,12 @@ curl -X POST \\<br>
             try:
                 # Fetch total episodes from Trakt API to verify completion
                 seasons_url = f"https://api.trakt.tv/shows/{show.trakt_id}/seasons?extended=episodes"
-                seasons_response = http_client.get(seasons_url, headers=headers, logger_name="trakt")
+                seasons_response = http_client.get(
+                    seasons_url,
+                    headers=headers,
+                    logger_name="trakt",
+                    cache_ttl=http_client.response_cache_ttl("TRAKT_SEASONS"),
+                )
                 
                 if seasons_response.status_code == 200:
                     trakt_seasons_data = seasons_response.json()
@@ -1695,10 +1712,13 @@ curl -X POST \\<br>
         """
         try:
             headers = get_trakt_headers(request.user)
+            # Trending is not user-specific; leaving out the OAuth token lets
+            # concurrent requests from different users share one upstream call.
+            headers.pop("Authorization", None)
             
             # Fetch trending movies
             movies_url = "https://api.trakt.tv/movies/trending?limit=10"
-            movies_response = http_client.get(movies_url, headers=headers, logger_name="trakt")
+            movies_response = http_client.get(movies_url, headers=headers, logger_name="trakt", coalesce=True)
             trending_movies = []
             
             if movies_response.status_code == 200:
@@ -1716,7 +1736,7 @@ curl -X POST \\<br>
             
             # Fetch trending shows
             shows_url = "https://api.trakt.tv/shows/trending?limit=10"
-            shows_response = http_client.get(shows_url, headers=headers, logger_name="trakt")
+            shows_response = http_client.get(shows_url, headers=headers, logger_name="trakt", coalesce=True)
             trending_shows = []
             
             if shows_response.status_code == 200:
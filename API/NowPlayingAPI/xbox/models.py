@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from datetime import datetime, timedelta
 from django.contrib.auth.models import User
 import logging
@@ -34,7 +34,14 @@ class XboxAchievement(models.Model):
     
     def __str__(self):
         return f"{self.name} ({'Unlocked' if self.unlocked else 'Locked'})"
-    
+
+# Achievement fields returned with each game by fetch_games and get_games_stored
+ACHIEVEMENT_RESPONSE_FIELDS = ("name", "description", "image", "unlocked", "unlock_time", "achievement_value")
+XBOX_GAME_SYNC_FIELDS = ["name", "platform", "total_playtime", "first_played", "last_played", "img_icon_url"]
+XBOX_ACHIEVEMENT_SYNC_FIELDS = ["description", "image", "unlocked", "unlock_time", "achievement_value"]
+# OpenXBL's timeUnlocked for achievements that are still locked
+LOCKED_TIME_UNLOCKED = "0001-01-01T00:00:00.0000000Z"
+
 class XboxAPI:
     XBOX_DEVICE_MARKERS = {"PC", "XboxOne", "XboxSeries", "Xbox360"}
     GENERIC_SERVICE_CONFIG_ID = "00000000-0000-0000-0000-000000000000"
@@ -46,6 +53,33 @@ class XboxAPI:
         except (TypeError, ValueError):
             return 0
 
+    @staticmethod
+    def parse_response(url, response):
+        """
+        Content of an OpenXBL response (unwrapping {"code": ..., "content": {...}}), or {}
+        when the request failed. response may be the exception raised by http_client.gather.
+        """
+        if isinstance(response, Exception):
+            logger.error(f"Request error: {str(response)}")
+            return {}
+        if response.status_code != 200:
+            logger.error(f"Bad response from URL {url}: {response.status_code} {response.reason}")
+            return {}
+        try:
+            data = response.json()
+        except ValueError:
+            logger.error(f"Error parsing JSON from URL: {url}")
+            return {}
+
+        if isinstance(data, dict) and "content" in data and "code" in data:
+            if data.get("code") != 200:
+                logger.error("OpenXBL returned code %s for URL %s", data.get("code"), url)
+                return {}
+            content = data.get("content")
+            return content if isinstance(content, dict) else {}
+
+        return data
+
     @staticmethod
     def make_request(url, api_key):
         headers = {
@@ -53,27 +87,59 @@ class XboxAPI:
         }
         try:
             response = http_client.get(url, headers=headers, logger_name="xbox")
-            if response.status_code == 200:
-                try:
-                    data = response.json()
-                except ValueError:
-                    logger.error(f"Error parsing JSON from URL: {url}")
-                    return {}
-
-                if isinstance(data, dict) and "content" in data and "code" in data:
-                    if data.get("code") != 200:
-                        logger.error("OpenXBL returned code %s for URL %s", data.get("code"), url)
-                        return {}
-                    content = data.get("content")
-                    return content if isinstance(content, dict) else {}
-
-                return data
-            else:
-                logger.error(f"Bad response from URL {url}: {response.status_code} {response.reason}")
-                return {}
         except Exception as e:
+            response = e
+        return XboxAPI.parse_response(url, response)
+
+    @staticmethod
+    def title_requests(appid, xbox_api_key, xuid):
+        """The OpenXBL stats and achievements requests for one title, as http_client.gather calls."""
+        headers = {"x-authorization": xbox_api_key}
+        return [
+            {"url": f"https://xbl.io/api/v2/achievements/stats/{appid}/", "headers": headers, "logger_name": "xbox"},
+            {"url": f"https://xbl.io/api/v2/achievements/player/{xuid}/{appid}/", "headers": headers, "logger_name": "xbox"},
+        ]
+
+    @classmethod
+    def fetch_title_history(cls, api_key):
+        """
+        Streams the player's title history and returns only the supported Xbox titles,
+        so generic Win32 activity is dropped as it is parsed. Returns None on failure.
+        """
+        url = "https://xbl.io/api/v2/player/titleHistory"
+        logger.info(f"Making request to URL: {url}")
+        try:
+            response = http_client.get(url, headers={"x-authorization": api_key}, logger_name="xbox", stream=True)
+            if response.status_code != 200:
+                logger.error(f"Bad response from URL {url}: {response.status_code} {response.reason}")
+                response.close()
+                return None
+
+            titles = http_client.stream_json_items(response, "titles")
+            titles_count = 0
+            xbox_games = []
+            for game in titles:
+                titles_count += 1
+                if cls.is_supported_xbox_title(game):
+                    xbox_games.append(game)
+
+            if not titles.found:
+                # OpenXBL sometimes wraps the payload as {"code": ..., "content": {...}}
+                if titles.fields.get("code") not in (None, 200):
+                    logger.error("OpenXBL returned code %s for URL %s", titles.fields.get("code"), url)
+                    return None
+                content = titles.fields.get("content")
+                raw_titles = content.get("titles", []) if isinstance(content, dict) else []
+                titles_count = len(raw_titles)
+                xbox_games = [game for game in raw_titles if cls.is_supported_xbox_title(game)]
+        except http_client.ExternalRequestError as e:
             logger.error(f"Request error: {str(e)}")
-            return {}
+            return None
+
+        logger.info(f"Titles obtained: {titles_count}")
+        logger.info(f"Titles after Xbox ecosystem filtering: {len(xbox_games)}")
+        logger.info(f"Titles excluded as generic Win32/non-Xbox activity: {titles_count - len(xbox_games)}")
+        return xbox_games
 
     @classmethod
     def is_supported_xbox_title(cls, game):
@@ -112,10 +178,10 @@ class XboxAPI:
         return has_package_identity and has_xbox_live_metadata
     
     @staticmethod
-    def needs_update(game: dict, user) -> bool:
+    def needs_update(game: dict, stored_last_played: dict) -> bool:
         """
         Returns True if the game should be created or updated (based on last_played),
-        otherwise returns False.
+        otherwise returns False. stored_last_played maps the user's stored appids to their last_played.
         """
 
         appid = game["titleId"]
@@ -125,20 +191,132 @@ class XboxAPI:
         if not last_played_str:
             return True  # or False depending on your app logic
 
-        last_played = datetime.fromisoformat(last_played_str.replace("Z", "+00:00"))
-
-        try:
-            existing = XboxGame.objects.get(appid=appid, user=user)
-        except XboxGame.DoesNotExist:
+        if appid not in stored_last_played:
             return True  # Not in DB → needs to be created
 
         # If last_played from API is newer than in DB → needs update
-        if last_played > existing.last_played:
-            return True
+        existing_last_played = stored_last_played[appid]
+        last_played = datetime.fromisoformat(last_played_str.replace("Z", "+00:00"))
+        return existing_last_played is None or last_played > existing_last_played
+
+    @staticmethod
+    def parse_title_details(game, user, stats, achievements_response):
+        """
+        Builds the unsaved XboxGame and its XboxAchievements from a title's history entry and
+        its OpenXBL stats and achievements content; nothing is written here.
+        """
+        appid = game["titleId"]
+        last_played = datetime.fromisoformat(game["titleHistory"]["lastTimePlayed"].replace("Z", "+00:00"))
+
+        total_playtime = next(
+            (
+                int(stat["value"])
+                for group in stats.get("statlistscollection", [])
+                for stat in group.get("stats", [])
+                if stat.get("name") == "MinutesPlayed" and stat.get("value") is not None
+            ),
+            "0"
+        )
+        if total_playtime != "0":
+            first_played = last_played - timedelta(minutes=int(total_playtime))
+        else:
+            first_played = None
+
+        game_instance = XboxGame(
+            user=user,
+            appid=appid,
+            name=game["name"],
+            platform=", ".join(game.get("devices", [])),
+            total_playtime=total_playtime,
+            first_played=first_played,
+            last_played=last_played,
+            img_icon_url=game["displayImage"],
+        )
+
+        achievement_list = achievements_response.get("achievements", [])
+        logger.info(f"Achievements found for {game['name']}: {len(achievement_list)}")
+
+        # Achievements are matched on name, so a repeated name keeps its last entry
+        achievements = {}
+        for ach in achievement_list:
+            try:
+                icon_asset = next(
+                    (asset.get("url") for asset in ach.get("mediaAssets", []) if asset.get("type") == "Icon"),
+                    None
+                )
+                time_unlocked = ach.get("progression", {}).get("timeUnlocked", "")
+                raw_rewards = ach.get("rewards", [])
+                first_reward = raw_rewards[0] if raw_rewards else {}
+                is_unlocked = time_unlocked != LOCKED_TIME_UNLOCKED
+                achievements[ach["name"]] = XboxAchievement(
+                    name=ach["name"],
+                    description=ach.get("lockedDescription", "") + ". " + ach.get("description", ""),
+                    image=icon_asset or "",
+                    unlocked=is_unlocked,
+                    unlock_time=datetime.fromisoformat(time_unlocked.replace("Z", "+00:00")) if is_unlocked else None,
+                    achievement_value=first_reward.get("value", ""),
+                )
+            except Exception as e:
+                logger.error(f"Error parsing Xbox achievement {ach.get('name', 'Unknown')}: {str(e)}")
+                continue
+        return game_instance, list(achievements.values())
+
+    @staticmethod
+    def save_games(fetched):
+        """
+        Writes refreshed titles in bulk: one upsert for the games, then one insert and one update
+        for their achievements. The written objects are returned as-is, with primary keys set.
+        """
+        if not fetched:
+            return []
+        games = [game for game, _achievements in fetched]
+        with transaction.atomic():
+            XboxGame.objects.bulk_create(
+                games,
+                update_conflicts=True,
+                unique_fields=["user", "appid"],
+                update_fields=XBOX_GAME_SYNC_FIELDS,
+            )
+            # Achievements have no stable id from OpenXBL, so rows are matched on (game, name) as before
+            existing = {
+                (game_id, name): pk
+                for pk, game_id, name in XboxAchievement.objects.filter(game__in=games).values_list(
+                    "pk", "game_id", "name"
+                )
+            }
+            to_create, to_update = [], []
+            for game, achievements in fetched:
+                for achievement in achievements:
+                    achievement.game = game
+                    achievement.pk = existing.get((game.pk, achievement.name))
+                    (to_update if achievement.pk else to_create).append(achievement)
+            XboxAchievement.objects.bulk_create(to_create, batch_size=500)
+            XboxAchievement.objects.bulk_update(to_update, XBOX_ACHIEVEMENT_SYNC_FIELDS, batch_size=500)
+        return fetched
+
+    @staticmethod
+    def game_info(game, achievements):
+        """Response dict for a game and its achievements."""
+        unlocked_count = sum(1 for achievement in achievements if achievement.unlocked)
+        return {
+            "appid": game.appid,
+            "name": game.name,
+            "platform": game.platform,
+            "total_playtime": game.total_playtime,
+            "first_played": game.first_played,
+            "last_played": game.last_played,
+            "img_icon_url": game.img_icon_url,
+            "total_achievements": len(achievements),
+            "unlocked_achievements": unlocked_count,
+            "locked_achievements": len(achievements) - unlocked_count,
+            "achievements": [
+                {field: getattr(achievement, field) for field in ACHIEVEMENT_RESPONSE_FIELDS}
+                for achievement in achievements
+            ],
+        }
 
-        return False
-    
     @classmethod
+    @http_client.track_sync("xbox.games")
     def fetch_games(cls, user, xbox_api_key, xuid):
         """Fetch Xbox games for a specific user."""
         if not xbox_api_key or not xuid:
@@ -146,144 +324,59 @@ class XboxAPI:
             return {"error": "No Xbox API key or XUID provided."}
         
         try:
-            url = f"https://xbl.io/api/v2/player/titleHistory"
-            logger.info(f"Making request to URL: {url}")
-            response = cls.make_request(url, xbox_api_key)
+            xbox_games = cls.fetch_title_history(xbox_api_key)
             
-            if not response:
+            if xbox_games is None:
                 return {"error": "Failed to fetch Xbox games."}
-                
-            titles_count = len(response.get("titles", []))
-            logger.info(f"Titles obtained: {titles_count}")
-            
-            raw_titles = response.get("titles", [])
-            xbox_games = [
-                game for game in raw_titles
-                if cls.is_supported_xbox_title(game)
-            ]
-            logger.info(f"Titles after Xbox ecosystem filtering: {len(xbox_games)}")
-            logger.info(f"Titles excluded as generic Win32/non-Xbox activity: {len(raw_titles) - len(xbox_games)}")
-            
-            games_info = []
-            
+
+            # One query tells which titles moved since they were stored
+            stored_last_played = dict(XboxGame.objects.filter(user=user).values_list("appid", "last_played"))
+
+            changed = []
             for game in xbox_games:
                 try:
-                    appid = game["titleId"]
-                    last_played = datetime.fromisoformat(game["titleHistory"]["lastTimePlayed"].replace("Z", "+00:00"))
-                    
-                    if cls.needs_update(game, user):
+                    if cls.needs_update(game, stored_last_played):
                         logger.info(f"Updating {game['name']}")
-                        url = f"https://xbl.io/api/v2/achievements/stats/{appid}/"
-                        response = cls.make_request(url, xbox_api_key)
-                        total_playtime = next(
-                            (
-                                int(stat["value"])
-                                for group in response.get("statlistscollection", [])
-                                for stat in group.get("stats", [])
-                                if stat.get("name") == "MinutesPlayed" and stat.get("value") is not None
-                            ),
-                            "0"
-                        )
-                        if total_playtime != "0":
-                            first_played = last_played - timedelta(minutes=int(total_playtime))
-                        else:
-                            first_played = None
-                            
-                        game_instance, _ = XboxGame.objects.update_or_create(
-                            appid=game["titleId"],
-                            user=user,
-                            defaults={
-                                "name": game["name"],
-                                "platform": ", ".join(game.get("devices", [])),
-                                "total_playtime": total_playtime,
-                                "first_played": first_played,
-                                "last_played": last_played,
-                                "img_icon_url": game["displayImage"]
-                            }
-                        )
-                        
-                        url = f"https://xbl.io/api/v2/achievements/player/{xuid}/{appid}/" 
-                        logger.info(f"Fetching achievements for {game['name']}")
-                        response = cls.make_request(url, xbox_api_key)
-                        achievement_list = response.get("achievements", [])
-                        logger.info(f"Achievements found: {len(achievement_list)}")
-                        
-                        unlocked_count = 0
-                        for ach in achievement_list:
-                            icon_asset = next(
-                                (asset.get("url") for asset in ach.get("mediaAssets", []) if asset.get("type") == "Icon"),
-                                None
-                            )                       
-                            time_unlocked = ach.get("progression", {}).get("timeUnlocked", "")
-                            raw_rewards = ach.get("rewards", [])
-                            first_reward = raw_rewards[0] if raw_rewards else {}  
-                            achievement_value = first_reward.get("value", "")
-                            
-                            is_unlocked = False if time_unlocked == "0001-01-01T00:00:00.0000000Z" else True
-                            if is_unlocked:
-                                unlocked_count += 1
-                                
-                            try:
-                                XboxAchievement.objects.update_or_create(
-                                    game=game_instance,
-                                    name=ach["name"],
-                                    defaults={
-                                        "description": ach.get("lockedDescription", "") + ". " + ach.get("description", ""),
-                                        "image": icon_asset,
-                                        "unlocked": is_unlocked,
-                                        "unlock_time": None if time_unlocked == "0001-01-01T00:00:00.0000000Z" else datetime.fromisoformat(time_unlocked.replace("Z", "+00:00")),
-                                        "achievement_value": achievement_value
-                                    }
-                                )
-                            except Exception as e:
-                                logger.error(f"Error updating Xbox achievement {ach.get('name', 'Unknown')}: {str(e)}")
-                                continue
-                        
-                        # Get fresh data from database
-                        achievements = game_instance.achievements.all()
-                        
-                        games_info.append({
-                            "appid": game_instance.appid,
-                            "name": game_instance.name,
-                            "platform": game_instance.platform,
-                            "total_playtime": game_instance.total_playtime,
-                            "first_played": game_instance.first_played,
-                            "last_played": game_instance.last_played,
-                            "img_icon_url": game_instance.img_icon_url,
-                            "total_achievements": achievements.count(),
-                            "unlocked_achievements": unlocked_count,
-                            "locked_achievements": achievements.count() - unlocked_count,
-                            "achievements": list(
-                                achievements.values("name", "description", "image", "unlocked", "unlock_time", "achievement_value")
-                            )
-                        })
+                        changed.append(game)
                     else:
                         logger.info(f"Skipping {game['name']} - No update needed")
-                        
-                        # Add to games_info even if not updated
-                        game_instance = XboxGame.objects.get(appid=game["titleId"], user=user)
-                        achievements = game_instance.achievements.all()
-                        unlocked_count = achievements.filter(unlocked=True).count()
-                        
-                        games_info.append({
-                            "appid": game_instance.appid,
-                            "name": game_instance.name,
-                            "platform": game_instance.platform,
-                            "total_playtime": game_instance.total_playtime,
-                            "first_played": game_instance.first_played,
-                            "last_played": game_instance.last_played,
-                            "img_icon_url": game_instance.img_icon_url,
-                            "total_achievements": achievements.count(),
-                            "unlocked_achievements": unlocked_count,
-                            "locked_achievements": achievements.count() - unlocked_count,
-                            "achievements": list(
-                                achievements.values("name", "description", "image", "unlocked", "unlock_time", "achievement_value")
-                            )
-                        })
                 except Exception as e:
                     logger.error(f"Error processing game {game.get('name', 'Unknown')}: {str(e)}")
                     continue
-                
+
+            # Stats and achievements of every changed title are fetched concurrently, within
+            # the "xbox" (OpenXBL) rate limit; parsing and writes stay on this thread.
+            calls = [call for game in changed for call in cls.title_requests(game["titleId"], xbox_api_key, xuid)]
+            responses = http_client.gather(
+                calls, concurrency=http_client.fanout_limit("xbox"), return_exceptions=True
+            )
+            contents = [cls.parse_response(call["url"], response) for call, response in zip(calls, responses)]
+
+            fetched = []
+            for index, game in enumerate(changed):
+                if any(
+                    isinstance(response, Exception) or response.status_code != 200
+                    for response in responses[2 * index:2 * index + 2]
+                ):
+                    # Left unwritten, so its stored last_played makes the next sync retry it
+                    logger.error(f"Skipping {game['name']} - OpenXBL requests failed")
+                    continue
+                try:
+                    stats, achievements = contents[2 * index], contents[2 * index + 1]
+                    fetched.append(cls.parse_title_details(game, user, stats, achievements))
+                except Exception as e:
+                    logger.error(f"Error processing game {game.get('name', 'Unknown')}: {str(e)}")
+                    continue
+
+            games_by_appid = {
+                game.appid: cls.game_info(game, achievements) for game, achievements in cls.save_games(fetched)
+            }
+            # Add unchanged games to games_info from what is stored
+            unchanged = [game["titleId"] for game in xbox_games if game["titleId"] not in games_by_appid]
+            for game in XboxGame.objects.filter(user=user, appid__in=unchanged).prefetch_related("achievements"):
+                games_by_appid[game.appid] = cls.game_info(game, list(game.achievements.all()))
+
+            games_info = [games_by_appid[game["titleId"]] for game in xbox_games if game["titleId"] in games_by_appid]
             return {"games": games_info}
         except Exception as e:
             logger.error(f"Error fetching Xbox games: {str(e)}")
@@ -295,23 +388,5 @@ class XboxAPI:
         if user is None:
             raise ValueError("User must be provided to retrieve their games.")
             
-        games_info = []
-        for game in XboxGame.objects.filter(user=user).order_by("-last_played"):
-            achievements = game.achievements.all()
-            unlocked_count = achievements.filter(unlocked=True).count()
-            games_info.append({
-                "appid": game.appid,
-                "name": game.name,
-                "platform": game.platform,
-                "total_playtime": game.total_playtime,
-                "first_played": game.first_played,
-                "last_played": game.last_played,
-                "img_icon_url": game.img_icon_url,
-                "total_achievements": achievements.count(),
-                "unlocked_achievements": unlocked_count,
-                "locked_achievements": achievements.count() - unlocked_count,
-                "achievements": list(
-                    achievements.values("name", "description", "image", "unlocked", "unlock_time", "achievement_value")
-                ),
-            })
-        return {"games": games_info}
+        games = XboxGame.objects.filter(user=user).order_by("-last_played").prefetch_related("achievements")
+        return {"games": [cls.game_info(game, list(game.achievements.all())) for game in games]}
@@ -1,9 +1,43 @@
+import json
 from unittest.mock import Mock, patch
 
+import requests
+
 from django.contrib.auth.models import User
 from django.test import TestCase
 
-from .models import XboxAPI, XboxGame
+import http_client
+
+from .models import XboxAchievement, XboxAPI, XboxGame
+
+
+def xbox_title(title_id, last_played):
+    return {
+        "titleId": title_id,
+        "name": f"Game {title_id}",
+        "devices": ["XboxSeries"],
+        "displayImage": f"https://example.com/{title_id}.jpg",
+        "titleHistory": {"lastTimePlayed": last_played},
+    }
+
+
+def xbox_achievement(name, time_unlocked="0001-01-01T00:00:00.0000000Z"):
+    return {
+        "name": name,
+        "description": f"{name} description",
+        "lockedDescription": f"{name} locked",
+        "mediaAssets": [{"type": "Icon", "url": f"https://example.com/{name}.png"}],
+        "progression": {"timeUnlocked": time_unlocked},
+        "rewards": [{"value": "10"}],
+    }
+
+
+def streamed_response(payload):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = json.dumps(payload).encode()
+    response._content_consumed = True
+    return response
 
 
 class XboxAPITests(TestCase):
@@ -48,7 +82,9 @@ class XboxAPITests(TestCase):
         stats = {"statlistscollection": []}
         achievements = {"achievements": []}
 
-        with patch.object(XboxAPI, "make_request", side_effect=[title_history, stats, achievements]):
+        with patch("xbox.models.http_client.get", return_value=streamed_response(title_history)), \
+                patch("xbox.models.http_client.gather",
+                      return_value=[streamed_response(stats), streamed_response(achievements)]):
             result = XboxAPI.fetch_games(user, "api-key", "2535436324847295")
 
         self.assertEqual(len(result["games"]), 1)
@@ -60,3 +96,89 @@ class XboxAPITests(TestCase):
         self.assertTrue(
             XboxGame.objects.filter(user=user, appid="1792830437", name="Balatro").exists()
         )
+
+    def test_fetch_title_history_unwraps_openxbl_content(self):
+        payload = {
+            "code": 200,
+            "content": {
+                "titles": [
+                    {"titleId": "1", "name": "Wrapped Game", "devices": ["XboxSeries"]},
+                    {"titleId": "2", "name": "Dolphin", "devices": ["Win32"]},
+                ]
+            },
+        }
+
+        with patch("xbox.models.http_client.get", return_value=streamed_response(payload)):
+            titles = XboxAPI.fetch_title_history("api-key")
+
+        self.assertEqual([title["name"] for title in titles], ["Wrapped Game"])
+
+
+class XboxIncrementalSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="xbox-user")
+        self.titles = [xbox_title(str(index), "2026-05-20T04:00:00Z") for index in range(5)]
+
+    def fake_gather(self, calls, **kwargs):
+        self.assertEqual(kwargs["concurrency"], http_client.fanout_limit("xbox"))
+        self.requested.extend(call["url"] for call in calls)
+        responses = []
+        for call in calls:
+            if "/4/" in call["url"] and self.fail_title_4:
+                responses.append(http_client.ExternalRequestError("OpenXBL down"))
+            elif "/achievements/stats/" in call["url"]:
+                responses.append(streamed_response(
+                    {"statlistscollection": [{"stats": [{"name": "MinutesPlayed", "value": "90"}]}]}
+                ))
+            else:
+                responses.append(streamed_response({"achievements": [
+                    xbox_achievement("First", "2026-05-19T04:00:00.0000000Z"), xbox_achievement("Second"),
+                ]}))
+        return responses
+
+    def sync(self, fail_title_4=False):
+        self.requested = []
+        self.fail_title_4 = fail_title_4
+        with patch("xbox.models.http_client.get", return_value=streamed_response({"titles": self.titles})), \
+                patch("xbox.models.http_client.gather", side_effect=self.fake_gather):
+            result = XboxAPI.fetch_games(self.user, "api-key", "2535436324847295")
+        return self.requested, result
+
+    def test_unchanged_titles_are_decided_without_per_title_queries(self):
+        self.sync()
+
+        # The last_played map, then the unchanged games and their achievements
+        with self.assertNumQueries(3):
+            requested, result = self.sync()
+
+        self.assertEqual(requested, [])
+        self.assertEqual([game["appid"] for game in result["games"]], ["0", "1", "2", "3", "4"])
+        self.assertEqual(result["games"][0]["unlocked_achievements"], 1)
+
+    def test_only_titles_played_since_the_last_sync_are_refetched(self):
+        self.sync()
+        original_pk = XboxAchievement.objects.get(game__appid="2", name="First").pk
+        self.titles[2]["titleHistory"]["lastTimePlayed"] = "2026-05-21T04:00:00Z"
+
+        requested, result = self.sync()
+
+        self.assertEqual(len(requested), 2)
+        self.assertTrue(all("/2/" in url for url in requested))
+        # Achievements are updated in place and the response is built from the written rows
+        self.assertEqual(XboxAchievement.objects.get(game__appid="2", name="First").pk, original_pk)
+        self.assertEqual(XboxAchievement.objects.filter(game__user=self.user).count(), 10)
+        self.assertEqual(result["games"][2]["total_achievements"], 2)
+        self.assertEqual(XboxGame.objects.get(user=self.user, appid="2").last_played.day, 21)
+
+    def test_first_sync_fetches_every_title_in_one_batch(self):
+        requested, result = self.sync(fail_title_4=True)
+
+        # Stats and achievements for each title, all handed to http_client.gather at once
+        self.assertEqual(len(requested), 10)
+        self.assertEqual([game["appid"] for game in result["games"]], ["0", "1", "2", "3"])
+        self.assertEqual(result["games"][0]["total_playtime"], 90)
+        # The failed title is not stored, so the next sync retries it
+        self.assertFalse(XboxGame.objects.filter(user=self.user, appid="4").exists())
+        requested, result = self.sync()
+        self.assertEqual(len(requested), 2)
+        self.assertEqual(len(result["games"]), 5)